@@ -0,0 +1,481 @@
+import base64
+import hashlib
+import heapq
+import json
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_TOP_K = int(os.getenv('AGGREGATE_TOP_K', '200'))
+AGGREGATE_STORE_PATH = os.getenv('AGGREGATE_STORE_PATH', 'aggregates.json')
+# Minimum seconds between automatic saves
+AGGREGATE_SAVE_INTERVAL = float(os.getenv('AGGREGATE_SAVE_INTERVAL', '30'))
+# Email ids per generation of the seen-filter, and its false positive rate
+AGGREGATE_SEEN_CAPACITY = int(os.getenv('AGGREGATE_SEEN_CAPACITY', '250000'))
+AGGREGATE_SEEN_ERROR_RATE = float(os.getenv('AGGREGATE_SEEN_ERROR_RATE', '0.001'))
+# Most recent emails whose contributions are kept, so merge() can subtract overlaps
+AGGREGATE_MERGE_WINDOW = int(os.getenv('AGGREGATE_MERGE_WINDOW', '10000'))
+
+HOUR = 'hour'
+DAY = 'day'
+
+
+def _hour_key(date: datetime) -> str:
+    return date.strftime('%Y-%m-%dT%H')
+
+
+def _day_key(date: datetime) -> str:
+    return date.strftime('%Y-%m-%d')
+
+
+class TopKSketch:
+    """Space-Saving heavy hitters: at most ``capacity`` counters, amortized O(log k) per add.
+
+    Counts are overestimates by at most the recorded error; any key with a true
+    count above total / capacity is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_TOP_K):
+        self.capacity = max(1, capacity)
+        self.counts = {}
+        self.errors = {}
+        # Lazy min-heap of (count, key); entries whose count is stale are skipped
+        self._heap = []
+
+    def add(self, key: str, count: int = 1):
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            # Replace the current minimum, inheriting its count as error
+            while True:
+                low, victim = heapq.heappop(self._heap)
+                if self.counts.get(victim) == low:
+                    break
+            del self.counts[victim]
+            del self.errors[victim]
+            self.counts[key] = low + count
+            self.errors[key] = low
+        heapq.heappush(self._heap, (self.counts[key], key))
+        # Stale entries accumulate with every increment; rebuild before they dominate
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, k) for k, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, key: str, count: int = 1):
+        """Take back ``count`` from a tracked key (untracked keys are already undercounted)"""
+        if key in self.counts:
+            self.counts[key] = max(0, self.counts[key] - count)
+            heapq.heappush(self._heap, (self.counts[key], key))
+
+    def merge(self, other: 'TopKSketch') -> 'TopKSketch':
+        counts = Counter(self.counts)
+        counts.update(other.counts)
+        errors = Counter(self.errors)
+        errors.update(other.errors)
+        kept = counts.most_common(self.capacity)
+        self.counts = dict(kept)
+        self.errors = {key: errors[key] for key, _ in kept}
+        self._heap = [(c, k) for k, c in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, n: int) -> List:
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> Dict:
+        return {'capacity': self.capacity, 'counts': self.counts, 'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TopKSketch':
+        sketch = cls(data['capacity'])
+        sketch.counts = dict(data['counts'])
+        sketch.errors = dict(data['errors'])
+        sketch._heap = [(c, k) for k, c in sketch.counts.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+class SeenFilter:
+    """Fixed-size Bloom filter of email ids, in two generations.
+
+    Once the current generation holds ``capacity`` ids it becomes the previous
+    one and a fresh generation starts, so memory and the saved size stay
+    constant. Ids older than two generations are forgotten (and would be
+    counted again); a false positive, at about ``error_rate``, makes a new
+    email look already counted.
+    """
+
+    def __init__(self, capacity: int = AGGREGATE_SEEN_CAPACITY, error_rate: float = AGGREGATE_SEEN_ERROR_RATE):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        bits = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = -(-bits // 8) * 8
+        self.hashes = min(16, max(1, round(self.size / self.capacity * math.log(2))))
+        self._words = struct.Struct(f"<{self.hashes}I")
+        self.current = bytearray(self.size // 8)
+        self.previous = bytearray(self.size // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        # One 32-bit word of a single digest per hash function
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4 * self.hashes).digest()
+        size = self.size
+        return [word % size for word in self._words.unpack(digest)]
+
+    @staticmethod
+    def _contains(bits: bytearray, positions: List[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return self._contains(self.current, positions) or self._contains(self.previous, positions)
+
+    def add(self, key: str) -> bool:
+        """Record ``key``; returns False if it (probably) was already recorded"""
+        positions = self._positions(key)
+        if self._contains(self.current, positions) or self._contains(self.previous, positions):
+            return False
+        if self.count >= self.capacity:
+            self.previous, self.current = self.current, bytearray(self.size // 8)
+            self.count = 0
+        for p in positions:
+            self.current[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+        return True
+
+    @staticmethod
+    def _union(a: bytearray, b: bytearray) -> bytearray:
+        return bytearray((int.from_bytes(a, 'little') | int.from_bytes(b, 'little')).to_bytes(len(a), 'little'))
+
+    def merge(self, other: 'SeenFilter') -> 'SeenFilter':
+        if (other.size, other.hashes) != (self.size, self.hashes):
+            raise ValueError("Cannot merge seen-filters of different sizes")
+        self.current = self._union(self.current, other.current)
+        self.previous = self._union(self.previous, other.previous)
+        self.count += other.count
+        return self
+
+    def to_dict(self) -> Dict:
+        def encode(bits):
+            return base64.b64encode(zlib.compress(bytes(bits))).decode('ascii')
+        return {'capacity': self.capacity, 'error_rate': self.error_rate, 'count': self.count,
+                'current': encode(self.current), 'previous': encode(self.previous)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SeenFilter':
+        seen = cls(data['capacity'], data['error_rate'])
+        seen.current = bytearray(zlib.decompress(base64.b64decode(data['current'])))
+        seen.previous = bytearray(zlib.decompress(base64.b64decode(data['previous'])))
+        seen.count = data['count']
+        return seen
+
+
+class Rollup:
+    """Counts and sums for one time bucket (or any set of emails), mergeable by addition"""
+
+    __slots__ = ('count', 'discount_sum', 'discount_count', 'duplicates', 'promotion_types', 'senders')
+
+    def __init__(self):
+        self.count = 0
+        self.discount_sum = 0
+        self.discount_count = 0
+        self.duplicates = 0
+        self.promotion_types = Counter()
+        self.senders = Counter()
+
+    def add(self, sender: str, promotion_type: str, discount, duplicate: bool):
+        self.count += 1
+        self.promotion_types[promotion_type] += 1
+        self.senders[sender] += 1
+        if discount:
+            self.discount_sum += discount
+            self.discount_count += 1
+        if duplicate:
+            self.duplicates += 1
+
+    def remove(self, sender: str, promotion_type: str, discount, duplicate: bool):
+        """Undo one ``add`` with the same arguments"""
+        self.count -= 1
+        for counter, key in ((self.promotion_types, promotion_type), (self.senders, sender)):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        if discount:
+            self.discount_sum -= discount
+            self.discount_count -= 1
+        if duplicate:
+            self.duplicates -= 1
+
+    def merge(self, other: 'Rollup') -> 'Rollup':
+        self.count += other.count
+        self.discount_sum += other.discount_sum
+        self.discount_count += other.discount_count
+        self.duplicates += other.duplicates
+        self.promotion_types.update(other.promotion_types)
+        self.senders.update(other.senders)
+        return self
+
+    def result(self, top_n: int = 5) -> Dict:
+        avg_discount = self.discount_sum / self.discount_count if self.discount_count else 0
+        return {
+            'total_emails': self.count,
+            'promotion_types': dict(self.promotion_types),
+            'top_senders': dict(self.senders.most_common(top_n)),
+            'average_discount': round(avg_discount, 1),
+            'duplicate_emails': self.duplicates,
+            'dedup_ratio': round(self.duplicates / self.count, 4) if self.count else 0.0
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'discount_sum': self.discount_sum,
+            'discount_count': self.discount_count,
+            'duplicates': self.duplicates,
+            'promotion_types': dict(self.promotion_types),
+            'senders': dict(self.senders)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Rollup':
+        rollup = cls()
+        rollup.count = data['count']
+        rollup.discount_sum = data['discount_sum']
+        rollup.discount_count = data['discount_count']
+        rollup.duplicates = data['duplicates']
+        rollup.promotion_types = Counter(data['promotion_types'])
+        rollup.senders = Counter(data['senders'])
+        return rollup
+
+
+class AggregateStore:
+    """Analytics maintained incrementally as emails are classified.
+
+    Each new email updates running totals, a top-k sender sketch, the date range
+    and one hourly plus one daily rollup, all in (amortized) constant time.
+    Window queries combine whole-day buckets with hourly buckets at the edges,
+    so any range reads at most a few dozen buckets. Emails are counted once per
+    ``email_id``, remembered in a fixed-size SeenFilter. Stores merge across
+    workers and persist as JSON.
+    """
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K, path: Optional[str] = None):
+        self.path = path
+        self.totals = Rollup()
+        self.top_senders = TopKSketch(top_k)
+        self.start = None
+        self.end = None
+        self.hourly = {}
+        self.daily = {}
+        self._seen = SeenFilter()
+        # email_id -> (date, sender, promotion_type, discount, duplicate) of the latest emails
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+        self._dirty = False
+
+    def add(self, email: Dict) -> bool:
+        """Fold one classified email in; returns False if it was already counted"""
+        with self._lock:
+            return self._add(email)
+
+    def add_many(self, emails: Iterable[Dict]) -> int:
+        with self._lock:
+            added = sum(1 for email in emails if self._add(email))
+        if added and self.path:
+            self.maybe_save()
+        return added
+
+    def _add(self, email: Dict) -> bool:
+        email_id = email.get('email_id')
+        if email_id is not None and not self._seen.add(email_id):
+            return False
+
+        sender = email['sender']
+        promotion_type = email.get('promotion_type', 'other')
+        discount = email.get('discount')
+        duplicate = bool(email.get('near_duplicate'))
+        date = email['date']
+        if email_id is not None:
+            self._recent[email_id] = (date, sender, promotion_type, discount, duplicate)
+            if len(self._recent) > AGGREGATE_MERGE_WINDOW:
+                self._recent.popitem(last=False)
+
+        self.totals.add(sender, promotion_type, discount, duplicate)
+        self.top_senders.add(sender)
+        if self.start is None or date < self.start:
+            self.start = date
+        if self.end is None or date > self.end:
+            self.end = date
+
+        for buckets, key in ((self.hourly, _hour_key(date)), (self.daily, _day_key(date))):
+            rollup = buckets.get(key)
+            if rollup is None:
+                rollup = buckets[key] = Rollup()
+            rollup.add(sender, promotion_type, discount, duplicate)
+        self._dirty = True
+        return True
+
+    def merge(self, other: 'AggregateStore') -> 'AggregateStore':
+        """Fold in another worker's store; emails both have counted are counted once.
+
+        Overlaps are found among the other store's AGGREGATE_MERGE_WINDOW most
+        recent emails and subtracted again; older overlaps cannot be told apart.
+        """
+        with self._lock:
+            overlap = [(email_id, entry) for email_id, entry in other._recent.items() if email_id in self._seen]
+            self.totals.merge(other.totals)
+            self.top_senders.merge(other.top_senders)
+            for date in (other.start, other.end):
+                if date is not None:
+                    self.start = date if self.start is None else min(self.start, date)
+                    self.end = date if self.end is None else max(self.end, date)
+            for mine, theirs in ((self.hourly, other.hourly), (self.daily, other.daily)):
+                for key, rollup in theirs.items():
+                    mine.setdefault(key, Rollup()).merge(rollup)
+            for email_id, (date, sender, promotion_type, discount, duplicate) in overlap:
+                self.totals.remove(sender, promotion_type, discount, duplicate)
+                self.top_senders.remove(sender)
+                self.hourly[_hour_key(date)].remove(sender, promotion_type, discount, duplicate)
+                self.daily[_day_key(date)].remove(sender, promotion_type, discount, duplicate)
+            self._seen.merge(other._seen)
+            self._recent.update(other._recent)
+            while len(self._recent) > AGGREGATE_MERGE_WINDOW:
+                self._recent.popitem(last=False)
+            self._dirty = True
+        return self
+
+    # Queries
+
+    def summary(self, top_n: int = 5) -> Dict:
+        """All-time stats in the shape of generate_analytics (without critical deals)"""
+        with self._lock:
+            result = self.totals.result(top_n)
+            result['top_senders'] = dict(self.top_senders.top(top_n))
+            result['date_range'] = {
+                'start': self.start.isoformat() if self.start is not None else None,
+                'end': self.end.isoformat() if self.end is not None else None
+            }
+        return result
+
+    def _window_buckets(self, start: datetime, end: datetime) -> List[Rollup]:
+        """Buckets covering [start, end) at hour resolution: whole days, hours at the edges"""
+        cursor = start.replace(minute=0, second=0, microsecond=0)
+        buckets = []
+        while cursor < end:
+            next_day = cursor + timedelta(days=1)
+            if cursor.hour == 0 and next_day <= end:
+                bucket = self.daily.get(_day_key(cursor))
+                cursor = next_day
+            else:
+                bucket = self.hourly.get(_hour_key(cursor))
+                cursor += timedelta(hours=1)
+            if bucket is not None:
+                buckets.append(bucket)
+        return buckets
+
+    def window(self, start: datetime, end: datetime, top_n: int = 5) -> Dict:
+        """Stats for emails dated in [start, end), start rounded down to the hour"""
+        with self._lock:
+            combined = Rollup()
+            for bucket in self._window_buckets(start, end):
+                combined.merge(bucket)
+        result = combined.result(top_n)
+        result['window'] = {'start': start.isoformat(), 'end': end.isoformat()}
+        return result
+
+    def series(self, start: datetime, end: datetime, granularity: str = DAY) -> List[Dict]:
+        """Per-bucket counts and average discount for charting"""
+        step = timedelta(hours=1) if granularity == HOUR else timedelta(days=1)
+        buckets, key_fn = (self.hourly, _hour_key) if granularity == HOUR else (self.daily, _day_key)
+        cursor = start.replace(minute=0, second=0, microsecond=0)
+        if granularity != HOUR:
+            cursor = cursor.replace(hour=0)
+        points = []
+        with self._lock:
+            while cursor < end:
+                rollup = buckets.get(key_fn(cursor))
+                if rollup is not None:
+                    point = rollup.result()
+                    point['bucket'] = cursor.isoformat()
+                    points.append(point)
+                cursor += step
+        return points
+
+    # Persistence
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'totals': self.totals.to_dict(),
+                'top_senders': self.top_senders.to_dict(),
+                'start': self.start.isoformat() if self.start is not None else None,
+                'end': self.end.isoformat() if self.end is not None else None,
+                'hourly': {key: rollup.to_dict() for key, rollup in self.hourly.items()},
+                'daily': {key: rollup.to_dict() for key, rollup in self.daily.items()},
+                'seen': self._seen.to_dict(),
+                'recent': [[email_id, date.isoformat(), sender, promotion_type, discount, duplicate]
+                           for email_id, (date, sender, promotion_type, discount, duplicate) in self._recent.items()]
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict, path: Optional[str] = None) -> 'AggregateStore':
+        store = cls(path=path)
+        store.totals = Rollup.from_dict(data['totals'])
+        store.top_senders = TopKSketch.from_dict(data['top_senders'])
+        store.start = datetime.fromisoformat(data['start']) if data['start'] else None
+        store.end = datetime.fromisoformat(data['end']) if data['end'] else None
+        store.hourly = {key: Rollup.from_dict(value) for key, value in data['hourly'].items()}
+        store.daily = {key: Rollup.from_dict(value) for key, value in data['daily'].items()}
+        if isinstance(data['seen'], list):
+            # Saved before ids were kept in a SeenFilter
+            for email_id in data['seen']:
+                store._seen.add(email_id)
+        else:
+            store._seen = SeenFilter.from_dict(data['seen'])
+        store._recent = OrderedDict((email_id, (datetime.fromisoformat(date), *rest))
+                                    for email_id, date, *rest in data.get('recent', ()))
+        return store
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        data = self.to_dict()
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        self._saved_at = time.time()
+        self._dirty = False
+
+    def maybe_save(self):
+        """Save if there are changes and the last save is older than AGGREGATE_SAVE_INTERVAL"""
+        if time.time() - self._saved_at >= AGGREGATE_SAVE_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Save any changes now (at shutdown, so nothing since the last save is lost)"""
+        if self._dirty:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Could not save aggregates: {e}")
+
+    @classmethod
+    def load(cls, path: str = AGGREGATE_STORE_PATH, top_k: int = DEFAULT_TOP_K) -> 'AggregateStore':
+        """Load a saved store, or start an empty one bound to ``path``"""
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    return cls.from_dict(json.load(f), path=path)
+            except (ValueError, KeyError, TypeError, zlib.error) as e:
+                print(f"Ignoring unreadable aggregates at {path}: {e}")
+        return cls(top_k=top_k, path=path)
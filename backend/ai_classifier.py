@@ -1,137 +1,394 @@
+import logging
 import os
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-import openai
-from typing import List, Dict
+import threading
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
+from itertools import islice
 import json
+from embedding_cache import EmbeddingCache
+from email_record import EmailRecord
+from promotion_rules import PromotionMatcher, get_default_matcher
+from near_dedup import NearDuplicateDetector, content_id
+from instrumentation import metrics
+from micro_batcher import DEFAULT_WINDOW_MS, MicroBatcher
+from vector_store import VectorStore, build_where, create_vector_store
+from index_manifest import IndexManifest, open_manifest
+from text_normalizer import truncate_tokens
+from encoders import ENCODER_BACKEND, MODEL_NAME, Encoder, create_encoder, encoder_name
+
+logger = logging.getLogger(__name__)
+
+# sentence_transformers (via encoders), chromadb and openai are imported on first
+# use so the API can start serving before the ML stack is loaded
+
+# Number of emails encoded and written to the vector DB per round trip
+DEFAULT_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '64'))
+
+# Readiness states reported by AIClassifier.status
+STATUS_COLD = 'cold'
+STATUS_WARMING = 'warming'
+STATUS_READY = 'ready'
+STATUS_ERROR = 'error'
+
+def classify_with_rules(email: Dict, matcher: PromotionMatcher = None) -> Dict:
+    """Rule-based classification of one email (no model or vector store needed)"""
+    
+    # For demo, use rule-based classification
+    # In production, use OpenAI API
+    
+    # Single pass of the shared rule engine over subject and body
+    if type(email) is EmailRecord:
+        text = f"{email.subject} {email.body}"
+    else:
+        text = f"{email['subject']} {email['body']}"
+    matches = (matcher or get_default_matcher()).scan(text)
+    
+    # ai_summary is derived from sender and discount when the email is serialized
+    # (EmailRecord.to_dict), not stored per email
+    classification = {
+        'promotion_type': matches.promotion_type,
+        'urgency_score': matches.urgency_score,
+        'value_score': matches.value_score
+    }
+    
+    return classification
 
 class AIClassifier:
-    def __init__(self):
-        # Initialize OpenAI
-        openai.api_key = os.getenv('OPENAI_API_KEY', '')
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, matcher: PromotionMatcher = None,
+                 search_window_ms: float = DEFAULT_WINDOW_MS, encoder_backend: str = None):
+        self.batch_size = max(1, batch_size)
+        self.matcher = matcher or get_default_matcher()
         
-        # Initialize sentence transformer for embeddings
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # ENCODER_BACKEND=sentence-transformer|int8|hashing; the name scopes the
+        # embedding cache, vector store and manifest to this encoder's vectors
+        self.encoder_backend = encoder_backend or ENCODER_BACKEND
+        self.encoder_name = encoder_name(self.encoder_backend)
         
-        # Initialize ChromaDB for vector storage
-        self.chroma_client = chromadb.Client(Settings(
-            persist_directory="./chroma_db",
-            anonymized_telemetry=False
-        ))
+        # Cache embeddings by content hash so templated bodies and repeated
+        # queries skip the model (EMBED_CACHE_DIR, e.g. embedding_cache, enables the on-disk tier)
+        self.embedding_cache = EmbeddingCache(
+            max_entries=int(os.getenv('EMBED_CACHE_SIZE', '10000')),
+            disk_path=os.getenv('EMBED_CACHE_DIR') or None,
+            namespace=self.encoder_name
+        )
         
-        # Create or get collection
-        try:
-            self.collection = self.chroma_client.create_collection(
-                name="promotions",
-                metadata={"hnsw:space": "cosine"}
+        # Skip embedding/storing templated emails already seen from the same sender
+        self.dedup = NearDuplicateDetector() if os.getenv('NEAR_DEDUP', '1') == '1' else None
+        
+        # Coalesce concurrent semantic searches (SEARCH_BATCH_WINDOW_MS=0 disables)
+        self.search_batcher = (MicroBatcher(self.search_batch, window_ms=search_window_ms,
+                                            name='search-batcher')
+                               if search_window_ms > 0 else None)
+        
+        # Model and vector store are built lazily by _ensure_loaded()
+        self._model = None
+        self._vector_store = None
+        self._manifest = None
+        self._load_lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread = None
+        self.status = STATUS_COLD
+        self.load_error = None
+    
+    @property
+    def ready(self) -> bool:
+        return self.status == STATUS_READY
+    
+    @property
+    def model(self) -> Encoder:
+        self._ensure_loaded()
+        return self._model
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        self._ensure_loaded()
+        return self._vector_store
+    
+    @property
+    def manifest(self) -> IndexManifest:
+        self._ensure_loaded()
+        return self._manifest
+    
+    def warm_up(self, background: bool = True):
+        """Load the model and vector store now, optionally on a daemon thread"""
+        if not background:
+            self._ensure_loaded()
+            return None
+        
+        with self._warmup_lock:
+            if self.status == STATUS_READY or self._warmup_thread is not None:
+                return self._warmup_thread
+            self._warmup_thread = threading.Thread(
+                target=self._warm_up_quietly, name='ai-classifier-warmup', daemon=True
             )
-        except:
-            self.collection = self.chroma_client.get_collection("promotions")
+            self._warmup_thread.start()
+            return self._warmup_thread
+    
+    def _warm_up_quietly(self):
+        try:
+            self._ensure_loaded()
+        except Exception as e:
+            print(f"AI classifier warm-up failed: {e}")
+        finally:
+            with self._warmup_lock:
+                self._warmup_thread = None
+    
+    def _ensure_loaded(self):
+        """Import and construct the ML stack exactly once"""
+        if self.status == STATUS_READY:
+            return
+        
+        with self._load_lock:
+            if self.status == STATUS_READY:
+                return
+            self.status = STATUS_WARMING
+            try:
+                # Initialize OpenAI (not used for embeddings, so optional: the
+                # hashing encoder runs without any ML packages installed)
+                try:
+                    import openai
+                    openai.api_key = os.getenv('OPENAI_API_KEY', '')
+                except ImportError:
+                    pass
+                
+                # Initialize the configured encoder for embeddings
+                self._model = create_encoder(self.encoder_backend)
+                
+                # Initialize vector storage (VECTOR_BACKEND=chroma|numpy); refuses a
+                # store holding another encoder's vectors
+                self._vector_store = create_vector_store(encoder=self.encoder_name)
+                
+                # Which emails the persistent store already holds (INDEX_MANIFEST=0 disables)
+                if os.getenv('INDEX_MANIFEST', '1') == '1':
+                    self._manifest = open_manifest(self._vector_store, self.encoder_name)
+            except Exception as e:
+                self.status = STATUS_ERROR
+                self.load_error = str(e)
+                raise
+            
+            self.status = STATUS_READY
+            self.load_error = None
     
-    def classify_promotions(self, emails: List[Dict]) -> List[Dict]:
-        """Classify emails using AI"""
+    def classify_promotions(self, emails: List[Dict], batch_size: int = None,
+                            on_stored: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Classify emails using AI, encoding and storing them in chunks.
+        
+        ``on_stored`` is called with the number of emails each vector DB write
+        actually stored (near-duplicates and already indexed emails are skipped).
+        """
+        batch_size = max(1, batch_size or self.batch_size)
         classified_emails = []
         
-        for email in emails:
-            # Generate embedding
-            embedding = self.model.encode(email['body'])
+        for start in range(0, len(emails), batch_size):
+            chunk = emails[start:start + batch_size]
             
             # Classify using AI (simplified for demo)
-            classification = self._classify_single_email(email)
+            with metrics.timer('classify', items=len(chunk)):
+                for email in chunk:
+                    classification = self._classify_single_email(email)
+                    if type(email) is EmailRecord:
+                        # Slot writes; update() goes through __setitem__ per field
+                        for key, value in classification.items():
+                            setattr(email, key, value)
+                    else:
+                        email.update(classification)
             
-            # Add to email data
-            email.update(classification)
+            # Only new, non-templated emails are embedded and indexed
+            to_index, signatures = self._filter_for_indexing(chunk)
             
-            # Store in vector DB
-            self._store_in_vectordb(email, embedding)
+            if to_index:
+                # Generate embeddings (one forward pass over cache misses)
+                embeddings = self._encode([self._embedding_text(email) for email in to_index], batch_size)
+                
+                # Store the whole chunk with a single vector DB write; dedup
+                # signatures are only recorded once the write succeeded
+                stored = self._store_batch_in_vectordb(to_index, embeddings)
+                if stored and self.dedup is not None:
+                    self.dedup.add(signatures)
+                if stored and on_stored is not None:
+                    on_stored(stored)
             
-            classified_emails.append(email)
+            classified_emails.extend(chunk)
         
         return classified_emails
     
+    def _filter_for_indexing(self, emails: List[Dict]) -> Tuple[List[Dict], List[Tuple[str, str, int]]]:
+        """Assign content ids and drop emails already indexed or near-duplicates of indexed ones.
+        
+        Returns the emails to index and their (email_id, sender, signature)
+        dedup entries, to be added once they are stored.
+        """
+        to_index = []
+        signatures = []
+        pending = {}
+        manifest = self.manifest
+        for email in emails:
+            email_id = email['email_id'] = content_id(email)
+            email['near_duplicate'] = False
+            
+            # Indexed by an earlier run with the same content and model
+            if manifest is not None and manifest.contains(self._index_key(email), email_id):
+                continue
+            
+            if self.dedup is None:
+                to_index.append(email)
+                continue
+            
+            # Exact re-runs: same id, already embedded and stored
+            if self.dedup.seen(email_id):
+                continue
+            
+            sender = email['sender']
+            duplicate_of, signature = self.dedup.check(email_id, sender, email['body'], pending)
+            if duplicate_of:
+                email['near_duplicate'] = True
+                email['duplicate_of'] = duplicate_of
+            else:
+                to_index.append(email)
+                signatures.append((email_id, sender, signature))
+        return to_index, signatures
+    
+    @staticmethod
+    def _index_key(email: Dict) -> str:
+        """Stable message identity: the provider message id when known, else the content id"""
+        return email.get('message_id') or email['email_id']
+    
+    def classify_stream(self, emails: Iterable[Dict], batch_size: int = None,
+                        on_stored: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        """Classify an iterable of emails lazily, one batch in memory at a time"""
+        batch_size = max(1, batch_size or self.batch_size)
+        emails = iter(emails)
+        while True:
+            chunk = list(islice(emails, batch_size))
+            if not chunk:
+                break
+            yield from self.classify_promotions(chunk, batch_size, on_stored)
+    
+    def _encode(self, texts: List[str], batch_size: int = None):
+        """Encode texts through the embedding cache, running the model on misses only"""
+        batch_size = batch_size or self.batch_size
+        return self.embedding_cache.encode(texts, lambda misses: self._encode_uncached(misses, batch_size))
+    
+    def _encode_uncached(self, texts: List[str], batch_size: int):
+        metrics.observe('embedding_batch_size', len(texts))
+        with metrics.timer('encode', items=len(texts)):
+            return self.model.encode(texts, batch_size=batch_size)
+    
     def _classify_single_email(self, email: Dict) -> Dict:
         """Use AI to classify a single email"""
-        
-        # For demo, use rule-based classification
-        # In production, use OpenAI API
-        
-        text = f"{email['subject']} {email['body']}".lower()
-        
-        classification = {
-            'promotion_type': 'general',
-            'urgency_score': 5,
-            'value_score': 5,
-            'ai_summary': ''
-        }
-        
-        # Simple classification rules
-        if 'flash' in text or 'limited time' in text:
-            classification['promotion_type'] = 'flash_sale'
-            classification['urgency_score'] = 9
-        elif 'clearance' in text or 'final sale' in text:
-            classification['promotion_type'] = 'clearance'
-            classification['urgency_score'] = 7
-        elif 'bogo' in text or 'buy one get' in text:
-            classification['promotion_type'] = 'bogo'
-            classification['value_score'] = 8
-        elif '% off' in text or 'percent off' in text:
-            classification['promotion_type'] = 'percentage_off'
-        elif 'free shipping' in text:
-            classification['promotion_type'] = 'free_shipping'
-        
-        # Generate AI summary (simplified)
-        classification['ai_summary'] = f"Promotion from {email['sender']} offering {email.get('discount', 'special')}% discount"
-        
-        return classification
+        return classify_with_rules(email, self.matcher)
     
     def _store_in_vectordb(self, email: Dict, embedding):
         """Store email and embedding in vector database"""
+        return self._store_batch_in_vectordb([email], [embedding])
+    
+    def _store_batch_in_vectordb(self, emails: List[Dict], embeddings) -> int:
+        """Store a chunk of emails and embeddings with one bulk upsert; returns the number written"""
+        # Ids are content hashes; identical emails in one call collapse to one upsert
+        records = {}
+        for email, embedding in zip(emails, embeddings):
+            email_id = email['email_id'] = email.get('email_id') or content_id(email)
+            records[email_id] = (email, embedding)
+        
+        if not records:
+            return 0
+        
         try:
-            self.collection.add(
-                embeddings=[embedding.tolist()],
-                documents=[email['body']],
-                metadatas=[{
-                    'sender': email['sender'],
-                    'subject': email['subject'],
-                    'discount': str(email.get('discount', 0)),
-                    'promotion_type': email.get('promotion_type', 'other')
-                }],
-                ids=[f"email_{email['date'].isoformat()}_{email['sender'][:10]}"]
-            )
-        except Exception as e:
-            print(f"Error storing in vector DB: {e}")
+            with metrics.timer('vector_store', items=len(records)):
+                self.vector_store.upsert(
+                    ids=list(records.keys()),
+                    embeddings=[embedding for _, embedding in records.values()],
+                    documents=[self._embedding_text(email) for email, _ in records.values()],
+                    metadatas=[self._metadata(email) for email, _ in records.values()]
+                )
+            if self._manifest is not None:
+                self._manifest.add((self._index_key(email), email_id)
+                                   for email_id, (email, _) in records.items())
+        except Exception:
+            logger.exception("Error storing %d emails in vector DB", len(records))
+            return 0
+        return len(records)
+    
+    @staticmethod
+    def _embedding_text(email: Dict) -> str:
+        """Body cut to the model's token window; also stored as the vector store document"""
+        return truncate_tokens(email['body'])
+    
+    @staticmethod
+    def _metadata(email: Dict) -> Dict:
+        """Typed metadata so the store can range-filter on numbers and dates"""
+        metadata = {
+            'sender': email['sender'],
+            'subject': email['subject'],
+            'discount': int(email.get('discount') or 0),
+            'promotion_type': email.get('promotion_type', 'other'),
+            'urgency_score': int(email.get('urgency_score') or 0),
+            'value_score': int(email.get('value_score') or 0)
+        }
+        # Chroma rejects None values, so emails without a date simply omit the field
+        date = email.get('date')
+        if hasattr(date, 'timestamp'):
+            metadata['date'] = int(date.timestamp())
+        return metadata
     
-    def semantic_search(self, query: str, n_results: int = 5) -> List[Dict]:
-        """Perform semantic search on stored emails"""
+    def semantic_search(self, query: str, n_results: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
+        """Perform semantic search on stored emails, optionally restricted by metadata filters"""
+        # Invalid filters raise ValueError to the caller rather than returning no hits
+        where = build_where(filters)
         try:
-            # Encode query
-            query_embedding = self.model.encode(query)
-            
-            # Search in vector DB
-            results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=n_results
-            )
-            
-            # Format results
-            formatted_results = []
-            if results['metadatas']:
-                for i, metadata in enumerate(results['metadatas'][0]):
-                    formatted_results.append({
-                        'sender': metadata.get('sender', ''),
-                        'subject': metadata.get('subject', ''),
-                        'discount': metadata.get('discount', '0'),
-                        'promotion_type': metadata.get('promotion_type', ''),
-                        'relevance_score': 1 - results['distances'][0][i]
-                    })
-            
-            return formatted_results
+            # Concurrent callers are coalesced into one encode + one multi-query search
+            if self.search_batcher is not None:
+                return self.search_batcher.submit((query, n_results, where))
+            result = self.search_batch([(query, n_results, where)])[0]
+            if isinstance(result, Exception):
+                raise result
+            return result
             
         except Exception as e:
             print(f"Semantic search error: {e}")
             return []
     
+    def search_batch(self, requests: List[Tuple[str, int, Optional[Dict]]]) -> List[List[Dict]]:
+        """Answer (query, n_results, where) requests with one encode and one query per distinct filter.
+
+        A filter group whose query fails gets the exception as the result of each of its
+        requests, so one bad filter does not fail the other requests in the batch.
+        """
+        # Encode all queries together
+        embeddings = self._encode([query for query, _, _ in requests])
+        
+        # Requests sharing a filter share a vector store call, fetching the largest k
+        groups = {}
+        for i, (_, _, where) in enumerate(requests):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+        
+        results = [None] * len(requests)
+        with metrics.timer('vector_search', items=len(requests)):
+            for indices in groups.values():
+                where = requests[indices[0]][2]
+                k = max(requests[i][1] for i in indices)
+                try:
+                    hits = self.vector_store.query([embeddings[i] for i in indices], n_results=k, where=where)
+                except Exception as e:
+                    for i in indices:
+                        results[i] = e
+                    continue
+                for i, query_hits in zip(indices, hits):
+                    results[i] = [self._format_hit(hit) for hit in query_hits[:requests[i][1]]]
+        return results
+    
+    @staticmethod
+    def _format_hit(hit: Dict) -> Dict:
+        metadata = hit['metadata']
+        return {
+            'sender': metadata.get('sender', ''),
+            'subject': metadata.get('subject', ''),
+            'discount': metadata.get('discount', 0),
+            'promotion_type': metadata.get('promotion_type', ''),
+            'urgency_score': metadata.get('urgency_score', 0),
+            'date': metadata.get('date'),
+            'relevance_score': hit['score']
+        }
+    
     def get_ai_recommendations(self, user_preferences: Dict) -> List[Dict]:
         """Get AI-powered recommendations based on user preferences"""
         # This would use OpenAI API in production
@@ -1,21 +1,20 @@
-from flask import Flask, request, jsonify, @app.route('/health', methods=['GET', 'OPTIONS'])
-def health():
-    if request.method == 'OPTIONS':
-        response = make_response()
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
-        return response
-        
-    return jsonify({
-        "status": "healthy",
-        "gmail_connected": gmail is not None and gmail.service is not None if gmail_available else False,
-        "connected_email": gmail.user_email if gmail and hasattr(gmail, 'user_email') else None
-    }), 200sponse
+from flask import Flask, request, jsonify, make_response, session, redirect, Response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import json
+import atexit
+from datetime import datetime, timedelta
 from email_analyzer import EmailAnalyzer
 from ai_classifier import AIClassifier
+from job_queue import JobQueue
+from aggregate_store import AggregateStore
+from expiry import ExpiryIndex, extract_expiry
+from email_record import EmailRecord, to_dicts
+from text_normalizer import NORMALIZE_BODIES, normalize_body
+from realtime_stream import REALTIME_WINDOW_EMAILS, EventBroadcaster, RealtimeMonitor
+from response_cache import CachedResponse, ResponseCache, dumps, file_fingerprint, fingerprint
+from exporter import EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_chunks, pa, store_batches
+from instrumentation import metrics
 import os
 from dotenv import load_dotenv
 
@@ -30,7 +29,20 @@ except ImportError:
 
 load_dotenv()
 
+SAMPLE_EMAILS_PATH = '../data/sample_emails.txt'
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify through response_cache.dumps (orjson when installed), same output format"""
+    
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000", "http://localhost:5000"],
@@ -39,10 +51,44 @@ CORS(app, resources={
     }
 })
 
-# Initialize analyzers
+# Initialize analyzers (the embedding model and vector store load lazily)
 email_analyzer = EmailAnalyzer()
 ai_classifier = AIClassifier()
 
+# Cache and dedup effectiveness, read at scrape time
+metrics.register_gauge(
+    'embedding_cache_hit_rate',
+    lambda: ai_classifier.embedding_cache.stats()['hit_rate'],
+    'Fraction of embedding lookups served from the cache'
+)
+metrics.register_gauge(
+    'near_duplicate_ratio',
+    lambda: ai_classifier.dedup.stats()['dedup_ratio'] if ai_classifier.dedup else None,
+    'Fraction of checked emails suppressed as near-duplicates'
+)
+
+# Background jobs for long-running analyses (JOB_CONCURRENCY workers)
+job_queue = JobQueue()
+
+# Running analytics over every classified email (AGGREGATE_STORE_PATH)
+aggregate_store = AggregateStore.load()
+atexit.register(aggregate_store.flush)
+
+# Classified deals ordered by expiry for "expiring soon" queries
+expiry_index = ExpiryIndex()
+
+# Serialized analyze/search responses keyed by an input fingerprint
+response_cache = ResponseCache()
+metrics.register_gauge(
+    'response_cache_hit_rate',
+    lambda: response_cache.stats()['hit_rate'],
+    'Fraction of cacheable requests served without recomputing'
+)
+
+# Warm the model up in the background so /health answers immediately
+if os.getenv('MODEL_WARMUP', '1') == '1':
+    ai_classifier.warm_up(background=True)
+
 # Try to initialize Gmail if available
 if gmail_available:
     try:
@@ -96,36 +142,174 @@ def oauth2callback():
 def health():
     return jsonify({
         'status': 'healthy',
+        'model_status': ai_classifier.status,
+        'model_ready': ai_classifier.ready,
+        'model_error': ai_classifier.load_error,
+        'encoder': ai_classifier.encoder_name,
+        'indexed_emails': len(ai_classifier._manifest) if ai_classifier._manifest is not None else None,
         'auth_configured': os.path.exists('credentials.json'),
         'authenticated': 'credentials' in session,
-        'session_active': bool(session)
+        'session_active': bool(session),
+        'gmail_connected': gmail is not None and gmail.service is not None if gmail_available else False,
+        'connected_email': gmail.user_email if gmail_available and gmail and gmail.user_email else None
     }), 200
+
+def _to_records(emails):
+    """Gmail message dicts to EmailRecords, normalized and with the discount and deadline
+    extract_email_info would find"""
+    records = []
+    for email in emails:
+        body = normalize_body(email['body']) if NORMALIZE_BODIES else email['body']
+        records.append(EmailRecord(
+            email['sender'],
+            email['subject'],
+            body,
+            email['date'],
+            discount=email_analyzer.matcher.scan(body).discount,
+            expiry=extract_expiry(f"{email['subject']} {body}", email['date']),
+            message_id=email.get('id')
+        ))
+    return records
+
+def _classify(emails, job=None):
+    """Classify emails, reporting per-batch progress to a background job"""
+    if job is None:
+        classified_emails = ai_classifier.classify_promotions(emails)
+    else:
+        # 'stored' counts what the vector DB writes actually stored, so skipped
+        # duplicates and failed writes are not reported as stored
+        classified_emails = []
+        for email in ai_classifier.classify_stream(emails, on_stored=lambda count: job.advance('stored', count)):
+            classified_emails.append(email)
+            job.advance('classified')
+    
+    # Newly seen emails update the dashboard aggregates and the expiry index incrementally
+    aggregate_store.add_many(classified_emails)
+    expiry_index.add_many(classified_emails)
+    return classified_emails
+
+def _run_analyze(emails_text, job=None):
+    """Parse, classify and aggregate raw email text; returns (payload, status)"""
+    if not emails_text:
+        with open(SAMPLE_EMAILS_PATH, 'r') as f:
+            emails_text = f.read()
+    
+    emails = email_analyzer.parse_emails(emails_text)
+    if job:
+        job.set_total(len(emails))
+        job.advance('fetched', len(emails))
+    
+    classified_emails = _classify(emails, job)
+    analytics = email_analyzer.generate_analytics(classified_emails)
+    
+    return {
+        "success": True,
+        "data": analytics,
+        "source": "demo_data"
+    }, 200
+
+def _fetch_gmail(days_back, max_emails):
+    print(f"📧 Fetching emails from last {days_back} days...")
+    with metrics.timer('gmail_fetch') as timer:
+        emails = gmail.get_promotional_emails(
+            max_results=max_emails,
+            days_back=days_back
+        )
+        timer.items = len(emails or [])
+    return emails
+
+def _run_analyze_gmail(days_back, max_emails, job=None, emails=None):
+    """Fetch (unless ``emails`` are given), classify and aggregate Gmail promotions; returns (payload, status)"""
+    if emails is None:
+        emails = _fetch_gmail(days_back, max_emails)
+    
+    if not emails:
+        return {
+            "success": False,
+            "message": "No promotional emails found in your Gmail",
+            "connected_email": gmail.user_email
+        }, 404
+    
+    if job:
+        job.set_total(len(emails))
+        job.advance('fetched', len(emails))
+    
+    print(f"🤖 Analyzing {len(emails)} emails...")
+    
+    # Convert Gmail format to our analyzer format
+    formatted_emails = _to_records(emails)
+    
+    # Analyze using existing analyzer
+    classified_emails = _classify(formatted_emails, job)
+    analytics = email_analyzer.generate_analytics(classified_emails)
+    
+    # Add Gmail-specific info
+    analytics['connected_email'] = gmail.user_email
+    analytics['source'] = 'gmail'
+    
+    return {
+        "success": True,
+        "data": analytics,
+        "email_count": len(emails),
+        "source": "Gmail",
+        "connected_email": gmail.user_email
+    }, 200
+
+def _cached_json(key, compute):
+    """JSON response for compute() -> (payload, status), computed once per input fingerprint ``key``"""
+    entry = response_cache.get_or_compute(key, compute)
+    response = app.response_class(entry.body, status=entry.status, mimetype='application/json')
+    response.cached_entry = entry
+    return response
+
+@app.after_request
+def _negotiate_json(response):
+    """ETag/304 and gzip/brotli for JSON responses; cached entries reuse their compressed bytes"""
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+    
+    entry = getattr(response, 'cached_entry', None) or CachedResponse(response.get_data())
+    # HEAD is answered like GET; werkzeug drops the body
+    method = 'GET' if request.method == 'HEAD' else request.method
+    status, headers, body = entry.render(
+        method,
+        request.headers.get('If-None-Match'),
+        request.headers.get('Accept-Encoding')
+    )
+    response.status_code = status
+    response.set_data(body)
+    response.headers.update(headers)
+    return response
+
+def _submit_job(kind, params, fn):
+    """Queue a background job (or join an identical running one) and return 202"""
+    job, created = job_queue.submit(kind, params, fn)
     return jsonify({
-        "status": "healthy",
-        "gmail_connected": gmail is not None and gmail.service is not None,
-        "connected_email": gmail.user_email if gmail and gmail.user_email else None
-    }), 200
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "deduplicated": not created,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
 
-@app.route('/analyze', methods=['POST'])
+@app.route('/analyze', methods=['GET', 'POST'])
 def analyze_emails():
-    """Original analyze endpoint for demo data"""
+    """Original analyze endpoint for demo data (pass "async": true to run as a job)"""
     try:
-        data = request.json
+        data = request.json if request.method == 'POST' else {}
         emails_text = data.get('emails_text', '')
         
-        if not emails_text:
-            with open('../data/sample_emails.txt', 'r') as f:
-                emails_text = f.read()
+        if data.get('async'):
+            return _submit_job(
+                'analyze',
+                {'emails_text': emails_text},
+                lambda job: _run_analyze(emails_text, job)
+            )
         
-        emails = email_analyzer.parse_emails(emails_text)
-        classified_emails = ai_classifier.classify_promotions(emails)
-        analytics = email_analyzer.generate_analytics(classified_emails)
-        
-        return jsonify({
-            "success": True,
-            "data": analytics,
-            "source": "demo_data"
-        }), 200
+        # Same text (or an unchanged sample file) is served from the response cache
+        source = fingerprint(emails_text) if emails_text else file_fingerprint(SAMPLE_EMAILS_PATH)
+        return _cached_json(('analyze', source), lambda: _run_analyze(emails_text))
         
     except Exception as e:
         return jsonify({
@@ -135,7 +319,7 @@ def analyze_emails():
 
 @app.route('/analyze-gmail', methods=['POST'])
 def analyze_gmail():
-    """Analyze real Gmail promotional emails"""
+    """Analyze real Gmail promotional emails (pass "async": true to run as a job)"""
     if not gmail or not gmail.service:
         return jsonify({
             "success": False,
@@ -147,46 +331,17 @@ def analyze_gmail():
         days_back = data.get('days_back', 30)
         max_emails = data.get('max_emails', 50)
         
-        print(f"📧 Fetching emails from last {days_back} days...")
-        emails = gmail.get_promotional_emails(
-            max_results=max_emails,
-            days_back=days_back
-        )
-        
-        if not emails:
-            return jsonify({
-                "success": False,
-                "message": "No promotional emails found in your Gmail",
-                "connected_email": gmail.user_email
-            }), 404
-        
-        print(f"🤖 Analyzing {len(emails)} emails...")
+        if data.get('async'):
+            return _submit_job(
+                'analyze-gmail',
+                {'days_back': days_back, 'max_emails': max_emails, 'account': gmail.user_email},
+                lambda job: _run_analyze_gmail(days_back, max_emails, job)
+            )
         
-        # Convert Gmail format to our analyzer format
-        formatted_emails = []
-        for email in emails:
-            formatted_emails.append({
-                'sender': email['sender'],
-                'subject': email['subject'],
-                'body': email['body'],
-                'date': email['date']
-            })
-        
-        # Analyze using existing analyzer
-        classified_emails = ai_classifier.classify_promotions(formatted_emails)
-        analytics = email_analyzer.generate_analytics(classified_emails)
-        
-        # Add Gmail-specific info
-        analytics['connected_email'] = gmail.user_email
-        analytics['source'] = 'gmail'
-        
-        return jsonify({
-            "success": True,
-            "data": analytics,
-            "email_count": len(emails),
-            "source": "Gmail",
-            "connected_email": gmail.user_email
-        }), 200
+        # Fetching is an incremental sync; analysis reruns only when the message set changes
+        emails = _fetch_gmail(days_back, max_emails)
+        key = ('analyze-gmail', gmail.user_email, fingerprint(*sorted(e['id'] for e in emails or [])))
+        return _cached_json(key, lambda: _run_analyze_gmail(days_back, max_emails, emails=emails))
         
     except Exception as e:
         print(f"Error in analyze_gmail: {str(e)}")
@@ -195,6 +350,21 @@ def analyze_gmail():
             "error": str(e)
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Stage progress and, once finished, the result of a background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "success": False,
+            "error": "Unknown job id"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        **job.to_dict()
+    }), 200
+
 @app.route('/search-gmail', methods=['POST'])
 def search_gmail():
     """Search Gmail for specific deals"""
@@ -214,28 +384,27 @@ def search_gmail():
                 "message": "Search query required"
             }), 400
         
-        results = gmail.search_deals(search_term)
+        with metrics.timer('gmail_search') as timer:
+            results = gmail.search_deals(search_term)
+            timer.items = len(results or [])
         
         if results:
-            # Format for analysis
-            formatted_emails = []
-            for email in results:
-                formatted_emails.append({
-                    'sender': email['sender'],
-                    'subject': email['subject'],
-                    'body': email['body'],
-                    'date': email['date']
-                })
-            
-            # Quick analysis
-            classified = ai_classifier.classify_promotions(formatted_emails[:10])
+            def search_payload():
+                # Format for analysis
+                formatted_emails = _to_records(results)
+                
+                # Quick analysis
+                classified = ai_classifier.classify_promotions(formatted_emails[:10])
+                
+                return {
+                    "success": True,
+                    "results": to_dicts(classified),
+                    "count": len(results),
+                    "query": search_term
+                }, 200
             
-            return jsonify({
-                "success": True,
-                "results": classified,
-                "count": len(results),
-                "query": search_term
-            }), 200
+            key = ('search-gmail', gmail.user_email, search_term, fingerprint(*(r['id'] for r in results)))
+            return _cached_json(key, search_payload)
         else:
             return jsonify({
                 "success": True,
@@ -249,9 +418,32 @@ def search_gmail():
             "error": str(e)
         }), 500
 
+def _fetch_realtime():
+    """The last 24h of promotions; after the first sync this is a history poll plus a cache read"""
+    with metrics.timer('gmail_fetch') as timer:
+        emails = gmail.get_promotional_emails(
+            max_results=REALTIME_WINDOW_EMAILS,
+            days_back=1
+        )
+        timer.items = len(emails or [])
+    return emails
+
+def _classify_realtime(emails):
+    return to_dicts(_classify(_to_records(emails)))
+
+# Urgent deals are pushed by one background poller that classifies each new
+# message once, however many dashboards are connected (started on first use)
+realtime_events = EventBroadcaster()
+realtime_poller = RealtimeMonitor(_fetch_realtime, _classify_realtime, realtime_events)
+metrics.register_gauge(
+    'realtime_subscribers',
+    lambda: realtime_events.subscriber_count,
+    'Connected /realtime-stream clients'
+)
+
 @app.route('/realtime-monitor', methods=['GET'])
 def realtime_monitor():
-    """Get latest promotional emails (last 24 hours)"""
+    """Get latest promotional emails (last 24 hours) from the shared realtime poller"""
     if not gmail or not gmail.service:
         return jsonify({
             "success": False,
@@ -259,40 +451,23 @@ def realtime_monitor():
         }), 503
         
     try:
-        emails = gmail.get_promotional_emails(
-            max_results=20,
-            days_back=1
-        )
+        realtime_poller.start()
+        # Until the loop's first poll lands, poll here (concurrent polls are serialized)
+        last_poll = realtime_poller.last_poll or realtime_poller.poll_once()
         
-        if emails:
-            formatted_emails = []
-            for email in emails:
-                formatted_emails.append({
-                    'sender': email['sender'],
-                    'subject': email['subject'],
-                    'body': email['body'],
-                    'date': email['date']
-                })
-            
-            # Quick classification
-            classified = ai_classifier.classify_promotions(formatted_emails)
-            
-            # Find urgent deals
-            urgent_deals = [e for e in classified if e.get('urgency_score', 0) >= 7]
-            
-            return jsonify({
-                "success": True,
-                "latest_emails": len(emails),
-                "urgent_deals": urgent_deals[:5],
-                "connected_email": gmail.user_email
-            }), 200
-        else:
-            return jsonify({
-                "success": True,
-                "latest_emails": 0,
-                "urgent_deals": [],
-                "connected_email": gmail.user_email
-            }), 200
+        # Urgent deals already classified by the poller, newest first
+        cutoff = datetime.now() - timedelta(days=1)
+        urgent_deals = [
+            event.data for event in realtime_events.recent('urgent_deal')
+            if event.data.get('date') and event.data['date'] >= cutoff
+        ]
+        
+        return jsonify({
+            "success": True,
+            "latest_emails": last_poll['window_emails'],
+            "urgent_deals": urgent_deals[:5],
+            "connected_email": gmail.user_email
+        }), 200
             
     except Exception as e:
         return jsonify({
@@ -300,14 +475,44 @@ def realtime_monitor():
             "error": str(e)
         }), 500
 
+@app.route('/realtime-stream', methods=['GET'])
+def realtime_stream():
+    """Server-Sent Events stream of urgent deals; resumes after Last-Event-ID on reconnect"""
+    if not gmail or not gmail.service:
+        return jsonify({
+            "success": False,
+            "error": "Gmail not connected"
+        }), 503
+    
+    realtime_poller.start()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscription = realtime_events.subscribe(last_event_id)
+    if subscription is None:
+        # Every stream holds a server thread; past the cap, clients retry instead of starving requests
+        return jsonify({
+            "success": False,
+            "error": "Too many realtime streams"
+        }), 503, {'Retry-After': '30'}
+    return Response(subscription.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx-style proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/search', methods=['POST'])
 def semantic_search():
     """Original semantic search endpoint"""
     try:
         data = request.json
         query = data.get('query', '')
+        n_results = int(data.get('n_results', 5))
         
-        results = ai_classifier.semantic_search(query)
+        # e.g. {"promotion_type": "flash_sale", "min_discount": 30, "start_date": "2024-01-01"}
+        filters = data.get('filters') or {}
+        try:
+            results = ai_classifier.semantic_search(query, n_results=n_results, filters=filters)
+        except ValueError as e:
+            return jsonify({"success": False, "error": f"Invalid filters: {e}"}), 400
         
         return jsonify({
             "success": True,
@@ -320,6 +525,116 @@ def semantic_search():
             "error": str(e)
         }), 500
 
+@app.route('/export', methods=['GET'])
+def export_classified():
+    """Stream every indexed email and its embedding, batch by batch.
+    
+    ?format=ndjson (default), parquet or arrow; ?embeddings=0 omits the vectors;
+    ?batch_size=N rows per chunk / Parquet row group.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            "success": False,
+            "error": f"Unknown format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}"
+        }), 400
+    if fmt != 'ndjson' and pa is None:
+        return jsonify({
+            "success": False,
+            "error": "pyarrow is not installed; only ndjson export is available"
+        }), 501
+    try:
+        batch_size = max(1, int(request.args.get('batch_size', EXPORT_BATCH_SIZE)))
+    except ValueError:
+        return jsonify({"success": False, "error": "batch_size must be an integer"}), 400
+    include_embeddings = request.args.get('embeddings', '1') != '0'
+    
+    try:
+        store = ai_classifier.vector_store
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 503
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    # No Content-Length: the body is sent chunked as batches are encoded
+    chunks = export_chunks(store_batches(store, batch_size, include_embeddings), fmt)
+    return Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=classified.{extension}',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _parse_time(text):
+    """ISO timestamp as naive local time, which is what the aggregates are bucketed in"""
+    value = datetime.fromisoformat(text)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+def _parse_window():
+    """Window from ?start=&end= (ISO) or ?hours=N; None means all time"""
+    end = _parse_time(request.args['end']) if request.args.get('end') else datetime.now()
+    if request.args.get('start'):
+        return _parse_time(request.args['start']), end
+    if request.args.get('hours'):
+        return end - timedelta(hours=float(request.args['hours'])), end
+    return None
+
+@app.route('/analytics', methods=['GET'])
+def analytics_summary():
+    """Aggregates over all classified emails, or over a time window, without rescanning emails"""
+    try:
+        window = _parse_window()
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid window: {e}"}), 400
+    
+    data = aggregate_store.window(*window) if window else aggregate_store.summary()
+    return jsonify({"success": True, "data": data}), 200
+
+@app.route('/analytics/series', methods=['GET'])
+def analytics_series():
+    """Hourly or daily rollups for charting (default: last 7 days by day)"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('hour', 'day'):
+        return jsonify({"success": False, "error": "granularity must be 'hour' or 'day'"}), 400
+    try:
+        window = _parse_window() or (datetime.now() - timedelta(days=7), datetime.now())
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid window: {e}"}), 400
+    
+    return jsonify({
+        "success": True,
+        "granularity": granularity,
+        "series": aggregate_store.series(*window, granularity=granularity)
+    }), 200
+
+@app.route('/expiring', methods=['GET'])
+def expiring_deals():
+    """Deals with at least ?min_discount=% expiring within ?hours= (default 48h, 0%)"""
+    try:
+        hours = float(request.args.get('hours', 48))
+        min_discount = float(request.args.get('min_discount', 0))
+        limit = int(request.args.get('limit', 20))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    expiry_index.prune()
+    deals = expiry_index.expiring(within_hours=hours, min_discount=min_discount, limit=limit)
+    for deal in deals:
+        deal['expiry'] = deal['expiry'].isoformat()
+    
+    return jsonify({
+        "success": True,
+        "deals": deals,
+        "count": len(deals)
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-stage latency, throughput and cache metrics in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     print("""
     ╔══════════════════════════════════════════════════════╗
@@ -327,7 +642,6 @@ if __name__ == '__main__':
     ║   With Gmail Integration Support                      ║
     ╚══════════════════════════════════════════════════════╝
     """)
-    app.run(host='0.0.0.0', port=5000, debug=True)
     
     if gmail and gmail.service:
         print(f"    ✅ Gmail Connected: {gmail.user_email}")
@@ -338,13 +652,22 @@ if __name__ == '__main__':
     print("""
     Available endpoints:
     - GET  /health           → Check API status
-    - POST /analyze          → Analyze demo emails
+    - POST /analyze          → Analyze demo emails (GET: cached sample analysis, ETag/304)
     - POST /analyze-gmail    → Analyze your Gmail (if connected)
+    - GET  /analytics        → Incremental aggregates (?hours=24 or ?start=&end=)
+    - GET  /expiring         → Deals expiring soon (?hours=48&min_discount=30)
+    - GET  /jobs/<job_id>    → Progress/result of an async analyze job
     - POST /search-gmail     → Search Gmail for deals
     - GET  /realtime-monitor → Check latest Gmail deals (24h)
+    - GET  /realtime-stream  → Urgent deals pushed as Server-Sent Events
     - POST /search           → Semantic search
+    - GET  /export           → Stream classified emails (?format=ndjson|parquet|arrow)
+    - GET  /metrics          → Prometheus metrics
     
     Press Ctrl+C to stop the server
     """)
     
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server (FLASK_DEBUG=1 turns on the debugger and reloader);
+    # in production run: gunicorn -c gunicorn.conf.py wsgi:app
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '5000')),
+            debug=os.getenv('FLASK_DEBUG', '0') == '1')
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Dashboard query cost: recomputing generate_analytics vs reading AggregateStore rollups.
+
+Also reports the cost of one save, whose size stays fixed as emails are added
+(the seen-filter and merge window are bounded). Inputs are classified
+EmailRecords from the seeded corpus (corpus.py), sent over the last --days days.
+
+Usage: python benchmarks/bench_aggregates.py [--emails 100000] [--days 90]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregate_store import AggregateStore
+from corpus import classified_emails
+from email_analyzer import EmailAnalyzer
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=90)
+    args = parser.parse_args()
+
+    emails = classified_emails(args.emails, start=date.today() - timedelta(days=args.days), days=args.days)
+    analyzer = EmailAnalyzer()
+    store = AggregateStore()
+
+    t0 = time.perf_counter()
+    store.add_many(emails)
+    ingest = time.perf_counter() - t0
+    print(f"{args.emails} emails over {args.days} days; ingest {ingest / args.emails * 1e6:.2f} us/email, "
+          f"{len(store.hourly)} hourly + {len(store.daily)} daily buckets")
+    path = os.path.join(tempfile.mkdtemp(), 'aggregates.json')
+    t0 = time.perf_counter()
+    store.save(path)
+    print(f"save {(time.perf_counter() - t0) * 1e3:.0f} ms, {os.path.getsize(path) / 1e6:.2f} MB")
+
+    now = datetime.now()
+    print(f"{'query':>22} {'recompute ms':>13} {'rollups ms':>11}")
+    print(f"{'all time':>22} {best_of(lambda: analyzer.generate_analytics(emails), 3):>13.2f} "
+          f"{best_of(store.summary):>11.3f}")
+    for label, hours in (('last 24h', 24), ('last 7d', 24 * 7), ('last 30d', 24 * 30)):
+        start = now - timedelta(hours=hours)
+        recompute = best_of(lambda: analyzer.generate_analytics([e for e in emails if e.date >= start]), 3)
+        rollups = best_of(lambda: store.window(start, now))
+        print(f"{label:>22} {recompute:>13.2f} {rollups:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
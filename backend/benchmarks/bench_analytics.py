@@ -0,0 +1,47 @@
+"""Compare the Python and columnar generate_analytics backends.
+
+Inputs are classified EmailRecords from the seeded corpus (corpus.py), sent
+over the last --days days so some deadlines fall in the critical window.
+
+Usage: python benchmarks/bench_analytics.py [--sizes 10000 100000 1000000] [--days 30]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar_analytics import generate_analytics_columnar, to_frame
+from corpus import classified_emails
+from email_analyzer import EmailAnalyzer
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    analyzer = EmailAnalyzer()
+    # columnar s includes converting the records; frame s starts from a DataFrame
+    print(f"{'emails':>9} {'python s':>10} {'to_frame s':>11} {'columnar s':>11} {'frame s':>9} {'same':>5}")
+    for n in args.sizes:
+        emails = classified_emails(n, start=date.today() - timedelta(days=args.days), days=args.days)
+        expected, python_time = timed(lambda: analyzer.generate_analytics(emails, backend='python'))
+        result, columnar_time = timed(lambda: generate_analytics_columnar(emails))
+        frame, convert_time = timed(lambda: to_frame(emails))
+        _, frame_time = timed(lambda: generate_analytics_columnar(frame))
+        print(f"{n:>9} {python_time:>10.3f} {convert_time:>11.3f} {columnar_time:>11.3f} "
+              f"{frame_time:>9.3f} {str(result == expected):>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Memory and throughput of EmailRecord versus the previous per-email dict.
+
+The dict baseline mirrors the old pipeline: a dict per email updated with the
+classification, including the per-email ai_summary f-string. The 'via get()'
+column runs the analytics loops through the mapping shim
+(``email.get(...)``/``email[...]``) as they were first written for records:
+about 2x slower than on dicts. generate_analytics now reads fields with
+getattr/dict.get mapped over the list (email_record.field_reader), which
+puts records at or below the dict time. Inputs are parsed emails from the
+seeded corpus (corpus.py).
+
+Usage: python benchmarks/bench_email_record.py [--emails 200000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_classifier import classify_with_rules
+from corpus import corpus_text
+from email_analyzer import EmailAnalyzer
+from email_record import EmailRecord
+
+
+def make_fields(n, seed=0):
+    """(sender, subject, body, date) of ``n`` parsed emails from the seeded corpus"""
+    return [(e.sender, e.subject, e.body, e.date) for e in EmailAnalyzer().parse_emails(corpus_text(n, seed=seed))]
+
+
+def build_dicts(fields, matcher):
+    emails = []
+    for sender, subject, body, date in fields:
+        email = {'sender': sender, 'subject': subject, 'body': body, 'date': date, 'discount': None, 'expiry': None}
+        email.update(classify_with_rules(email, matcher))
+        email['near_duplicate'] = False
+        email['ai_summary'] = f"Promotion from {email['sender']} offering {email.get('discount', 'special')}% discount"
+        emails.append(email)
+    return emails
+
+
+def build_records(fields, matcher):
+    emails = []
+    for sender, subject, body, date in fields:
+        email = EmailRecord(sender, subject, body, date)
+        # As AIClassifier.classify_promotions: slot writes, not update()
+        for key, value in classify_with_rules(email, matcher).items():
+            setattr(email, key, value)
+        email.near_duplicate = False
+        emails.append(email)
+    return emails
+
+
+def analytics_via_get(emails, now):
+    """EmailAnalyzer._generate_analytics_python as written against the mapping interface"""
+    promotion_types = Counter([e.get('promotion_type', 'other') for e in emails])
+    senders = Counter([e['sender'] for e in emails])
+    critical_deals = []
+    for email in emails:
+        if email.get('expiry'):
+            days_until = (email['expiry'] - now).days
+            if 0 <= days_until <= 2 and (email.get('discount') or 0) >= 30:
+                critical_deals.append({'sender': email['sender'], 'subject': email['subject'],
+                                       'discount': email['discount'], 'expires_in_days': days_until,
+                                       'urgency_score': email.get('urgency_score', 5)})
+    discounts = [e['discount'] for e in emails if e.get('discount')]
+    duplicates = sum(1 for e in emails if e.get('near_duplicate'))
+    return (dict(promotion_types), dict(senders.most_common(5)),
+            sorted(critical_deals, key=lambda x: x['expires_in_days'])[:10],
+            sum(discounts) / len(discounts) if discounts else 0, duplicates,
+            min([e['date'] for e in emails]).isoformat(), max([e['date'] for e in emails]).isoformat())
+
+
+def measure(build, fields, matcher):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    emails = build(fields, matcher)
+    elapsed = time.perf_counter() - t0
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return emails, elapsed, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=200_000)
+    args = parser.parse_args()
+
+    analyzer = EmailAnalyzer()
+    fields = make_fields(args.emails)
+
+    print(f"{args.emails} emails")
+    print(f"{'representation':>15} {'bytes/email':>12} {'build+classify s':>17} {'analytics s':>12} "
+          f"{'via get() s':>12}")
+    for name, build in (('dict', build_dicts), ('EmailRecord', build_records)):
+        # Measured separately so tracemalloc overhead does not skew the timings
+        _, _, memory = measure(build, fields, analyzer.matcher)
+        t0 = time.perf_counter()
+        emails = build(fields, analyzer.matcher)
+        build_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        analyzer.generate_analytics(emails, backend='python')
+        analytics_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        analytics_via_get(emails, datetime.now())
+        get_time = time.perf_counter() - t0
+        print(f"{name:>15} {memory / args.emails:>12.0f} {build_time:>17.3f} {analytics_time:>12.3f} "
+              f"{get_time:>12.3f}")
+        del emails
+
+
+if __name__ == '__main__':
+    main()
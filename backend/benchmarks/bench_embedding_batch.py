@@ -0,0 +1,61 @@
+"""Compare per-email vs batched embedding + vector DB writes.
+
+Inputs are emails from the seeded corpus (corpus.py), parsed by EmailAnalyzer.
+
+Usage: python benchmarks/bench_embedding_batch.py [--emails 2000] [--batch-size 64]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_classifier import AIClassifier
+from corpus import generate
+from email_analyzer import EmailAnalyzer
+
+
+def make_emails(n, seed):
+    """Parsed corpus emails without repeats, so both runs embed and store every email"""
+    analyzer = EmailAnalyzer()
+    return [analyzer.extract_email_info(block)
+            for block in generate(n, seed=seed, duplicate_rate=0, near_duplicate_rate=0)]
+
+
+def run_per_email(classifier, emails):
+    """The original loop: one encode and one vector DB write per email"""
+    for email in emails:
+        embedding = classifier.model.encode(email['body'])
+        email.update(classifier._classify_single_email(email))
+        classifier._store_in_vectordb(email, embedding)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    classifier = AIClassifier(batch_size=args.batch_size)
+    classifier.model.encode(['warm up'])
+
+    # Different seeds: emails indexed by the first run would be skipped by the second
+    per_email_emails, batched_emails = make_emails(args.emails, seed=1), make_emails(args.emails, seed=2)
+
+    t0 = time.perf_counter()
+    run_per_email(classifier, per_email_emails)
+    per_email = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    classifier.classify_promotions(batched_emails)
+    batched = time.perf_counter() - t0
+
+    print(f"emails: {args.emails}, batch size: {args.batch_size}")
+    print(f"per-email loop: {args.emails / per_email:10.1f} emails/sec ({per_email:.2f}s)")
+    print(f"batched:        {args.emails / batched:10.1f} emails/sec ({batched:.2f}s)")
+    print(f"speedup:        {per_email / batched:10.2f}x")
+
+
+if __name__ == '__main__':
+    main()
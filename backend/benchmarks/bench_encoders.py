@@ -0,0 +1,116 @@
+"""Encoder backends: emails/sec and search quality of fp32, int8 and hashing embeddings.
+
+Bodies come from the synthetic corpus, cut to the model window the way
+AIClassifier embeds them. Search quality is measured two ways:
+
+- recall@k against the exact top-k neighbours of the fp32 sentence-transformer
+  (needs sentence-transformers installed), for the same queries.
+- precision@k on labelled product queries: the fraction of the top k whose body
+  mentions the queried product. "literal" queries name the product, while
+  "paraphrase" queries describe it in other words ("earbuds" for headphones).
+  Lexical encoders like hashing only do well on the literal set.
+
+Torch backends are timed at each --threads count.
+
+Usage: python benchmarks/bench_encoders.py [--emails 2000] [--backends sentence-transformer,int8,hashing] [--threads 1,2,4]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import PRODUCTS, corpus_text
+from encoders import ENCODERS, available_cpus, create_encoder
+
+PARAPHRASES = {
+    'running shoes': 'sneakers for jogging',
+    'denim': 'jeans',
+    'headphones': 'earbuds and audio gear',
+    'coffee makers': 'espresso machines',
+    'yoga gear': 'workout mats and leggings',
+    'lamps': 'lighting for the living room',
+    'wallets': 'leather billfolds',
+    'boots': 'winter footwear',
+    'tees': 't-shirts',
+    'watches': 'wristwatches',
+    'skincare': 'moisturizer and face cream',
+    'cookware': 'pots and pans',
+    'backpacks': 'bags for school and travel',
+    'jackets': 'coats and outerwear',
+    'bedding': 'sheets and duvet covers'
+}
+
+
+def load_bodies(n):
+    from ai_classifier import AIClassifier
+    from email_analyzer import EmailAnalyzer
+
+    emails = EmailAnalyzer().parse_emails(corpus_text(n, seed=4, duplicate_rate=0, near_duplicate_rate=0))
+    return [AIClassifier._embedding_text(email) for email in emails]
+
+
+def top_k(documents, queries, k):
+    scores = queries @ documents.T
+    return np.argsort(-scores, axis=1, kind='stable')[:, :k]
+
+
+def precision(hits, bodies, products):
+    return np.mean([np.mean([product in bodies[i].lower() for i in row]) for row, product in zip(hits, products)])
+
+
+def measure(encoder, bodies, batch_size):
+    encoder.encode(bodies[:batch_size], batch_size=batch_size)
+    t0 = time.perf_counter()
+    documents = encoder.encode(bodies, batch_size=batch_size)
+    return len(bodies) / (time.perf_counter() - t0), documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--backends', default=','.join(ENCODERS))
+    parser.add_argument('--threads', default=str(available_cpus()), help='torch intra-op thread counts')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.emails)
+    literal = [f"{product} sale" for product in PRODUCTS]
+    paraphrase = [PARAPHRASES[product] for product in PRODUCTS]
+    reference = None
+
+    print(f"{len(bodies)} emails, {len(PRODUCTS)} product queries x2, k={args.k}, {available_cpus()} CPUs available")
+    print(f"{'backend':>21} {'encoder':>22} {'dim':>5} {'threads':>7} {'emails/s':>9} "
+          f"{'recall@k vs fp32':>17} {'P@k literal':>12} {'P@k paraphrase':>15}")
+    for backend in args.backends.split(','):
+        try:
+            encoder = create_encoder(backend)
+        except ImportError as e:
+            print(f"{backend:>21}   skipped: {e}")
+            continue
+
+        thread_counts = [int(t) for t in args.threads.split(',')] if hasattr(encoder, 'threads') else [None]
+        for threads in thread_counts:
+            if threads is not None:
+                import torch
+                torch.set_num_threads(threads)
+            rate, documents = measure(encoder, bodies, args.batch_size)
+
+            queries = encoder.encode(literal + paraphrase, batch_size=args.batch_size)
+            hits = top_k(documents, queries, args.k)
+            if backend == 'sentence-transformer' and reference is None:
+                reference = hits
+            overlap = (np.mean([len(set(h) & set(r)) / args.k for h, r in zip(hits, reference)])
+                       if reference is not None else None)
+            print(f"{backend:>21} {encoder.name:>22} {documents.shape[1]:>5} {threads or '-':>7} {rate:>9,.0f} "
+                  f"{'-' if overlap is None else f'{overlap:.3f}':>17} "
+                  f"{precision(hits[:len(PRODUCTS)], bodies, PRODUCTS):>12.3f} "
+                  f"{precision(hits[len(PRODUCTS):], bodies, PRODUCTS):>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
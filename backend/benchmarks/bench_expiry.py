@@ -0,0 +1,85 @@
+"""Expiry extraction throughput and "expiring soon" queries: ExpiryIndex vs a linear scan.
+
+Usage: python benchmarks/bench_expiry.py [--deals 200000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import corpus_text
+from email_analyzer import EmailAnalyzer
+from expiry import ExpiryIndex, extract_expiry
+
+PHRASES = [
+    'Flash sale ends tonight at midnight.', 'Offer expires 10/31.', 'Only 48 hours left!',
+    'Sale ends in 3 days.', 'Valid through December 15, 2026.', 'This weekend only.',
+    'Ends Sunday.', 'New arrivals are here, shop the collection.', 'Save 20% by 11/30.'
+]
+
+
+def linear_scan(deals, now, hours, min_discount, limit):
+    """What generate_analytics does today: check every deal against the clock"""
+    horizon = now + timedelta(hours=hours)
+    hits = [d for d in deals if now <= d['expiry'] <= horizon and (d['discount'] or 0) >= min_discount]
+    return sorted(hits, key=lambda d: d['expiry'])[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--deals', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime.now()
+    texts = [f"{rng.choice(PHRASES)} Take {rng.choice([10, 20, 30, 50])}% off." for _ in range(50_000)]
+    t0 = time.perf_counter()
+    found = sum(1 for text in texts if extract_expiry(text, now) is not None)
+    elapsed = time.perf_counter() - t0
+    print(f"extract_expiry, phrases: {len(texts) / elapsed:,.0f} texts/s, deadline found in {found / len(texts):.0%}")
+    emails = EmailAnalyzer().parse_emails(corpus_text(20_000, seed=1))
+    texts = [(f"{email['subject']} {email['body']}", email['date']) for email in emails]
+    t0 = time.perf_counter()
+    found = sum(1 for text, sent in texts if extract_expiry(text, sent) is not None)
+    elapsed = time.perf_counter() - t0
+    print(f"extract_expiry, corpus emails: {len(texts) / elapsed:,.0f} texts/s, "
+          f"deadline found in {found / len(texts):.0%}")
+
+    deals = [{
+        'email_id': f"email_{i}",
+        'sender': f"store{i % 500}",
+        'subject': '',
+        'discount': rng.choice([0, 10, 20, 30, 40, 50, 60, 70]),
+        'expiry': now + timedelta(minutes=rng.randrange(-7 * 24 * 60, 60 * 24 * 60))
+    } for i in range(args.deals)]
+    for batch in (args.deals, 500, 1):
+        index = ExpiryIndex()
+        t0 = time.perf_counter()
+        for start in range(0, args.deals, batch):
+            index.add_many(deals[start:start + batch])
+        print(f"index build, batches of {batch}: {(time.perf_counter() - t0) / args.deals * 1e6:.2f} us/deal, "
+              f"{len(index)} deals")
+
+    print(f"{'query':>24} {'scan ms':>9} {'index ms':>9}")
+    for hours, min_discount in ((6, 50), (48, 30), (24 * 7, 0)):
+        for name, fn in (('scan', lambda: linear_scan(deals, now, hours, min_discount, 20)),
+                         ('index', lambda: index.expiring(hours, min_discount, 20, now=now))):
+            t0 = time.perf_counter()
+            for _ in range(args.queries if name == 'index' else max(1, args.queries // 20)):
+                result = fn()
+            runs = args.queries if name == 'index' else max(1, args.queries // 20)
+            if name == 'scan':
+                scan_ms, expected = (time.perf_counter() - t0) / runs * 1e3, [d['email_id'] for d in result]
+            else:
+                index_ms = (time.perf_counter() - t0) / runs * 1e3
+                assert [d['email_id'] for d in result] == expected
+        print(f"{f'{hours}h, >= {min_discount}%':>24} {scan_ms:>9.2f} {index_ms:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Bulk export throughput and peak memory: streamed batches vs materializing the result set.
+
+Builds a NumpyVectorStore of synthetic classified emails (384-dim embeddings),
+then exports it in each format in a fresh subprocess so peak RSS is measured
+per run. "streamed" runs go through exporter.export_chunks batch by batch; the
+"materialized" baselines load every record into one pandas DataFrame first and
+write it with DataFrame.to_json / to_parquet. RSS after opening the store (ids,
+metadata and documents are held in memory by the store itself) is reported as
+the baseline.
+
+Usage: python benchmarks/bench_export.py [--emails 200000] [--batch-size 1000] [--no-embeddings]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_vector_store import DIM, INSERT_BATCH, make_vectors
+from corpus import HEADLINES, PRODUCTS, STORES
+
+RUNS = [('streamed', 'ndjson'), ('streamed', 'parquet'), ('streamed', 'arrow'),
+        ('materialized', 'ndjson'), ('materialized', 'parquet')]
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_store(path, n):
+    from vector_store import NumpyVectorStore
+
+    rng = random.Random(0)
+    store = NumpyVectorStore(path)
+    for start in range(0, n, INSERT_BATCH):
+        count = min(INSERT_BATCH, n - start)
+        documents, metadatas = [], []
+        for _ in range(count):
+            shop, product, discount = rng.choice(STORES), rng.choice(PRODUCTS), rng.randrange(10, 80, 5)
+            documents.append(f"{rng.choice(HEADLINES).format(d=discount, p=product)} Shop {shop} {product} today. "
+                             f"Offer ends soon, while supplies last. See store for details.")
+            metadatas.append({'sender': f"{shop} <deals@{shop.lower().replace(' ', '')}.example>",
+                              'subject': f"{shop}: {product} deal", 'discount': discount,
+                              'promotion_type': rng.choice(['flash_sale', 'clearance', 'bogo', 'free_shipping']),
+                              'urgency_score': rng.randint(1, 10), 'value_score': rng.randint(1, 10),
+                              'date': 1_700_000_000 + rng.randrange(0, 90 * 86_400)})
+        ids = [f"e{i}" for i in range(start, start + count)]
+        store.upsert(ids, make_vectors(count, seed=start), documents, metadatas)
+
+
+def _materialized(store, fmt, out_path, include_embeddings):
+    import pandas as pd
+
+    batch = next(store.iter_batches(max(1, store.count()), include_embeddings), None)
+    frame = pd.DataFrame(batch['metadatas'])
+    frame.insert(0, 'id', batch['ids'])
+    frame['document'] = batch['documents']
+    if include_embeddings:
+        frame['embedding'] = list(batch['embeddings'])
+    if fmt == 'parquet':
+        frame.to_parquet(out_path)
+    else:
+        frame.to_json(out_path, orient='records', lines=True)
+
+
+def worker(mode, fmt, store_path, batch_size, include_embeddings):
+    from exporter import store_batches, write_export
+    from vector_store import NumpyVectorStore
+
+    store = NumpyVectorStore(store_path)
+    baseline = _rss_mb()
+    out_path = tempfile.mktemp(suffix=f".{fmt}")
+    t0 = time.perf_counter()
+    if mode == 'streamed':
+        write_export(store_batches(store, batch_size, include_embeddings), out_path, fmt)
+    else:
+        _materialized(store, fmt, out_path, include_embeddings)
+    seconds = time.perf_counter() - t0
+    size = os.path.getsize(out_path)
+    os.remove(out_path)
+    print(json.dumps({'rows': store.count(), 'seconds': seconds, 'bytes': size,
+                      'baseline_rss_mb': baseline, 'peak_rss_mb': _rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--no-embeddings', action='store_true')
+    parser.add_argument('--worker', nargs=3, metavar=('MODE', 'FORMAT', 'STORE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    include_embeddings = not args.no_embeddings
+
+    if args.worker:
+        worker(*args.worker, args.batch_size, include_embeddings)
+        return
+
+    store_path = tempfile.mkdtemp()
+    t0 = time.perf_counter()
+    build_store(store_path, args.emails)
+    print(f"store: {args.emails:,} emails, {DIM}-dim embeddings, built in {time.perf_counter() - t0:.1f}s")
+    print(f"{'mode':>13} {'format':>8} {'rows/s':>10} {'MB out':>8} {'base RSS MB':>12} {'peak RSS MB':>12}")
+    for mode, fmt in RUNS:
+        command = [sys.executable, os.path.abspath(__file__), '--worker', mode, fmt, store_path,
+                   '--batch-size', str(args.batch_size)] + (['--no-embeddings'] if args.no_embeddings else [])
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            # A negative code is a signal, usually the OOM killer
+            reason = (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]
+            print(f"{mode:>13} {fmt:>8}   failed: {reason}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{mode:>13} {fmt:>8} {result['rows'] / result['seconds']:>10,.0f} {result['bytes'] / 1e6:>8.1f} "
+              f"{result['baseline_rss_mb']:>12.0f} {result['peak_rss_mb']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Filtered semantic search: in-index pre-filtering vs search-then-filter.
+
+Each filter is run three ways against the NumPy store:
+  unfiltered   plain top-k (baseline latency)
+  pre-filter   ``where`` applied on typed metadata columns before scoring
+  post-filter  over-fetch top-k * overfetch, then filter in Python (misses hits
+               when the filter is selective)
+
+Usage: python benchmarks/bench_filtered_search.py [--vectors 100000] [--queries 100] [--k 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_vector_store import DIM, INSERT_BATCH, make_vectors
+from vector_store import NumpyVectorStore, build_where
+
+PROMOTION_TYPES = ['flash_sale', 'clearance', 'bogo', 'percentage_off', 'free_shipping', 'other']
+SENDERS = [f"store{i}@shop.example" for i in range(200)]
+START_EPOCH = 1_700_000_000
+
+FILTERS = [
+    ('type=clearance', {'promotion_type': 'clearance'}),
+    ('discount>=50', {'min_discount': 50}),
+    ('sender+30d', {'sender': SENDERS[7], 'start_date': START_EPOCH + 60 * 86400}),
+    ('type+discount+date', {'promotion_type': ['flash_sale', 'bogo'], 'min_discount': 40,
+                            'max_discount': 70, 'start_date': START_EPOCH + 80 * 86400}),
+]
+
+
+def make_metadata(n, seed=0):
+    rng = np.random.default_rng(seed)
+    types = rng.choice(PROMOTION_TYPES, size=n, p=[0.1, 0.1, 0.05, 0.35, 0.15, 0.25])
+    senders = rng.integers(0, len(SENDERS), size=n)
+    discounts = rng.integers(0, 81, size=n)
+    dates = START_EPOCH + rng.integers(0, 90 * 86400, size=n)
+    return [{'sender': SENDERS[s], 'subject': '', 'promotion_type': str(t), 'discount': int(d),
+             'urgency_score': 0, 'value_score': 0, 'date': int(ts)}
+            for t, s, d, ts in zip(types, senders, discounts, dates)]
+
+
+def matches(metadata, filters):
+    """Reference Python predicate, used for post-filtering and ground truth"""
+    for field in ('promotion_type', 'sender'):
+        value = filters.get(field)
+        if value is None:
+            continue
+        allowed = value if isinstance(value, list) else [value]
+        if metadata[field] not in allowed:
+            return False
+    if 'min_discount' in filters and metadata['discount'] < filters['min_discount']:
+        return False
+    if 'max_discount' in filters and metadata['discount'] > filters['max_discount']:
+        return False
+    if 'start_date' in filters and metadata['date'] < filters['start_date']:
+        return False
+    return True
+
+
+def timed(fn, queries):
+    latencies, results = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        results.append(fn(query))
+        latencies.append(time.perf_counter() - t0)
+    return results, np.array(latencies) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--overfetch', type=int, default=10, help='post-filter fetches k * overfetch')
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors)
+    metadatas = make_metadata(args.vectors)
+    queries = make_vectors(args.queries, seed=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStore(os.path.join(tmp, 'store'))
+        for start in range(0, len(vectors), INSERT_BATCH):
+            end = min(len(vectors), start + INSERT_BATCH)
+            store.upsert([f"v{i}" for i in range(start, end)], vectors[start:end],
+                         [''] * (end - start), metadatas[start:end])
+
+        _, base = timed(lambda q: store.query([q], n_results=args.k)[0], queries)
+        print(f"{args.vectors} vectors, dim {DIM}, k={args.k}; unfiltered p50 {np.percentile(base, 50):.2f} ms")
+        print(f"{'filter':>20} {'selectivity':>11} {'pre p50 ms':>11} {'pre p99 ms':>11} "
+              f"{'post p50 ms':>12} {'post recall':>12}")
+
+        for name, filters in FILTERS:
+            where = build_where(filters)
+            selectivity = sum(matches(m, filters) for m in metadatas) / len(metadatas)
+
+            pre, pre_ms = timed(lambda q: store.query([q], n_results=args.k, where=where)[0], queries)
+
+            def post_filter(q):
+                hits = store.query([q], n_results=args.k * args.overfetch)[0]
+                return [hit for hit in hits if matches(hit['metadata'], filters)][:args.k]
+            post, post_ms = timed(post_filter, queries)
+
+            # Pre-filtering is exact, so it is the ground truth for post-filter recall
+            recall = np.mean([len({h['id'] for h in p} & {h['id'] for h in t}) / max(1, len(t))
+                              for p, t in zip(post, pre)])
+            print(f"{name:>20} {selectivity:>11.4f} {np.percentile(pre_ms, 50):>11.2f} "
+                  f"{np.percentile(pre_ms, 99):>11.2f} {np.percentile(post_ms, 50):>12.2f} {recall:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
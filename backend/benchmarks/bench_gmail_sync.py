@@ -0,0 +1,57 @@
+"""Gmail sync cost against a local fake server: cold sync, repeat poll and incremental poll.
+
+Compares fetch concurrency (sequential vs pooled workers) for the cold sync and
+counts the API requests each phase makes.
+
+Usage: python benchmarks/bench_gmail_sync.py [--messages 2000] [--latency-ms 5] [--workers 1,8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gmail import FakeMailbox, base_url, serve
+from gmail_connector import GmailConnector
+
+
+def phase(mailbox, fn):
+    before = mailbox.requests
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, mailbox.requests - before, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--new', type=int, default=20, help='messages arriving before the incremental poll')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated server latency per request')
+    parser.add_argument('--workers', default='1,8')
+    args = parser.parse_args()
+
+    print(f"{args.messages} promotions, {args.latency_ms} ms per request")
+    print(f"{'workers':>8} {'phase':>12} {'seconds':>9} {'requests':>9} {'emails':>7}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        mailbox = FakeMailbox()
+        mailbox.add(args.messages, age_days=6)
+        server = serve(mailbox, latency=args.latency_ms / 1000.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            connector = GmailConnector(access_token='fake', base_url=base_url(server),
+                                       cache_path=os.path.join(tmp, 'cache.sqlite3'),
+                                       workers=workers, sync_interval=0)
+            fetch = lambda: connector.get_promotional_emails(max_results=args.messages, days_back=7)
+            rows = [('cold sync',) + phase(mailbox, fetch),
+                    ('repeat poll',) + phase(mailbox, fetch)]
+            mailbox.add(args.new)
+            rows.append(('incremental',) + phase(mailbox, fetch))
+            connector.close()
+        server.shutdown()
+        for name, seconds, requests, emails in rows:
+            print(f"{workers:>8} {name:>12} {seconds:>9.3f} {requests:>9} {len(emails):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""Load test of the Flask API: mixed concurrent traffic against offline Gmail and model stand-ins.
+
+Starts benchmarks/fake_gmail.py (synthetic promotions over the Gmail REST API
+GmailConnector speaks) and the app in a subprocess. The app runs either as
+the dev server (python app.py, debug off as shipped, or on with --debug)
+or under gunicorn (gunicorn.conf.py). It uses a fresh numpy vector store and
+the hashing encoder, which is deterministic and needs no model download;
+--real-model switches to the sentence-transformer.
+
+Closed-loop clients, each on its own keep-alive connection, send a weighted mix
+of /analyze, /analyze-gmail, /search and /realtime-monitor for --duration
+seconds at each concurrency level. The report gives throughput, p50/p95/p99
+latency per endpoint, transport/5xx error rate and thread-safety failures:
+
+- 200 responses that break an invariant of their input. Examples: /analyze
+  counting a different number of emails than were sent, or /analyze-gmail
+  seeing a different message count than the fake mailbox holds.
+- Exceptions the server swallowed and logged ("Traceback", "... error: ...").
+
+Usage: python benchmarks/bench_load.py [--servers dev,gunicorn] [--concurrency 1,8,32] [--duration 20]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from corpus import PRODUCTS, corpus_text
+
+DEFAULT_MIX = 'analyze=2,analyze-gmail=1,search=6,realtime-monitor=2'
+SEARCH_QUERIES = [f"{product} sale" for product in PRODUCTS] + ['free shipping', 'flash sale ends tonight',
+                                                                'buy one get one free', 'clearance']
+# Lines a request thread or background loop prints when it swallows an exception
+SERVER_ERROR = re.compile(r'Traceback|[Ee]rror[: ]|failed:')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, path, check, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            body = response.read()
+            conn.close()
+            if check(response.status, body):
+                return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+class Server:
+    """The app in a subprocess (own process group, so the dev reloader's child is stopped too)"""
+
+    def __init__(self, kind, gmail_base, args):
+        self.kind = kind
+        self.port = free_port()
+        self.workdir = tempfile.mkdtemp(prefix=f"load-{kind}-")
+        self.log_path = os.path.join(self.workdir, 'server.log')
+        env = dict(os.environ,
+                   PORT=str(self.port),
+                   PYTHONUNBUFFERED='1',
+                   FLASK_DEBUG='1' if args.debug else '0',
+                   WEB_THREADS=str(args.threads),
+                   WEB_WORKERS='1',
+                   GMAIL_API_BASE=gmail_base,
+                   GMAIL_ACCESS_TOKEN='fake',
+                   GMAIL_CACHE_DB=os.path.join(self.workdir, 'gmail.sqlite3'),
+                   ENCODER_BACKEND='sentence-transformer' if args.real_model else 'hashing',
+                   VECTOR_BACKEND='numpy',
+                   VECTOR_STORE_DIR=os.path.join(self.workdir, 'vectors'),
+                   AGGREGATE_STORE_PATH=os.path.join(self.workdir, 'aggregates.json'))
+        env.pop('EMBED_CACHE_DIR', None)
+        if kind == 'dev':
+            command = [sys.executable, 'app.py']
+        elif kind == 'gunicorn':
+            command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+        else:
+            raise ValueError(f"Unknown server: {kind}")
+        self.log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=self.log,
+                                        stderr=subprocess.STDOUT, start_new_session=True)
+
+    def wait_ready(self, timeout):
+        def ready(status, body):
+            try:
+                return status == 200 and json.loads(body).get('model_ready')
+            except ValueError:
+                return False
+        return wait_for(self.port, '/health', ready, timeout) and self.process.poll() is None
+
+    def error_lines(self):
+        with open(self.log_path, errors='replace') as f:
+            return [line.rstrip() for line in f if SERVER_ERROR.search(line)]
+
+    def stop(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=15)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            os.killpg(self.process.pid, signal.SIGKILL)
+        self.log.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class Workload:
+    """Weighted request mix; each request comes with a check of its 200 response"""
+
+    def __init__(self, mix, analyze_inputs, analyze_emails, gmail_messages, gmail_max):
+        from email_analyzer import EmailAnalyzer
+
+        self.endpoints, self.weights = [], []
+        for item in mix.split(','):
+            name, _, weight = item.partition('=')
+            self.endpoints.append(name.strip())
+            self.weights.append(float(weight or 1))
+        parser = EmailAnalyzer()
+        self.analyze_bodies = []
+        for seed in range(analyze_inputs):
+            text = corpus_text(analyze_emails, seed=100 + seed)
+            self.analyze_bodies.append((json.dumps({'emails_text': text}), len(parser.parse_emails(text))))
+        self.gmail_max = gmail_max
+        self.gmail_expected = min(gmail_messages, gmail_max)
+
+    def request(self, rng):
+        """(endpoint, method, path, body, check) for one randomly drawn request"""
+        endpoint = rng.choices(self.endpoints, self.weights)[0]
+        if endpoint == 'analyze':
+            body, expected = rng.choice(self.analyze_bodies)
+            return endpoint, 'POST', '/analyze', body, \
+                lambda payload: payload['success'] and payload['data']['total_emails'] == expected
+        if endpoint == 'analyze-gmail':
+            body = json.dumps({'days_back': 7, 'max_emails': self.gmail_max})
+            return endpoint, 'POST', '/analyze-gmail', body, \
+                lambda payload: payload['success'] and payload['email_count'] == self.gmail_expected
+        if endpoint == 'search':
+            body = json.dumps({'query': rng.choice(SEARCH_QUERIES), 'n_results': 5})
+            return endpoint, 'POST', '/search', body, \
+                lambda payload: payload['success'] and len(payload['results']) <= 5 and all(
+                    'relevance_score' in hit for hit in payload['results'])
+        if endpoint == 'realtime-monitor':
+            return endpoint, 'GET', '/realtime-monitor', None, \
+                lambda payload: payload['success'] and payload['latest_emails'] >= 0 and len(
+                    payload['urgent_deals']) <= 5
+        raise ValueError(f"Unknown endpoint in mix: {endpoint}")
+
+
+def client(port, workload, seed, deadline, samples):
+    """One closed-loop client: send, wait, record (endpoint, seconds, outcome), repeat"""
+    rng = random.Random(seed)
+    conn = None
+    while time.time() < deadline:
+        endpoint, method, path, body, check = workload.request(rng)
+        headers = {'Content-Type': 'application/json'} if body else {}
+        t0 = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                conn.close()
+                conn = None
+            if response.status >= 500:
+                outcome = 'error'
+            elif response.status >= 400:
+                outcome = 'rejected'
+            else:
+                try:
+                    outcome = 'ok' if check(json.loads(data)) else 'invariant'
+                except (ValueError, KeyError, TypeError):
+                    outcome = 'invariant'
+        except (OSError, http.client.HTTPException):
+            outcome = 'error'
+            if conn is not None:
+                conn.close()
+            conn = None
+        samples.append((endpoint, time.perf_counter() - t0, outcome))
+    if conn is not None:
+        conn.close()
+
+
+def run_level(port, workload, concurrency, duration):
+    samples = []
+    deadline = time.time() + duration
+    threads = [threading.Thread(target=client, args=(port, workload, i, deadline, samples), daemon=True)
+               for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - t0
+
+
+def summarize(samples, elapsed):
+    rows = []
+    groups = defaultdict(list)
+    for endpoint, seconds, outcome in samples:
+        groups[endpoint].append((seconds, outcome))
+    groups['all'] = [(seconds, outcome) for _, seconds, outcome in samples]
+    for endpoint, values in sorted(groups.items(), key=lambda item: item[0] == 'all'):
+        latencies = np.array([seconds for seconds, _ in values]) * 1e3
+        outcomes = [outcome for _, outcome in values]
+        rows.append({
+            'endpoint': endpoint,
+            'requests': len(values),
+            'rps': len(values) / elapsed,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'error_rate': outcomes.count('error') / len(values),
+            'rejected': outcomes.count('rejected'),
+            'invariant_failures': outcomes.count('invariant')
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default='dev,gunicorn')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per concurrency level')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='endpoint=weight,...')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--debug', action='store_true', help='dev server with debugger/reloader')
+    parser.add_argument('--real-model', action='store_true', help='sentence-transformer instead of hashing')
+    parser.add_argument('--gmail-messages', type=int, default=300)
+    parser.add_argument('--gmail-max', type=int, default=100, help='max_emails per /analyze-gmail')
+    parser.add_argument('--gmail-latency-ms', type=float, default=5)
+    parser.add_argument('--analyze-inputs', type=int, default=8, help='distinct /analyze bodies')
+    parser.add_argument('--analyze-emails', type=int, default=50, help='emails per /analyze body')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    gmail_port = free_port()
+    gmail = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_gmail.py'),
+                              '--messages', str(args.gmail_messages), '--days', '5', '--port', str(gmail_port),
+                              '--latency-ms', str(args.gmail_latency_ms)],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    gmail_base = f"http://127.0.0.1:{gmail_port}/gmail/v1"
+    workload = Workload(args.mix, args.analyze_inputs, args.analyze_emails, args.gmail_messages, args.gmail_max)
+    results = []
+    try:
+        # Any answer means it is listening (unauthenticated requests get a 401)
+        if not wait_for(gmail_port, '/gmail/v1/users/me/profile', lambda status, _: status < 500, 30):
+            sys.exit("fake Gmail did not start")
+
+        print(f"mix {args.mix}; {'sentence-transformer' if args.real_model else 'hashing'} encoder; "
+              f"fake Gmail with {args.gmail_messages} messages, {args.gmail_latency_ms:g} ms/request")
+        print(f"{'server':>9} {'clients':>7} {'endpoint':>16} {'requests':>8} {'req/s':>8} {'p50 ms':>8} "
+              f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'invariant':>9} {'logged':>6}")
+        for kind in args.servers.split(','):
+            server = Server(kind, gmail_base, args)
+            try:
+                if not server.wait_ready(600 if args.real_model else 60):
+                    print(f"{kind:>9}   failed to start; see log:\n" + open(server.log_path).read()[-2000:])
+                    continue
+                for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                    logged_before = len(server.error_lines())
+                    samples, elapsed = run_level(server.port, workload, concurrency, args.duration)
+                    logged = server.error_lines()[logged_before:]
+                    for row in summarize(samples, elapsed):
+                        row.update(server=kind, concurrency=concurrency,
+                                   logged_errors=len(logged) if row['endpoint'] == 'all' else None)
+                        results.append(row)
+                        print(f"{kind:>9} {concurrency:>7} {row['endpoint']:>16} {row['requests']:>8} "
+                              f"{row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                              f"{row['p99_ms']:>8.1f} {row['error_rate']:>7.1%} {row['invariant_failures']:>9} "
+                              f"{'' if row['logged_errors'] is None else row['logged_errors']:>6}")
+                    for line in logged[:5]:
+                        print(f"{'':>17} server: {line[:160]}")
+            finally:
+                server.stop()
+    finally:
+        gmail.terminate()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'options': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Body normalization on HTML newsletters: throughput, size reduction and encode cost.
+
+Newsletters wrap the text of seeded corpus emails (corpus.py) the way ESP
+templates look: a <style> block, nested layout tables with inline CSS, a
+zero-width preheader, tracking pixels and an unsubscribe/legal footer. Encode
+cost uses the real tokenizer when transformers is installed, otherwise a stub
+whose cost is linear in token count.
+
+Usage: python benchmarks/bench_normalization.py [--emails 2000] [--max-tokens 256] [--seed 0]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import PRODUCTS, generate
+from text_normalizer import html_to_text, normalize_body, truncate_tokens
+from promotion_rules import get_default_matcher
+
+STYLE = """<style type="text/css">
+body{margin:0;padding:0;-webkit-text-size-adjust:100%}table{border-collapse:collapse}
+.container{width:600px!important}@media only screen and (max-width:600px){.container{width:100%!important}}
+.btn a{background:#e4002b;color:#fff;padding:12px 24px;border-radius:4px;text-decoration:none}
+</style>"""
+
+FOOTER = """<table class="footer" width="100%" cellpadding="0" cellspacing="0"><tr><td style="font-size:11px;color:#999;
+padding:24px" align="center"><p>You are receiving this email because you signed up at {store}.com.</p>
+<p><a href="https://{store}.com/u?e=abc123" style="color:#999">Unsubscribe</a> &middot;
+<a href="https://{store}.com/prefs" style="color:#999">Manage preferences</a> &middot;
+<a href="https://{store}.com/privacy" style="color:#999">Privacy Policy</a></p>
+<p>&copy; 2024 {store} Inc. All rights reserved. 123 Market Street, Suite 400, San Francisco, CA 94105</p>
+</td></tr></table>"""
+
+
+def make_newsletter(rng, i, block):
+    """Wrap one corpus email's text in an ESP-style layout"""
+    headers, _, body = block.partition('\nBody: ')
+    store = headers.split('From: ', 1)[1].split(' <', 1)[0].lower().replace(' ', '')
+    headline, *paragraphs = body.strip().split('\n')
+    offer = re.search(r'(\d+)(?:%| percent)', headline)
+    discount = int(offer.group(1)) if offer else 0
+    cells = []
+    for product in rng.sample(PRODUCTS, rng.randint(3, 8)):
+        price = rng.randint(20, 200)
+        cells.append(
+            f'<td class="product" width="50%" valign="top" style="padding:8px;font-family:Helvetica,Arial,sans-serif">'
+            f'<a href="https://{store}.com/p/{i}?utm_source=email&amp;utm_medium=newsletter"><img src="https://cdn.'
+            f'{store}.com/img/{product.replace(" ", "-")}.jpg" width="280" alt="" style="display:block;border:0"></a>'
+            f'<p style="margin:8px 0;font-size:16px;color:#333">{product.title()}</p>'
+            f'<p style="margin:0;font-size:14px"><s>${price}</s> <strong>${price * (100 - discount) // 100}'
+            f'</strong></p></td>')
+    rows = ''.join(f'<tr>{"".join(cells[j:j + 2])}</tr>' for j in range(0, len(cells), 2))
+    text = ''.join(f'<p style="font-size:16px">{paragraph}</p>' for paragraph in paragraphs)
+    preheader = headline + ' &#8203;&zwnj;&nbsp;' * 60
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{headline}</title>{STYLE}</head>'
+        f'<body style="margin:0;background:#f4f4f4">'
+        f'<div style="display:none;max-height:0;overflow:hidden">{preheader}</div>'
+        f'<table width="100%" cellpadding="0" cellspacing="0"><tr><td align="center">'
+        f'<table class="container" width="600" cellpadding="0" cellspacing="0" style="background:#fff">'
+        f'<tr><td style="padding:12px;font-size:11px" align="center"><a href="https://{store}.com/view/{i}">'
+        f'View this email in your browser</a></td></tr>'
+        f'<tr><td style="padding:24px" align="center"><h1 style="font-size:32px;color:#e4002b">{headline}</h1>'
+        f'{text}'
+        f'<p class="btn"><a href="https://{store}.com/sale?utm_campaign={i}">SHOP NOW &rarr;</a></p></td></tr>'
+        f'<tr><td><table width="100%">{rows}</table></td></tr>'
+        f'<tr><td>{FOOTER.format(store=store)}</td></tr>'
+        f'</table></td></tr></table>'
+        f'<img src="https://t.{store}.com/open.gif?id={i}" width="1" height="1" alt="">'
+        f'</body></html>'
+    )
+
+
+def _tag_strip_only(html):
+    """The previous Gmail path: tags and entities removed, nothing else"""
+    return ' '.join(html_to_text(html).split())
+
+
+def make_counter():
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained('sentence-transformers/all-MiniLM-L6-v2')
+        return 'MiniLM tokenizer', lambda text: len(tokenizer(text, truncation=False)['input_ids'])
+    except Exception:
+        word = re.compile(r'\w+|[^\w\s]')
+        return 'regex token estimate', lambda text: len(word.findall(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--max-tokens', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--us-per-token', type=float, default=20.0,
+                        help='stub encoder cost, roughly MiniLM on one CPU core')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    raw = [make_newsletter(rng, i, block)
+           for i, block in enumerate(generate(args.emails, seed=args.seed, html_rate=0))]
+    counter_name, count_tokens = make_counter()
+    matcher = get_default_matcher()
+
+    variants = {}
+    for name, prepare in (
+        ('raw html', lambda text: text),
+        ('tags stripped', _tag_strip_only),
+        ('normalized', normalize_body),
+        ('normalized+truncated', lambda text: truncate_tokens(normalize_body(text), args.max_tokens)),
+    ):
+        t0 = time.perf_counter()
+        texts = [prepare(text) for text in raw]
+        elapsed = time.perf_counter() - t0
+        variants[name] = (texts, elapsed)
+
+    print(f"{args.emails} newsletters, tokens counted with {counter_name}")
+    print(f"{'body':>22} {'prep ms/email':>14} {'chars':>8} {'tokens':>8} {'encode ms*':>11} {'rules us':>9}")
+    for name, (texts, elapsed) in variants.items():
+        chars = sum(map(len, texts)) / len(texts)
+        tokens = sum(count_tokens(text) for text in texts) / len(texts)
+        # Encoders truncate their input, so cost is bounded by the window whatever the length
+        encode_ms = min(tokens, args.max_tokens) * args.us_per_token / 1e3
+        t0 = time.perf_counter()
+        discounts = [matcher.scan(text).discount for text in texts]
+        rules_us = (time.perf_counter() - t0) / len(texts) * 1e6
+        print(f"{name:>22} {elapsed / len(texts) * 1e3:>14.3f} {chars:>8.0f} {tokens:>8.0f} "
+              f"{encode_ms:>11.2f} {rules_us:>9.1f}")
+        variants[name] = (texts, discounts)
+    print('* stub encode cost of the tokens that fit in the model window')
+
+    # What the model actually sees within its window
+    sample = variants['tags stripped'][0][0]
+    print(f"\nfirst {args.max_tokens} tokens, tags stripped:\n  {truncate_tokens(sample, args.max_tokens)[:300]}...")
+    sample = variants['normalized'][0][0]
+    print(f"first {args.max_tokens} tokens, normalized:\n  {truncate_tokens(sample, args.max_tokens)[:300]}...")
+
+    agree = sum(a == b for a, b in zip(variants['raw html'][1], variants['normalized'][1]))
+    print(f"\ndiscount agrees with raw html on {agree / len(raw):.1%} of emails")
+
+
+if __name__ == '__main__':
+    main()
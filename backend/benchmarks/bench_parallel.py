@@ -0,0 +1,51 @@
+"""Scaling benchmark for the process-pool parse + rule classification pipeline.
+
+The input is the seeded corpus from corpus.py, sent over the last 30 days so
+it has critical deals, and every run is checked against the serial result.
+
+Usage: python benchmarks/bench_parallel.py [--emails 200000] [--max-workers N] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import write_corpus
+from encoders import available_cpus
+from parallel_pipeline import analyze_parallel, analyze_serial
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=200_000)
+    parser.add_argument('--max-workers', type=int, default=available_cpus())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'corpus.txt')
+        write_corpus(path, args.emails, seed=args.seed, start=date.today() - timedelta(days=30), days=30)
+
+        t0 = time.perf_counter()
+        with open(path) as f:
+            expected = analyze_serial(f.read())
+        serial = time.perf_counter() - t0
+        print(f"{'serial':>8}: {serial:7.2f}s {args.emails / serial:10.0f} emails/sec")
+
+        workers = 1
+        while workers <= args.max_workers:
+            t0 = time.perf_counter()
+            result = analyze_parallel(path, workers=workers)
+            elapsed = time.perf_counter() - t0
+            same = result == expected
+            print(f"{workers:>5} wk: {elapsed:7.2f}s {args.emails / elapsed:10.0f} emails/sec "
+                  f"speedup {serial / elapsed:5.2f}x same={same}")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Realtime urgent-deal delivery: per-client polling vs one poller with SSE fan-out.
+
+Part 1 counts emails classified when every dashboard polls /realtime-monitor and
+re-classifies the 24h window, against one RealtimeMonitor that classifies new
+mail once. Part 2 measures EventBroadcaster publish cost and delivery latency
+with many concurrently reading subscribers.
+
+Usage: python benchmarks/bench_realtime.py [--clients 1,10,100,1000] [--events 2000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtime_stream import EventBroadcaster, RealtimeMonitor
+
+
+def classified_counts(clients, polls, window, new_per_poll):
+    """Emails classified over ``polls`` poll intervals, both ways"""
+    mailbox = [{'id': f"m{i}", 'urgency_score': 8 if i % 4 == 0 else 3} for i in range(window)]
+    counted = [0]
+
+    def classify(emails):
+        counted[0] += len(emails)
+        return emails
+
+    monitor = RealtimeMonitor(lambda: mailbox[-window:], classify, EventBroadcaster())
+    for _ in range(polls):
+        monitor.poll_once()
+        mailbox.extend({'id': f"m{len(mailbox) + i}", 'urgency_score': 3} for i in range(new_per_poll))
+    return clients * polls * window, counted[0]
+
+
+def fan_out(clients, events):
+    broadcaster = EventBroadcaster(history=events, max_queue=events)
+    subscriptions = [broadcaster.subscribe() for _ in range(clients)]
+    latencies = [[] for _ in range(clients)]
+
+    def reader(slot):
+        subscription = subscriptions[slot]
+        for _ in range(events):
+            event = subscription.get(timeout=10)
+            if event is None:
+                return
+            latencies[slot].append(time.perf_counter() - event.data['sent'])
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    t0 = time.perf_counter()
+    for i in range(events):
+        broadcaster.publish('urgent_deal', {'i': i, 'sent': time.perf_counter(), 'subject': 'Flash sale 50% off'})
+    publish_s = time.perf_counter() - t0
+    for thread in threads:
+        thread.join()
+    delivered = np.array([value for slot in latencies for value in slot]) * 1e3
+    return publish_s / events * 1e6, len(delivered) / (clients * events), np.percentile(delivered, 50), \
+        np.percentile(delivered, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='1,10,100,1000')
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--window', type=int, default=200, help='emails in the 24h window')
+    parser.add_argument('--new-per-poll', type=int, default=5)
+    parser.add_argument('--polls', type=int, default=120, help='one hour of 30s polls')
+    args = parser.parse_args()
+    client_counts = [int(c) for c in args.clients.split(',')]
+
+    print(f"emails classified over {args.polls} polls ({args.window} in window, {args.new_per_poll} new per poll)")
+    print(f"{'clients':>8} {'per-client polling':>19} {'shared poller':>14}")
+    for clients in client_counts:
+        polling, shared = classified_counts(clients, args.polls, args.window, args.new_per_poll)
+        print(f"{clients:>8} {polling:>19,} {shared:>14,}")
+
+    print(f"\nfan-out of {args.events} events")
+    print(f"{'clients':>8} {'publish us':>11} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for clients in client_counts:
+        publish_us, delivered, p50, p99 = fan_out(clients, args.events)
+        print(f"{clients:>8} {publish_us:>11.1f} {delivered:>10.1%} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Response layer: JSON encoder speed, bytes on the wire, and cached/conditional request latency.
+
+Covers four areas:
+
+- Encode time of Flask's stdlib JSON provider vs response_cache.dumps (orjson
+  when installed), on search-gmail-style payloads with bodies.
+- Compressed sizes, per encoding.
+- /analyze through the Flask test client: the first (computed) request vs
+  cached repeats, and GET with If-None-Match answered by 304. The encoder is
+  encoders.HashingEncoder.
+- simple_app.py over real sockets: a fresh connection per request vs
+  keep-alive, and a 304 revalidation.
+
+Usage: python benchmarks/bench_responses.py [--emails 2000] [--requests 200]
+"""
+import argparse
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MODEL_WARMUP', '0')
+os.environ.setdefault('ENCODER_BACKEND', 'hashing')
+
+from corpus import corpus_text
+from response_cache import brotli, compress, dumps, orjson
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return np.median(samples) * 1e3
+
+
+def encoder_and_sizes(app_module, emails_text):
+    from ai_classifier import classify_with_rules
+    from email_record import to_dicts
+    from flask.json.provider import DefaultJSONProvider
+
+    emails = app_module.email_analyzer.parse_emails(emails_text)
+    for email in emails:
+        email.update(classify_with_rules(email))
+    stdlib = DefaultJSONProvider(app_module.app)
+
+    print(f"encoder: {'orjson' if orjson else 'stdlib json'} (brotli {'available' if brotli else 'not installed'})")
+    print(f"{'payload':>22} {'flask json ms':>14} {'dumps ms':>9} {'identity B':>11} {'gzip B':>8} {'br B':>8}")
+    for label, count in (('search (10 emails)', 10), ('search (500 emails)', 500), ('all emails', len(emails))):
+        payload = {'success': True, 'results': to_dicts(emails[:count]), 'count': count}
+        body = dumps(payload)
+        stdlib_ms = timed(lambda: stdlib.dumps(payload), 5)
+        fast_ms = timed(lambda: dumps(payload), 5)
+        br = len(compress(body, 'br')) if brotli else None
+        print(f"{label:>22} {stdlib_ms:>14.2f} {fast_ms:>9.2f} {len(body):>11,} {len(compress(body, 'gzip')):>8,} "
+              f"{br if br is not None else '-':>8}")
+
+
+def flask_requests(app_module, emails_text, repeat):
+    client = app_module.app.test_client()
+    body = {'emails_text': emails_text}
+
+    app_module.response_cache.clear()
+    t0 = time.perf_counter()
+    first = client.post('/analyze', json=body)
+    first_ms = (time.perf_counter() - t0) * 1e3
+    hit_ms = timed(lambda: client.post('/analyze', json=body), repeat)
+
+    sample_path = tempfile.mktemp(suffix='.txt')
+    with open(sample_path, 'w') as f:
+        f.write(emails_text)
+    app_module.SAMPLE_EMAILS_PATH = sample_path
+    etag = client.get('/analyze').headers['ETag']
+    get_ms = timed(lambda: client.get('/analyze'), repeat)
+    revalidate = client.get('/analyze', headers={'If-None-Match': etag})
+    revalidate_ms = timed(lambda: client.get('/analyze', headers={'If-None-Match': etag}), repeat)
+    os.remove(sample_path)
+
+    print(f"\n/analyze ({len(emails_text) / 1e6:.1f} MB of email text)")
+    print(f"{'request':>28} {'ms':>9} {'status':>7} {'body B':>8}")
+    print(f"{'POST, computed':>28} {first_ms:>9.2f} {first.status_code:>7} {len(first.data):>8,}")
+    print(f"{'POST, cached':>28} {hit_ms:>9.2f} {200:>7} {len(first.data):>8,}")
+    print(f"{'GET sample, cached':>28} {get_ms:>9.2f} {200:>7} {len(first.data):>8,}")
+    print(f"{'GET + If-None-Match':>28} {revalidate_ms:>9.3f} {revalidate.status_code:>7} {len(revalidate.data):>8,}")
+
+
+def simple_app_requests(repeat):
+    from simple_app import SimpleHandler
+
+    SimpleHandler.log_message = lambda self, *args: None
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SimpleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+
+    def fetch(conn, headers):
+        conn.request('GET', '/', headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        wire = len(data) + sum(len(k) + len(v) + 4 for k, v in response.getheaders())
+        return response, wire
+
+    def fresh():
+        conn = http.client.HTTPConnection(host, port)
+        result = fetch(conn, {})
+        conn.close()
+        return result
+
+    keep_alive = http.client.HTTPConnection(host, port)
+    response, wire_full = fetch(keep_alive, {})
+    etag = response.getheader('ETag')
+    _, wire_304 = fetch(keep_alive, {'If-None-Match': etag})
+
+    print(f"\nsimple_app.py over TCP")
+    print(f"{'request':>28} {'ms':>9} {'wire B':>8}")
+    print(f"{'new connection each':>28} {timed(fresh, repeat):>9.3f} {wire_full:>8}")
+    print(f"{'keep-alive':>28} {timed(lambda: fetch(keep_alive, {}), repeat):>9.3f} {wire_full:>8}")
+    print(f"{'keep-alive + If-None-Match':>28} "
+          f"{timed(lambda: fetch(keep_alive, {'If-None-Match': etag}), repeat):>9.3f} {wire_304:>8}")
+    keep_alive.close()
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    import app as app_module
+    from ai_classifier import STATUS_READY
+    from encoders import HashingEncoder
+    from vector_store import NumpyVectorStore
+
+    classifier = app_module.ai_classifier
+    classifier._model = HashingEncoder()
+    classifier._vector_store = NumpyVectorStore(tempfile.mkdtemp())
+    classifier.status = STATUS_READY
+
+    emails_text = corpus_text(args.emails, seed=1)
+    encoder_and_sizes(app_module, emails_text)
+    flask_requests(app_module, emails_text, args.requests)
+    simple_app_requests(args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Load test of AIClassifier.semantic_search with and without micro-batching.
+
+Closed-loop client threads issue unique queries (so the embedding cache never
+hits) against a NumPy vector store. By default the encoder is a stub whose cost
+is a fixed per-call overhead plus a per-text cost on one shared device; pass
+--real-model to use sentence-transformers instead.
+
+Usage: python benchmarks/bench_search_batching.py [--clients 16] [--seconds 5] [--vectors 20000]
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_classifier import AIClassifier, MODEL_NAME, STATUS_READY
+from bench_vector_store import DIM, INSERT_BATCH, make_vectors
+from vector_store import NumpyVectorStore
+
+
+class StubModel:
+    """Encoder with batch-friendly cost: overhead per call plus a smaller cost per text.
+
+    Calls are serialized, as a model saturating the CPU cores (or one GPU) would be.
+    """
+
+    def __init__(self, call_ms: float, text_ms: float):
+        self.call_ms = call_ms
+        self.text_ms = text_ms
+        self._device = threading.Lock()
+
+    def encode(self, texts, batch_size=32):
+        with self._device:
+            time.sleep((self.call_ms + self.text_ms * len(texts)) / 1000.0)
+        rng = np.random.default_rng(abs(hash(texts[0])) % 2**32)
+        return rng.normal(size=(len(texts), DIM)).astype(np.float32)
+
+
+def run_load(classifier, clients, seconds):
+    counter = itertools.count()
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + seconds
+
+    def client(slot):
+        while time.perf_counter() < stop:
+            query = f"weekend sale on running shoes #{next(counter)}"
+            t0 = time.perf_counter()
+            classifier.semantic_search(query, n_results=10)
+            latencies[slot].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.array([value for slot in latencies for value in slot]) * 1e3
+    return len(all_latencies) / elapsed, np.percentile(all_latencies, 50), np.percentile(all_latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--vectors', type=int, default=20_000)
+    parser.add_argument('--windows', default='0,2,5', help='comma-separated batch windows in ms; 0 = unbatched')
+    parser.add_argument('--call-ms', type=float, default=8.0, help='stub encoder cost per call')
+    parser.add_argument('--text-ms', type=float, default=0.5, help='stub encoder cost per text')
+    parser.add_argument('--real-model', action='store_true')
+    args = parser.parse_args()
+
+    if args.real_model:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME)
+    else:
+        model = StubModel(args.call_ms, args.text_ms)
+
+    vectors = make_vectors(args.vectors)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStore(os.path.join(tmp, 'store'))
+        for start in range(0, len(vectors), INSERT_BATCH):
+            end = min(len(vectors), start + INSERT_BATCH)
+            store.upsert([f"v{i}" for i in range(start, end)], vectors[start:end], [''] * (end - start),
+                         [{'sender': f"s{i % 50}", 'subject': '', 'promotion_type': 'other'}
+                          for i in range(start, end)])
+
+        print(f"{args.clients} clients, {args.vectors} vectors, "
+              f"{'real model' if args.real_model else f'stub {args.call_ms}+{args.text_ms}/text ms'}")
+        print(f"{'window ms':>10} {'QPS':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for window in (float(w) for w in args.windows.split(',')):
+            classifier = AIClassifier(search_window_ms=window)
+            classifier._model = model
+            classifier._vector_store = store
+            classifier.status = STATUS_READY
+            qps, p50, p99 = run_load(classifier, args.clients, args.seconds)
+            if classifier.search_batcher is not None:
+                classifier.search_batcher.close()
+            print(f"{window:>10g} {qps:>8.1f} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
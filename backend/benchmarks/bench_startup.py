@@ -0,0 +1,52 @@
+"""Measure API cold start: time to import app.py, answer /health, and load the model.
+
+Each measurement runs in a fresh interpreter so import caches do not leak.
+
+Usage: python benchmarks/bench_startup.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, time
+t0 = time.perf_counter()
+import app
+imported = time.perf_counter() - t0
+app.app.test_client().get('/health')
+health = time.perf_counter() - t0
+ready = None
+if {eager}:
+    app.ai_classifier.warm_up(background=False)
+    ready = time.perf_counter() - t0
+print(json.dumps({{'import': imported, 'first_health': health, 'model_ready': ready}}))
+'''
+
+
+def probe(eager):
+    env = dict(os.environ, MODEL_WARMUP='0')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(eager=eager)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    for label, eager in (('lazy', False), ('lazy + load model', True)):
+        runs = [probe(eager) for _ in range(args.runs)]
+        best = {key: min(r[key] for r in runs) if runs[0][key] is not None else None for key in runs[0]}
+        print(f"{label:>18}: import {best['import']:.3f}s, first /health {best['first_health']:.3f}s"
+              + (f", model ready {best['model_ready']:.3f}s" if best['model_ready'] is not None else ''))
+
+
+if __name__ == '__main__':
+    main()
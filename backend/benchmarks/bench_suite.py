@@ -0,0 +1,202 @@
+"""End-to-end pipeline benchmark suite over seeded synthetic corpora, with JSON results.
+
+Each size gets the same seeded corpus (see corpus.py). The suite times:
+
+- parse_emails and extract_email_info;
+- _classify_single_email;
+- embedding through AIClassifier._encode;
+- vector store insert and search;
+- generate_analytics, with both the python and the columnar backends.
+
+The encoder is encoders.HashingEncoder unless --real-model is given. The embedding
+and vector stages are capped with --embed-limit and --vector-limit, so 1M-email
+runs finish. Every record states the item count it actually used.
+
+Results go to --output as JSON. Pass --compare OLD.json to print the ratios
+against an earlier run.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1000,100000,1000000] [--output results.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_classifier import AIClassifier, STATUS_READY
+from bench_vector_store import DIM, INSERT_BATCH
+from corpus import corpus_text
+from email_analyzer import EMAIL_SEPARATOR, EmailAnalyzer
+from encoders import HashingEncoder
+from vector_store import NumpyVectorStore
+
+SEARCH_QUERIES = ['running shoes sale', 'free shipping', 'buy one get one', 'clearance jackets',
+                  'skincare discount', 'weekend only deals', 'coffee makers', 'members extra off']
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+def _record(results, size, stage, items, seconds, **extra):
+    entry = {'size': size, 'stage': stage, 'items': items, 'seconds': round(seconds, 6),
+             'items_per_sec': round(items / seconds, 1) if seconds > 0 else None}
+    entry.update(extra)
+    results.append(entry)
+    rate = f"{entry['items_per_sec']:>12,.0f}/s" if entry['items_per_sec'] else f"{'':>14}"
+    details = ' '.join(f"{key}={value}" for key, value in extra.items())
+    print(f"{size:>9} {stage:>22} {items:>9} {seconds:>9.3f}s {rate}  {details}")
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - t0
+
+
+def make_classifier(real_model: bool, store_dir: str) -> AIClassifier:
+    if real_model:
+        return AIClassifier(search_window_ms=0)
+    classifier = AIClassifier(search_window_ms=0, encoder_backend='hashing')
+    # Injected the same way _ensure_loaded would set them
+    classifier._model = HashingEncoder(DIM)
+    classifier._vector_store = NumpyVectorStore(store_dir)
+    classifier.status = STATUS_READY
+    return classifier
+
+
+def run_size(size, args, results):
+    text, seconds = _timed(lambda: corpus_text(size, seed=args.seed, duplicate_rate=args.duplicate_rate,
+                                               near_duplicate_rate=args.near_duplicate_rate))
+    _record(results, size, 'generate_corpus', size, seconds, mb=round(len(text) / 1e6, 1))
+
+    analyzer = EmailAnalyzer()
+    emails, seconds = _timed(lambda: analyzer.parse_emails(text))
+    _record(results, size, 'parse_emails', len(emails), seconds)
+
+    blocks = [block for block in text.split(EMAIL_SEPARATOR) if block.strip()]
+    del text
+    _, seconds = _timed(lambda: [analyzer.extract_email_info(block) for block in blocks])
+    _record(results, size, 'extract_email_info', len(blocks), seconds)
+    del blocks
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        classifier = make_classifier(args.real_model, store_dir)
+
+        def classify():
+            for email in emails:
+                email.update(classifier._classify_single_email(email))
+        _, seconds = _timed(classify)
+        _record(results, size, 'classify_single_email', len(emails), seconds)
+
+        sample = emails[:args.embed_limit]
+        texts = [classifier._embedding_text(email) for email in sample]
+        embeddings, seconds = _timed(lambda: classifier._encode(texts, args.batch_size))
+        # Repeated texts are encoded once, so duplicates in the corpus show up here
+        _record(results, size, 'embed', len(texts), seconds, distinct=len(set(texts)))
+
+        n_vectors = min(len(emails), args.vector_limit)
+        vectors = np.resize(np.asarray(embeddings, dtype=np.float32), (n_vectors, DIM))
+
+        def insert():
+            for start in range(0, n_vectors, INSERT_BATCH):
+                chunk = emails[start:start + INSERT_BATCH]
+                classifier.vector_store.upsert(
+                    ids=[f"e{i}" for i in range(start, start + len(chunk))],
+                    embeddings=vectors[start:start + len(chunk)],
+                    documents=[classifier._embedding_text(email) for email in chunk],
+                    metadatas=[classifier._metadata(email) for email in chunk]
+                )
+        _, seconds = _timed(insert)
+        _record(results, size, 'vector_insert', n_vectors, seconds)
+        del vectors
+
+        latencies = []
+        for i in range(args.queries):
+            query = f"{SEARCH_QUERIES[i % len(SEARCH_QUERIES)]} #{i}"
+            t0 = time.perf_counter()
+            classifier.semantic_search(query, n_results=10)
+            latencies.append(time.perf_counter() - t0)
+        latencies = np.array(latencies) * 1e3
+        _record(results, size, 'semantic_search', args.queries, float(latencies.sum() / 1e3),
+                p50_ms=round(float(np.percentile(latencies, 50)), 3),
+                p99_ms=round(float(np.percentile(latencies, 99)), 3))
+
+    for backend in ('python', 'columnar'):
+        _, seconds = _timed(lambda: analyzer.generate_analytics(emails, backend=backend))
+        _record(results, size, f"generate_analytics_{backend}", len(emails), seconds)
+
+    results[-1]['peak_rss_mb'] = round(_rss_mb(), 1)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['size'], r['stage']): r for r in json.load(f)['results']}
+    print(f"\n{'size':>9} {'stage':>22} {'old s':>9} {'new s':>9} {'speedup':>8}")
+    for result in results:
+        old = baseline.get((result['size'], result['stage']))
+        if old is None or old['items'] != result['items'] or not result['seconds']:
+            continue
+        print(f"{result['size']:>9} {result['stage']:>22} {old['seconds']:>9.3f} {result['seconds']:>9.3f} "
+              f"{old['seconds'] / result['seconds']:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--near-duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--embed-limit', type=int, default=50_000)
+    parser.add_argument('--vector-limit', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--real-model', action='store_true', help='embed with sentence-transformers')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--compare', help='JSON from an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'size':>9} {'stage':>22} {'items':>9} {'seconds':>10} {'throughput':>14}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        run_size(size, args, results)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'encoder': 'sentence-transformers' if args.real_model else 'hashing stub',
+            'options': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Latency and recall of the vector store backends on synthetic 384-dim embeddings.
+
+Exact float32 NumPy search is the ground truth for recall@k. Chroma is included
+when chromadb is installed.
+
+Usage: python benchmarks/bench_vector_store.py [--vectors 100000] [--queries 200] [--k 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_store import ChromaVectorStore, NumpyVectorStore
+
+DIM = 384
+INSERT_BATCH = 5000
+
+
+def make_vectors(n, clusters=200, seed=0):
+    """Clustered vectors, closer to real sentence embeddings than pure noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.6 * rng.normal(size=(n, DIM)).astype(np.float32)
+
+
+def load(store, vectors):
+    t0 = time.perf_counter()
+    for start in range(0, len(vectors), INSERT_BATCH):
+        chunk = vectors[start:start + INSERT_BATCH]
+        ids = [f"v{i}" for i in range(start, start + len(chunk))]
+        store.upsert(ids, chunk, [''] * len(chunk), [{'row': i} for i in range(start, start + len(chunk))])
+    return time.perf_counter() - t0
+
+
+def search(store, queries, k, batched):
+    latencies = []
+    results = []
+    if batched:
+        t0 = time.perf_counter()
+        results = store.query(queries, n_results=k)
+        latencies.append((time.perf_counter() - t0) / len(queries))
+    else:
+        for query in queries:
+            t0 = time.perf_counter()
+            results.extend(store.query([query], n_results=k))
+            latencies.append(time.perf_counter() - t0)
+    return [[hit['id'] for hit in hits] for hits in results], np.array(latencies)
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors)
+    queries = make_vectors(args.queries, seed=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ('numpy f32', NumpyVectorStore(os.path.join(tmp, 'f32'))),
+            ('numpy int8', NumpyVectorStore(os.path.join(tmp, 'int8'), quantize=True)),
+        ]
+        try:
+            import chromadb
+            from chromadb.config import Settings
+            client = chromadb.Client(Settings(anonymized_telemetry=False))
+            backends.append(('chroma hnsw', ChromaVectorStore(client, name='bench')))
+        except ImportError:
+            print("chromadb not installed; skipping Chroma backend")
+
+        truth = None
+        print(f"{'backend':>12} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch ms/q':>11} "
+              f"{f'recall@{args.k}':>10} {'vector MB':>10}")
+        for name, store in backends:
+            load_time = load(store, vectors)
+            found, latencies = search(store, queries, args.k, batched=False)
+            _, batched = search(store, queries, args.k, batched=True)
+            if truth is None:
+                truth = found
+            memory = store.memory_bytes() / 2**20 if hasattr(store, 'memory_bytes') else float('nan')
+            print(f"{name:>12} {load_time:>8.2f} {np.percentile(latencies, 50) * 1e3:>8.2f} "
+                  f"{np.percentile(latencies, 99) * 1e3:>8.2f} {batched[0] * 1e3:>11.3f} "
+                  f"{recall(found, truth):>10.3f} {memory:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
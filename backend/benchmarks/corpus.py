@@ -0,0 +1,163 @@
+"""Seeded synthetic promotional-email corpus in the ---EMAIL--- format parse_emails reads.
+
+The same seed and options always produce the same corpus, so benchmark runs
+on different commits see identical input. Bodies mix percentage, BOGO,
+free-shipping and plain newsletter offers with deadline phrases, multi-line
+paragraphs and (optionally) HTML. A fraction of emails are exact re-sends or
+near-duplicates (same template, different code/price) of earlier ones, as in
+real promotion inboxes.
+
+Usage: python benchmarks/corpus.py OUTPUT [--emails 100000] [--seed 0] [--duplicate-rate 0.1]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+from typing import Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_analyzer import EMAIL_SEPARATOR
+
+STORES = ['Amazon', 'Best Buy', 'Target', 'Nike', 'Walmart', 'Macys', 'Gap', 'Etsy', 'Sephora', 'Ulta',
+          'Zappos', 'Wayfair', 'Old Navy', 'REI', 'Adidas', 'Lululemon', 'Kohls', 'Nordstrom', 'IKEA', 'Uniqlo']
+PRODUCTS = ['running shoes', 'denim', 'headphones', 'coffee makers', 'yoga gear', 'lamps', 'wallets',
+            'boots', 'tees', 'watches', 'skincare', 'cookware', 'backpacks', 'jackets', 'bedding']
+HEADLINES = [
+    'Flash sale! Get {d}% off {p} for a limited time.',
+    'Clearance event: final sale {p} up to {d}% off.',
+    'BOGO deal - buy one get one free on select {p}.',
+    'Enjoy free shipping on all orders this week plus {d}% off {p}.',
+    'Our biggest sale of the season: {d} percent off sitewide.',
+    'Save {d}% on {p} with code SAVE{d}.',
+    'New arrivals in {p} picked just for you.',
+    'Members get an extra {d}% off {p} today.',
+]
+DEADLINES = ['Ends tonight at midnight.', 'Offer expires {m}/{day}.', 'Only 48 hours left!',
+             'Sale ends in 3 days.', 'This weekend only.', 'Valid through {month} {day}.', '', '', '']
+FILLER = [
+    'Thanks for being a valued customer.',
+    'Browse the full collection online or in store.',
+    'Prices as marked, while supplies last.',
+    'Exclusions apply, see site for details.',
+    'Free returns within 30 days.',
+    'Shop our most-loved styles before they sell out.',
+]
+FOOTERS = ['', 'Unsubscribe | Manage preferences', 'You are receiving this email because you signed up. '
+           'Privacy Policy. All rights reserved.']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+DISCOUNTS = [10, 15, 20, 25, 30, 40, 50, 60, 70]
+
+
+def _body(rng: random.Random, code: int, html: bool) -> str:
+    discount = rng.choice(DISCOUNTS)
+    headline = rng.choice(HEADLINES).format(d=discount, p=rng.choice(PRODUCTS))
+    deadline = rng.choice(DEADLINES).format(m=rng.randint(1, 12), day=rng.randint(1, 28),
+                                            month=rng.choice(MONTHS))
+    paragraphs = [f"{headline} {deadline}".strip()]
+    for _ in range(rng.randint(0, 3)):
+        paragraphs.append(' '.join(rng.sample(FILLER, rng.randint(1, 3))))
+    paragraphs.append(f"Use code DEAL{code} at checkout.")
+    footer = rng.choice(FOOTERS)
+    if footer:
+        paragraphs.append(footer)
+    if html:
+        return ''.join(f'<p style="font-family:Arial;font-size:14px">{p}</p>\n' for p in paragraphs)
+    return '\n'.join(paragraphs)
+
+
+def _near_duplicate(body: str, rng: random.Random) -> str:
+    """Same template with a different promo code, as in a re-sent campaign"""
+    head, _, tail = body.rpartition('Use code DEAL')
+    code, _, rest = tail.partition(' ')
+    return f"{head}Use code DEAL{rng.randrange(10**6)} {rest}" if head else body + ' '
+
+
+def generate(n: int, seed: int = 0, duplicate_rate: float = 0.1, near_duplicate_rate: float = 0.1,
+             html_rate: float = 0.2, start: date = date(2024, 1, 1), days: int = 365) -> Iterator[str]:
+    """Yield ``n`` email blocks (without the separator).
+
+    ``duplicate_rate`` of emails repeat an earlier email verbatim and
+    ``near_duplicate_rate`` repeat one with a changed promo code. Earlier
+    emails are drawn from a bounded pool, so memory stays flat for large ``n``.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for i in range(n):
+        roll = rng.random()
+        if pool and roll < duplicate_rate:
+            sender, subject, sent, body = rng.choice(pool)
+        elif pool and roll < duplicate_rate + near_duplicate_rate:
+            sender, subject, sent, body = rng.choice(pool)
+            body = _near_duplicate(body, rng)
+            sent = sent + timedelta(days=rng.randint(0, 7))
+        else:
+            store = rng.choice(STORES)
+            sender = f"{store} <deals@{store.lower().replace(' ', '')}.example>"
+            subject = f"{store}: {rng.choice(PRODUCTS).title()} deal #{i}"
+            sent = start + timedelta(days=rng.randrange(days))
+            body = _body(rng, i, rng.random() < html_rate)
+            if len(pool) < 10_000:
+                pool.append((sender, subject, sent, body))
+            else:
+                pool[rng.randrange(len(pool))] = (sender, subject, sent, body)
+        yield f"\nFrom: {sender}\nSubject: {subject}\nDate: {sent.isoformat()}\nBody: {body}\n"
+
+
+def corpus_text(n: int, **options) -> str:
+    return ''.join(EMAIL_SEPARATOR + block for block in generate(n, **options))
+
+
+def classified_emails(n: int, **options) -> list:
+    """``n`` corpus emails as the pipeline hands them to analytics.
+
+    Each is parsed by EmailAnalyzer (discount, expiry) and classified by the
+    rules (type, scores). It gets a content id, and exact re-sends are flagged
+    ``near_duplicate``. Pass ``start``/``days`` ending today to get expiries
+    around now.
+    """
+    from ai_classifier import classify_with_rules
+    from email_analyzer import EmailAnalyzer
+    from near_dedup import content_id
+
+    analyzer = EmailAnalyzer()
+    emails, seen = [], set()
+    for block in generate(n, **options):
+        email = analyzer.extract_email_info(block)
+        for key, value in classify_with_rules(email, analyzer.matcher).items():
+            setattr(email, key, value)
+        email.email_id = content_id(email)
+        email.near_duplicate = email.email_id in seen
+        seen.add(email.email_id)
+        emails.append(email)
+    return emails
+
+
+def write_corpus(path: str, n: int, **options) -> int:
+    """Write the corpus to ``path``; returns its size in bytes"""
+    with open(path, 'w') as f:
+        for block in generate(n, **options):
+            f.write(EMAIL_SEPARATOR)
+            f.write(block)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output')
+    parser.add_argument('--emails', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--near-duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--html-rate', type=float, default=0.2)
+    args = parser.parse_args()
+
+    size = write_corpus(args.output, args.emails, seed=args.seed, duplicate_rate=args.duplicate_rate,
+                        near_duplicate_rate=args.near_duplicate_rate, html_rate=args.html_rate)
+    print(f"wrote {args.emails} emails ({size / 1e6:.1f} MB) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""A local fake of the Gmail REST endpoints GmailConnector uses.
+
+Serves users/me/profile, messages (list with ``category:promotions``, ``after:``
+and free-text terms), messages/<id> (format=full) and history (404 once
+expired), over keep-alive HTTP/1.1 with an optional per-request latency. Used
+by the Gmail benchmarks and tests, and for trying the connector without Google
+credentials:
+
+    python benchmarks/fake_gmail.py --messages 2000 --port 8765
+    GMAIL_API_BASE=http://127.0.0.1:8765/gmail/v1 GMAIL_ACCESS_TOKEN=fake python app.py
+"""
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STORES = ['Nike', 'Target', 'BestBuy', 'Macys', 'Gap', 'Sephora', 'Ulta', 'Zappos', 'Etsy', 'Wayfair']
+OFFERS = [
+    ('Flash sale: {d}% off everything', 'Flash sale today only! Take {d}% off sitewide. Ends tonight at midnight.'),
+    ('Clearance event', 'Final clearance on last season styles, up to {d}% off while supplies last.'),
+    ('Buy one get one free', 'BOGO on all accessories this weekend. Free shipping on orders over $50.'),
+    ('{d}% off your next order', 'Save {d}% off your next purchase with code SAVE{d}. Offer expires 12/31.'),
+    ('Free shipping weekend', 'Enjoy free shipping on every order through Sunday.'),
+]
+
+
+class FakeMailbox:
+    """In-memory promotions mailbox with a monotonically increasing history id"""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.messages = {}
+        self.order = []
+        self.history = []
+        self.history_id = 1000
+        # History older than this is gone, as Gmail keeps only about a week
+        self.oldest_history_id = 0
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def add(self, count: int, age_days: float = 0.0):
+        """Add ``count`` promotions spread over the last ``age_days`` days"""
+        now_ms = int(time.time() * 1000)
+        with self.lock:
+            for _ in range(count):
+                n = len(self.order)
+                store = self.rng.choice(STORES)
+                subject, body = self.rng.choice(OFFERS)
+                discount = self.rng.choice([10, 15, 20, 25, 30, 40, 50, 60, 70])
+                message_id = f"{n:016x}"
+                self.history_id += 1
+                self.messages[message_id] = {
+                    'id': message_id,
+                    'threadId': message_id,
+                    'historyId': str(self.history_id),
+                    'labelIds': ['INBOX', 'CATEGORY_PROMOTIONS'],
+                    'internalDate': str(now_ms - int(self.rng.random() * age_days * 86400000)),
+                    'snippet': body.format(d=discount)[:100],
+                    'payload': {
+                        'mimeType': 'multipart/alternative',
+                        'headers': [
+                            {'name': 'From', 'value': f"{store} <deals@{store.lower()}.com>"},
+                            {'name': 'Subject', 'value': subject.format(d=discount)},
+                        ],
+                        'parts': [
+                            {'mimeType': 'text/plain', 'body': {'data': _b64(f"{body.format(d=discount)} #{n}")}},
+                            {'mimeType': 'text/html', 'body': {'data': _b64(f"<p>{body.format(d=discount)}</p>")}},
+                        ]
+                    }
+                }
+                self.order.append(message_id)
+                self.history.append((self.history_id, message_id))
+
+    def list(self, query: str, limit: int, page_token: str):
+        after, terms = None, []
+        for token in query.split():
+            if token.startswith('after:'):
+                after = int(token[6:]) * 1000
+            elif token != 'category:promotions':
+                terms.append(token.lower())
+        with self.lock:
+            ids = []
+            for message_id in reversed(self.order):
+                message = self.messages[message_id]
+                if after is not None and int(message['internalDate']) < after:
+                    continue
+                if terms:
+                    text = (message['snippet'] + ' ' + message['payload']['headers'][1]['value']).lower()
+                    if not all(term in text for term in terms):
+                        continue
+                ids.append(message_id)
+        start = int(page_token or 0)
+        page = {'messages': [{'id': i, 'threadId': i} for i in ids[start:start + limit]],
+                'resultSizeEstimate': len(ids)}
+        if start + limit < len(ids):
+            page['nextPageToken'] = str(start + limit)
+        return page
+
+    def expire_history(self):
+        """Drop the history so far: older startHistoryIds get a 404"""
+        with self.lock:
+            self.oldest_history_id = self.history_id
+
+    def changes(self, start_history_id: int, limit: int, page_token: str):
+        """A history page, or None when ``start_history_id`` has expired"""
+        with self.lock:
+            if start_history_id < self.oldest_history_id:
+                return None
+            records = [{'id': str(h), 'messagesAdded': [{'message': {'id': m, 'labelIds': ['CATEGORY_PROMOTIONS']}}]}
+                       for h, m in self.history if h > start_history_id]
+            latest = self.history_id
+        start = int(page_token or 0)
+        page = {'history': records[start:start + limit], 'historyId': str(latest)}
+        if start + limit < len(records):
+            page['nextPageToken'] = str(start + limit)
+        return page
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def make_handler(mailbox: FakeMailbox, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; don't let Nagle hold the body
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with mailbox.lock:
+                mailbox.requests += 1
+            if latency:
+                time.sleep(latency)
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                return self._send(401, {'error': {'code': 401, 'message': 'Login Required'}})
+
+            url = urlsplit(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            path = url.path.split('/users/me/', 1)[-1]
+            if path == 'profile':
+                return self._send(200, {'emailAddress': 'shopper@example.com', 'historyId': str(mailbox.history_id),
+                                        'messagesTotal': len(mailbox.order)})
+            if path == 'messages':
+                return self._send(200, mailbox.list(params.get('q', ''), int(params.get('maxResults', 100)),
+                                                    params.get('pageToken')))
+            if path.startswith('messages/'):
+                message = mailbox.messages.get(path.split('/', 1)[1])
+                if message is None:
+                    return self._send(404, {'error': {'code': 404, 'message': 'Not Found'}})
+                return self._send(200, message)
+            if path == 'history':
+                page = mailbox.changes(int(params['startHistoryId']), int(params.get('maxResults', 100)),
+                                       params.get('pageToken'))
+                if page is None:
+                    return self._send(404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}})
+                return self._send(200, page)
+            self._send(404, {'error': {'code': 404, 'message': 'Unknown endpoint'}})
+
+    return Handler
+
+
+def serve(mailbox: FakeMailbox, port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Start the fake server on a daemon thread; base URL is http://127.0.0.1:<port>/gmail/v1"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(mailbox, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/gmail/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    mailbox = FakeMailbox()
+    mailbox.add(args.messages, age_days=args.days)
+    server = serve(mailbox, args.port, args.latency_ms / 1000.0)
+    print(f"Fake Gmail with {args.messages} promotions at {base_url(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['sender', 'subject', 'date', 'discount', 'expiry', 'promotion_type', 'urgency_score',
+           'near_duplicate']
+
+TOP_SENDERS = 5
+TOP_CRITICAL_DEALS = 10
+CRITICAL_MIN_DISCOUNT = 30
+CRITICAL_MAX_DAYS = 2
+
+_DAY_NS = 86_400 * 10**9
+
+
+def to_frame(emails: List[Dict]) -> pd.DataFrame:
+    """Convert email dicts or EmailRecords into the columnar layout used for analytics"""
+    return pd.DataFrame({column: [email.get(column) for email in emails] for column in COLUMNS},
+                        columns=COLUMNS)
+
+
+def _top_k_counts(counts: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest counts, ties broken by index, without a full sort"""
+    if len(counts) > k:
+        kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+        above = np.flatnonzero(counts > kth)
+        ties = np.flatnonzero(counts == kth)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(len(counts))
+    return candidates[np.lexsort((candidates, -counts[candidates]))]
+
+
+def generate_analytics_columnar(emails: Union[List[Dict], pd.DataFrame],
+                                now: Optional[datetime] = None) -> Dict:
+    """Vectorized equivalent of EmailAnalyzer.generate_analytics"""
+    frame = emails if isinstance(emails, pd.DataFrame) else to_frame(emails)
+    now = now or datetime.now()
+    total_emails = len(frame)
+
+    # Promotion type distribution, in first-seen order like Counter
+    type_codes, type_names = pd.factorize(frame['promotion_type'].fillna('other'))
+    type_counts = np.bincount(type_codes, minlength=len(type_names))
+    promotion_types = {name: int(count) for name, count in zip(type_names, type_counts)}
+
+    # Top senders via partial selection over per-sender counts
+    sender_codes, sender_names = pd.factorize(frame['sender'])
+    sender_counts = np.bincount(sender_codes, minlength=len(sender_names))
+    top_senders = {sender_names[i]: int(sender_counts[i])
+                   for i in _top_k_counts(sender_counts, TOP_SENDERS)}
+
+    # Average discount over truthy discounts, summed exactly as integers
+    discounts = pd.to_numeric(frame['discount'], errors='coerce').to_numpy(dtype=float)
+    has_discount = np.nan_to_num(discounts) != 0
+    discount_count = int(has_discount.sum())
+    avg_discount = (float(discounts[has_discount].astype(np.int64).sum()) / discount_count
+                    if discount_count else 0)
+
+    # Time-critical deals: floor days until expiry, like timedelta.days
+    critical_deals = []
+    expiry = pd.to_datetime(frame['expiry'])
+    has_expiry = expiry.notna().to_numpy()
+    if has_expiry.any():
+        delta_ns = (expiry.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+                    - np.datetime64(now, 'ns').astype(np.int64))
+        days_until = np.floor_divide(delta_ns, _DAY_NS)
+        critical = (has_expiry & (days_until >= 0) & (days_until <= CRITICAL_MAX_DAYS)
+                    & (np.nan_to_num(discounts) >= CRITICAL_MIN_DISCOUNT))
+        positions = np.flatnonzero(critical)
+        if len(positions):
+            # Stable top-k by (days, position) without sorting every deal
+            keys = days_until[positions] * len(frame) + positions
+            if len(keys) > TOP_CRITICAL_DEALS:
+                keep = np.argpartition(keys, TOP_CRITICAL_DEALS - 1)[:TOP_CRITICAL_DEALS]
+                positions = positions[keep]
+                keys = keys[keep]
+            positions = positions[np.argsort(keys)]
+
+            urgency = frame['urgency_score'] if 'urgency_score' in frame else None
+            for pos in positions:
+                score = urgency.iat[pos] if urgency is not None else None
+                critical_deals.append({
+                    'sender': frame['sender'].iat[pos],
+                    'subject': frame['subject'].iat[pos],
+                    'discount': int(discounts[pos]),
+                    'expires_in_days': int(days_until[pos]),
+                    'urgency_score': 5 if score is None or pd.isna(score) else int(score)
+                })
+
+    # Templated emails skipped by near-duplicate suppression
+    duplicates = int(frame['near_duplicate'].fillna(False).astype(bool).sum()) if 'near_duplicate' in frame else 0
+
+    dates = pd.to_datetime(frame['date'])
+    return {
+        'total_emails': total_emails,
+        'promotion_types': promotion_types,
+        'top_senders': top_senders,
+        'critical_deals': critical_deals,
+        'average_discount': round(avg_discount, 1),
+        'duplicate_emails': duplicates,
+        'dedup_ratio': round(duplicates / total_emails, 4) if total_emails else 0.0,
+        'date_range': {
+            'start': dates.min().to_pydatetime().isoformat() if total_emails else None,
+            'end': dates.max().to_pydatetime().isoformat() if total_emails else None
+        }
+    }
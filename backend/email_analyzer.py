@@ -1,126 +1,320 @@
 import re
-import pandas as pd
+import sys
 from datetime import datetime, timedelta
 from collections import Counter
+import heapq
+from itertools import repeat
 import json
+import os
+from typing import Dict, Iterable, Iterator
+from promotion_rules import PromotionMatcher, get_default_matcher
+from instrumentation import metrics
+from expiry import extract_expiry
+from email_record import EmailRecord, field_reader, reader_for
+from text_normalizer import NORMALIZE_BODIES, normalize_body
+
+EMAIL_SEPARATOR = '---EMAIL---'
+
+# Characters read per chunk when streaming large dumps
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# 'python', 'columnar', or 'auto' (columnar when records are already a DataFrame;
+# converting dicts to columns costs more than the Python aggregation saves)
+ANALYTICS_BACKEND = os.getenv('ANALYTICS_BACKEND', 'auto')
+
+
+def _is_frame(obj) -> bool:
+    """True for a pandas DataFrame, without importing pandas just to check"""
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(obj, pd.DataFrame)
+
+
+def _iter_blocks(f, chunk_size: int) -> Iterator[str]:
+    """Yield the raw text between separators without reading the whole file"""
+    buffer = ''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        blocks = buffer.split(EMAIL_SEPARATOR)
+        # The last piece may be an unfinished email (or a split separator)
+        buffer = blocks.pop()
+        yield from blocks
+    yield buffer
+
+def _column(read, emails, key: str, default=None) -> Iterator:
+    """One field of every email, read with a field_reader accessor"""
+    return map(read, emails, repeat(key), repeat(default))
 
 class EmailAnalyzer:
-    def __init__(self):
-        self.promotion_patterns = {
-            'flash_sale': r'flash|limited time|today only|ends tonight',
-            'percentage_off': r'\d+%\s*off|\d+\s*percent',
-            'bogo': r'buy one get|bogo|b1g1',
-            'free_shipping': r'free shipping|free delivery',
-            'clearance': r'clearance|final sale|last chance'
-        }
+    def __init__(self, matcher: PromotionMatcher = None):
+        # Promotion, discount and urgency rules compiled into one scanner
+        self.matcher = matcher or get_default_matcher()
     
     def parse_emails(self, text):
         """Parse raw text into structured email data"""
         emails = []
         
-        # Simple parsing - in production, use more sophisticated methods
-        # Split by common email separators
-        email_blocks = text.split('---EMAIL---')
+        with metrics.timer('parse') as timer:
+            # Simple parsing - in production, use more sophisticated methods
+            # Split by common email separators
+            email_blocks = text.split(EMAIL_SEPARATOR)
+            
+            for block in email_blocks:
+                if block.strip():
+                    email = self.extract_email_info(block)
+                    if email:
+                        emails.append(email)
+            
+            timer.items = len(emails)
+        
+        return emails
+    
+    def iter_emails(self, source, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+        """Lazily parse emails from a path or text file object, one record at a time.
+        
+        The source is read in ``chunk_size`` pieces, so memory stays bounded by the
+        largest single email rather than the size of the dump.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'r') as f:
+                yield from self.iter_emails(f, chunk_size)
+            return
         
-        for block in email_blocks:
+        for block in _iter_blocks(source, chunk_size):
             if block.strip():
                 email = self.extract_email_info(block)
                 if email:
-                    emails.append(email)
-        
-        return emails
+                    yield email
     
     def extract_email_info(self, email_text):
-        """Extract structured info from email text"""
+        """Extract structured info from email text into an EmailRecord"""
         lines = email_text.strip().split('\n')
         
-        email_data = {
-            'sender': '',
-            'subject': '',
-            'body': '',
-            'date': datetime.now(),
-            'discount': None,
-            'expiry': None
-        }
+        sender = subject = ''
+        date = None
         
-        # Extract sender (look for From: pattern)
+        # Single pass: headers until the Body: line, everything after is body
+        body_lines = []
+        in_body = False
         for line in lines:
-            if line.startswith('From:'):
-                email_data['sender'] = line.replace('From:', '').strip()
+            if in_body:
+                body_lines.append(line)
+            elif line.startswith('From:'):
+                sender = line.replace('From:', '').strip()
             elif line.startswith('Subject:'):
-                email_data['subject'] = line.replace('Subject:', '').strip()
+                subject = line.replace('Subject:', '').strip()
             elif line.startswith('Date:'):
                 try:
-                    email_data['date'] = datetime.strptime(
+                    date = datetime.strptime(
                         line.replace('Date:', '').strip(), 
                         '%Y-%m-%d'
                     )
                 except:
-                    email_data['date'] = datetime.now()
-        
-        # Rest is body
-        body_start = False
-        body_lines = []
-        for line in lines:
-            if body_start:
-                body_lines.append(line)
+                    date = datetime.now()
             elif line.startswith('Body:'):
-                body_start = True
+                in_body = True
                 body_lines.append(line.replace('Body:', '').strip())
         
-        email_data['body'] = ' '.join(body_lines)
+        # Markup, entities and footer boilerplate are removed before rules and embedding
+        body = normalize_body('\n'.join(body_lines)) if NORMALIZE_BODIES else ' '.join(body_lines)
+        email_data = EmailRecord(sender, subject, body, date or datetime.now())
         
-        # Extract discount
-        discount_match = re.search(r'(\d+)%\s*off', email_data['body'], re.IGNORECASE)
-        if discount_match:
-            email_data['discount'] = int(discount_match.group(1))
+        # Extract discount and expiry hints in a single scan of the body
+        matches = self.matcher.scan(email_data.body)
+        if matches.discount is not None:
+            email_data.discount = matches.discount
         
-        # Extract expiry (simple pattern matching)
-        if 'expires' in email_data['body'].lower():
-            # Try to find date after "expires"
-            email_data['expiry'] = datetime.now() + timedelta(days=2)
+        # Deadline phrases ("ends tonight", "expires 10/31", "48 hours left"),
+        # resolved against the send date
+        email_data.expiry = extract_expiry(f"{subject} {email_data.body}", email_data.date)
+        if email_data.expiry is None and 'expires' in matches.flags:
+            # "expires" without a readable date: assume the old two-day window
+            email_data.expiry = datetime.now() + timedelta(days=2)
         
         return email_data
     
-    def generate_analytics(self, emails):
+    def generate_analytics(self, emails, backend: str = None):
         """Generate comprehensive analytics from classified emails"""
+        with metrics.timer('analytics', items=len(emails)):
+            backend = backend or ANALYTICS_BACKEND
+            if backend == 'columnar' or (backend == 'auto' and _is_frame(emails)):
+                # Imported here so pandas is only loaded when the columnar path runs
+                from columnar_analytics import generate_analytics_columnar
+                return generate_analytics_columnar(emails)
+            
+            return self._generate_analytics_python(emails)
+    
+    def _generate_analytics_python(self, emails):
+        """Reference implementation over a list of email dicts"""
         
         # Basic stats
         total_emails = len(emails)
         
+        # getattr on EmailRecords, dict.get on dicts, mapped over the list in C:
+        # no per-email Python call for the field reads
+        read = field_reader(emails)
+        
         # Promotion type distribution
-        promotion_types = Counter([e.get('promotion_type', 'other') for e in emails])
+        promotion_types = Counter(_column(read, emails, 'promotion_type', 'other'))
         
         # Top senders
-        senders = Counter([e['sender'] for e in emails])
+        senders = Counter(_column(read, emails, 'sender'))
         top_senders = dict(senders.most_common(5))
         
         # Time-critical deals (expires in next 48 hours)
         critical_deals = []
-        for email in emails:
-            if email.get('expiry'):
-                days_until = (email['expiry'] - datetime.now()).days
-                if 0 <= days_until <= 2 and email.get('discount', 0) >= 30:
+        now = datetime.now()
+        for email, expiry in zip(emails, _column(read, emails, 'expiry')):
+            if expiry:
+                days_until = (expiry - now).days
+                discount = read(email, 'discount', None)
+                if 0 <= days_until <= 2 and (discount or 0) >= 30:
                     critical_deals.append({
-                        'sender': email['sender'],
-                        'subject': email['subject'],
-                        'discount': email['discount'],
+                        'sender': read(email, 'sender'),
+                        'subject': read(email, 'subject'),
+                        'discount': discount,
                         'expires_in_days': days_until,
-                        'urgency_score': email.get('urgency_score', 5)
+                        'urgency_score': read(email, 'urgency_score', 5)
                     })
         
         # Average discount
-        discounts = [e['discount'] for e in emails if e.get('discount')]
+        discounts = list(filter(None, _column(read, emails, 'discount')))
         avg_discount = sum(discounts) / len(discounts) if discounts else 0
         
+        # Templated emails skipped by near-duplicate suppression
+        duplicates = sum(map(bool, _column(read, emails, 'near_duplicate')))
+        
+        dates = list(_column(read, emails, 'date'))
         return {
             'total_emails': total_emails,
             'promotion_types': dict(promotion_types),
             'top_senders': top_senders,
             'critical_deals': sorted(critical_deals, key=lambda x: x['expires_in_days'])[:10],
             'average_discount': round(avg_discount, 1),
+            'duplicate_emails': duplicates,
+            'dedup_ratio': round(duplicates / total_emails, 4) if total_emails else 0.0,
             'date_range': {
-                'start': min([e['date'] for e in emails]).isoformat() if emails else None,
-                'end': max([e['date'] for e in emails]).isoformat() if emails else None
+                'start': min(dates).isoformat() if emails else None,
+                'end': max(dates).isoformat() if emails else None
             }
-        }
\ No newline at end of file
+        }
+    
+    def generate_analytics_stream(self, emails: Iterable[Dict]) -> Dict:
+        """Single-pass analytics over an iterable of classified emails.
+        
+        Produces the same result as generate_analytics without materializing
+        the email list; only the top 10 critical deals are kept in memory.
+        """
+        accumulator = AnalyticsAccumulator()
+        for email in emails:
+            accumulator.add(email)
+        return accumulator.result()
+    
+    def analyze_stream(self, source, classifier=None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+        """Parse, optionally classify, and aggregate a dump without intermediate lists"""
+        emails = self.iter_emails(source, chunk_size)
+        if classifier is not None:
+            emails = classifier.classify_stream(emails)
+        return self.generate_analytics_stream(emails)
+
+
+class AnalyticsAccumulator:
+    """Running aggregates behind generate_analytics that can be merged across chunks.
+    
+    Accumulators are small (counters, sums and at most 10 critical deals), so they
+    are cheap to send between processes. Merge them in input order to reproduce
+    generate_analytics exactly, including tie-breaking.
+    """
+    
+    def __init__(self, now: datetime = None, max_critical: int = 10):
+        self.now = now or datetime.now()
+        self.max_critical = max_critical
+        self.total_emails = 0
+        self.promotion_types = Counter()
+        self.senders = Counter()
+        self.discount_sum = 0
+        self.discount_count = 0
+        self.duplicates = 0
+        self.start = None
+        self.end = None
+        # Max-heap on (days, seq) via negated keys: keeps the soonest deals, ties in input order
+        self.critical_heap = []
+    
+    def add(self, email: Dict):
+        read = reader_for(email)
+        seq = self.total_emails
+        self.total_emails += 1
+        self.promotion_types[read(email, 'promotion_type', 'other')] += 1
+        sender = read(email, 'sender')
+        self.senders[sender] += 1
+        
+        discount = read(email, 'discount', None)
+        if discount:
+            self.discount_sum += discount
+            self.discount_count += 1
+        
+        if read(email, 'near_duplicate', None):
+            self.duplicates += 1
+        
+        date = read(email, 'date')
+        self._add_date(date, date)
+        
+        expiry = read(email, 'expiry', None)
+        if expiry:
+            days_until = (expiry - self.now).days
+            if 0 <= days_until <= 2 and (discount or 0) >= 30:
+                self._push_critical(days_until, seq, {
+                    'sender': sender,
+                    'subject': read(email, 'subject'),
+                    'discount': discount,
+                    'expires_in_days': days_until,
+                    'urgency_score': read(email, 'urgency_score', 5)
+                })
+    
+    def merge(self, other: 'AnalyticsAccumulator') -> 'AnalyticsAccumulator':
+        """Fold in the aggregates of emails that came after this accumulator's"""
+        offset = self.total_emails
+        self.total_emails += other.total_emails
+        self.promotion_types.update(other.promotion_types)
+        self.senders.update(other.senders)
+        self.discount_sum += other.discount_sum
+        self.discount_count += other.discount_count
+        self.duplicates += other.duplicates
+        if other.start is not None:
+            self._add_date(other.start, other.end)
+        for neg_days, neg_seq, deal in other.critical_heap:
+            self._push_critical(-neg_days, offset - neg_seq, deal)
+        return self
+    
+    def result(self) -> Dict:
+        critical_deals = [deal for _, _, deal in sorted(self.critical_heap, key=lambda x: x[:2], reverse=True)]
+        avg_discount = self.discount_sum / self.discount_count if self.discount_count else 0
+        
+        return {
+            'total_emails': self.total_emails,
+            'promotion_types': dict(self.promotion_types),
+            'top_senders': dict(self.senders.most_common(5)),
+            'critical_deals': critical_deals,
+            'average_discount': round(avg_discount, 1),
+            'duplicate_emails': self.duplicates,
+            'dedup_ratio': round(self.duplicates / self.total_emails, 4) if self.total_emails else 0.0,
+            'date_range': {
+                'start': self.start.isoformat() if self.start is not None else None,
+                'end': self.end.isoformat() if self.end is not None else None
+            }
+        }
+    
+    def _add_date(self, start: datetime, end: datetime):
+        if self.start is None or start < self.start:
+            self.start = start
+        if self.end is None or end > self.end:
+            self.end = end
+    
+    def _push_critical(self, days_until: int, seq: int, deal: Dict):
+        entry = (-days_until, -seq, deal)
+        if len(self.critical_heap) < self.max_critical:
+            heapq.heappush(self.critical_heap, entry)
+        elif entry[:2] > self.critical_heap[0][:2]:
+            heapq.heapreplace(self.critical_heap, entry)
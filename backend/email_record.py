@@ -0,0 +1,174 @@
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+# Fields every stage of the pipeline knows about, in API output order
+FIELDS = (
+    'sender', 'subject', 'body', 'date', 'discount', 'expiry',
+    'promotion_type', 'urgency_score', 'value_score',
+    'email_id', 'message_id', 'near_duplicate', 'duplicate_of'
+)
+_FIELD_SET = frozenset(FIELDS)
+
+# Repeated low-cardinality strings share one object across records
+_INTERNED = frozenset(('sender', 'promotion_type'))
+
+
+class EmailRecord:
+    """Compact email with ``__slots__`` instead of a per-email dict.
+
+    Supports the mapping operations the pipeline uses (``email['sender']``,
+    ``get``, ``update``, ``in``, ``setdefault``), so analyzers and classifiers
+    work on records and plain dicts alike. A field that was never set is absent,
+    just like a missing dict key. Sender and promotion type are interned, and
+    ``ai_summary`` is derived on demand instead of stored. Convert with
+    ``to_dict()`` only at the API boundary.
+    """
+
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, sender: str = '', subject: str = '', body: str = '',
+                 date: Optional[datetime] = None, discount=None, expiry: Optional[datetime] = None, **fields):
+        self.sender = sys.intern(sender)
+        self.subject = subject
+        self.body = body
+        self.date = date
+        self.discount = discount
+        self.expiry = expiry
+        if fields:
+            self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'EmailRecord':
+        record = cls.__new__(cls)
+        record.update(data)
+        return record
+
+    # Mapping protocol
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return self._get_other(key)
+
+    def _get_other(self, key: str):
+        if key == 'ai_summary':
+            return self.ai_summary
+        try:
+            return self._extra[key]
+        except (AttributeError, KeyError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        if key in _FIELD_SET:
+            if key in _INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+        elif key != 'ai_summary':
+            try:
+                self._extra[key] = value
+            except AttributeError:
+                self._extra = {key: value}
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key: str, default=None):
+        # Hot path in analytics: one attribute lookup for known fields
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        try:
+            return self._get_other(key)
+        except KeyError:
+            return default
+
+    def setdefault(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def update(self, other=(), **fields):
+        items = other.items() if hasattr(other, 'items') else other
+        for key, value in items:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def keys(self) -> Iterable[str]:
+        return [key for key, _ in self.items()]
+
+    def items(self):
+        for key in FIELDS:
+            try:
+                yield key, getattr(self, key)
+            except AttributeError:
+                pass
+        try:
+            yield from self._extra.items()
+        except AttributeError:
+            pass
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (EmailRecord, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"EmailRecord(sender={self.get('sender')!r}, subject={self.get('subject')!r})"
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state):
+        self.update(state)
+
+    # Derived fields
+
+    @property
+    def ai_summary(self) -> str:
+        discount = self.get('discount')
+        return f"Promotion from {self.sender} offering {'special' if discount is None else discount}% discount"
+
+    def to_dict(self) -> Dict:
+        """JSON-ready dict with the same keys the dict pipeline produced"""
+        data = dict(self.items())
+        if 'promotion_type' in data:
+            data['ai_summary'] = self.ai_summary
+        return data
+
+
+def to_dicts(emails: Iterable) -> list:
+    """API boundary: records (or dicts) to plain dicts"""
+    return [email.to_dict() if isinstance(email, EmailRecord) else email for email in emails]
+
+
+def _mapping_get(email, key: str, default=None):
+    return email.get(key, default)
+
+
+# getattr reads EmailRecord slots and dict.get reads dicts as single C calls,
+# skipping the Python-level EmailRecord.get in hot loops
+_READERS = {EmailRecord: getattr, dict: dict.get}
+
+
+def reader_for(email) -> Callable:
+    """``read(email, key, default)`` for one email"""
+    return _READERS.get(type(email), _mapping_get)
+
+
+def field_reader(emails: Iterable) -> Callable:
+    """``read(email, key, default)`` for a batch; mixed batches use each email's ``get``"""
+    types = set(map(type, emails))
+    return _READERS.get(types.pop(), _mapping_get) if len(types) == 1 else _mapping_get
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class EmbeddingCache:
+    """Content-hash embedding cache with an in-memory LRU tier and an optional on-disk tier.
+
+    The disk tier is an append-only float32 matrix (``embeddings.f32``) read through
+    ``np.memmap``, plus an ``index.txt`` log mapping text hashes to rows.
+    """
+
+    def __init__(self, max_entries: int = 10000, disk_path: Optional[str] = None,
+                 namespace: str = ''):
+        self.max_entries = max(0, max_entries)
+        self.namespace = namespace
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.disk_path = disk_path
+        self._disk_index = {}
+        self._disk_rows = 0
+        self._dim = None
+        self._mmap = None
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and case so trivially different bodies share an entry"""
+        return _WHITESPACE.sub(' ', text or '').strip().casefold()
+
+    def key(self, text: str) -> str:
+        """Hash of the normalized text, scoped to the model namespace"""
+        payload = f"{self.namespace}\x00{self.normalize(text)}".encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for ``text`` or None"""
+        with self._lock:
+            return self._lookup(self.key(text))
+
+    def put(self, text: str, embedding) -> None:
+        """Cache ``embedding`` for ``text`` in memory and, if enabled, on disk"""
+        with self._lock:
+            self._insert(self.key(text), np.asarray(embedding, dtype=np.float32))
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Embed ``texts``, calling ``encode_fn`` once for the distinct cache misses only"""
+        keys = [self.key(text) for text in texts]
+        results = [None] * len(texts)
+        missing = OrderedDict()
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                embedding = self._lookup(key)
+                if embedding is not None:
+                    results[i] = embedding
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            encoded = np.asarray(encode_fn(miss_texts), dtype=np.float32)
+            with self._lock:
+                for (key, positions), embedding in zip(missing.items(), encoded):
+                    self._remember(key, embedding)
+                    for i in positions:
+                        results[i] = embedding
+                if self.disk_path:
+                    self._append_to_disk(list(missing), encoded)
+
+        if not results:
+            return np.empty((0, self._dim or 0), dtype=np.float32)
+        return np.stack(results)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': len(self._disk_index)
+            }
+
+    def clear(self) -> None:
+        """Drop the in-memory tier and reset the counters (the disk tier is kept)"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    # Internal helpers, called with self._lock held
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+        row = self._disk_index.get(key)
+        if row is not None:
+            embedding = np.array(self._disk_matrix()[row])
+            self._remember(key, embedding)
+            self.hits += 1
+            self.disk_hits += 1
+            return embedding
+
+        self.misses += 1
+        return None
+
+    def _insert(self, key: str, embedding: np.ndarray) -> None:
+        self._remember(key, embedding)
+        if self.disk_path:
+            self._append_to_disk([key], embedding[np.newaxis])
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        if self.max_entries == 0:
+            return
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _load_disk_index(self) -> None:
+        meta_file = os.path.join(self.disk_path, 'meta.json')
+        index_file = os.path.join(self.disk_path, 'index.txt')
+        if not os.path.exists(meta_file):
+            return
+
+        with open(meta_file) as f:
+            self._dim = json.load(f)['dim']
+
+        # Only trust rows that were fully written to the matrix file, and drop
+        # a torn tail so the next append starts on a row boundary
+        matrix_file = os.path.join(self.disk_path, 'embeddings.f32')
+        complete_rows = 0
+        if os.path.exists(matrix_file):
+            row_bytes = 4 * self._dim
+            complete_rows = os.path.getsize(matrix_file) // row_bytes
+            if os.path.getsize(matrix_file) != complete_rows * row_bytes:
+                os.truncate(matrix_file, complete_rows * row_bytes)
+        if os.path.exists(index_file):
+            with open(index_file, 'rb+') as f:
+                # A last line without its newline was cut short by a crash
+                data = f.read()
+                data = data[:data.rfind(b'\n') + 1]
+                f.truncate(len(data))
+            for line in data.decode().splitlines():
+                parts = line.split()
+                if len(parts) == 2 and int(parts[1]) < complete_rows:
+                    self._disk_index[parts[0]] = int(parts[1])
+        self._disk_rows = complete_rows
+
+    def _append_to_disk(self, keys: List[str], embeddings: np.ndarray) -> None:
+        if self._dim is None:
+            self._dim = int(embeddings.shape[-1])
+            with open(os.path.join(self.disk_path, 'meta.json'), 'w') as f:
+                json.dump({'dim': self._dim, 'dtype': 'float32'}, f)
+        if embeddings.shape[-1] != self._dim:
+            return
+        new = [(key, row) for key, row in zip(keys, embeddings) if key not in self._disk_index]
+        if not new:
+            return
+
+        # Rows reach the disk before the index lines that point at them, so
+        # the index never references a row that a crash left torn or unwritten
+        with open(os.path.join(self.disk_path, 'embeddings.f32'), 'ab') as f:
+            f.write(np.stack([row for _, row in new]).astype(np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(os.path.join(self.disk_path, 'index.txt'), 'a') as f:
+            f.write(''.join(f"{key} {self._disk_rows + i}\n" for i, (key, _) in enumerate(new)))
+        for i, (key, _) in enumerate(new):
+            self._disk_index[key] = self._disk_rows + i
+        self._disk_rows += len(new)
+
+    def _disk_matrix(self) -> np.ndarray:
+        # Remap only when rows were appended since the last mapping
+        if self._mmap is None or self._mmap.shape[0] < self._disk_rows:
+            self._mmap = np.memmap(
+                os.path.join(self.disk_path, 'embeddings.f32'),
+                dtype=np.float32, mode='r', shape=(self._disk_rows, self._dim)
+            )
+        return self._mmap
@@ -0,0 +1,150 @@
+import os
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+# torch and sentence_transformers are imported when a model backend is built,
+# so the hashing backend runs without them
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# sentence-transformer (fp32, default), int8 (dynamically quantized) or hashing
+ENCODER_BACKEND = os.getenv('ENCODER_BACKEND', 'sentence-transformer')
+# Intra-op threads for the torch backends; 0 uses the CPUs this process may run on
+ENCODER_THREADS = int(os.getenv('ENCODER_THREADS', '0'))
+HASHING_DIM = int(os.getenv('HASHING_DIM', '1024'))
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (affinity / cpuset aware, unlike os.cpu_count)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class Encoder:
+    """Turns texts into embedding rows.
+
+    ``name`` identifies the backend and its parameters. It namespaces the
+    embedding cache and is recorded by the vector store and index manifest, so
+    vectors from different encoders are never mixed.
+    """
+
+    name = ''
+    dim = None
+
+    def encode(self, texts, batch_size: int = 64) -> np.ndarray:
+        """(len(texts), dim) float32 array; a single string gives one row"""
+        if isinstance(texts, str):
+            return self._encode([texts], batch_size)[0]
+        return self._encode(list(texts), batch_size)
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerEncoder(Encoder):
+    """The sentence-transformers model in fp32 PyTorch"""
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = ENCODER_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        # torch sizes its pool from the host's cores, which oversubscribes
+        # containers and pinned processes limited to fewer CPUs
+        torch.set_num_threads(threads or available_cpus())
+        self.threads = torch.get_num_threads()
+        self.model = self._load(SentenceTransformer, model_name)
+        self.name = model_name
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def _load(self, model_class, model_name: str):
+        return model_class(model_name)
+
+    def _encode(self, texts, batch_size):
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True),
+                          dtype=np.float32)
+
+
+class QuantizedEncoder(SentenceTransformerEncoder):
+    """The same model with its Linear layers dynamically quantized to int8 (CPU only).
+
+    Weights are stored as int8 and activations are quantized per batch: faster
+    matrix multiplies and a 4x smaller model, for a small loss in neighbour
+    recall (benchmarks/bench_encoders.py measures both).
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = ENCODER_THREADS):
+        super().__init__(model_name, threads)
+        self.name = f"{model_name}-int8"
+
+    def _load(self, model_class, model_name):
+        import torch
+
+        model = model_class(model_name, device='cpu')
+        model.eval()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class HashingEncoder(Encoder):
+    """Signed feature hashing of word unigrams and bigrams with sublinear (1 + log tf) weights.
+
+    Needs no model and no fitted vocabulary, so vectors depend only on the text
+    and cost microseconds per email. IDF weighting is left out on purpose: it
+    would have to be refitted as mail arrives, changing the vectors of
+    everything already indexed. Matches are lexical, not semantic.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM, bigrams: bool = True):
+        self.dim = dim
+        self.bigrams = bigrams
+        self.name = f"hashing-{dim}" if bigrams else f"hashing-{dim}-unigrams"
+
+    def _encode(self, texts, batch_size):
+        hashes, rows = [], []
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])] if self.bigrams else words
+            hashes.extend(zlib.crc32(feature.encode()) for feature in features)
+            rows.extend([row] * len(features))
+
+        # Bucket from the low bits, sign from the top bit; one bincount for the batch
+        hashes = np.array(hashes, dtype=np.uint32)
+        buckets = np.array(rows, dtype=np.int64) * self.dim + (hashes % self.dim)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        counts = np.bincount(buckets, weights=signs, minlength=len(texts) * self.dim)
+        matrix = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+
+ENCODERS = {
+    'sentence-transformer': SentenceTransformerEncoder,
+    'int8': QuantizedEncoder,
+    'hashing': HashingEncoder
+}
+
+
+def encoder_name(backend: Optional[str] = None) -> str:
+    """Name the configured backend's encoder will report, without loading it"""
+    backend = backend or ENCODER_BACKEND
+    if backend == 'sentence-transformer':
+        return MODEL_NAME
+    if backend == 'int8':
+        return f"{MODEL_NAME}-int8"
+    if backend == 'hashing':
+        return f"hashing-{HASHING_DIM}"
+    raise ValueError(f"Unknown encoder backend: {backend} (expected one of {', '.join(ENCODERS)})")
+
+
+def create_encoder(backend: Optional[str] = None) -> Encoder:
+    """Build the configured encoder backend"""
+    backend = backend or ENCODER_BACKEND
+    if backend not in ENCODERS:
+        raise ValueError(f"Unknown encoder backend: {backend} (expected one of {', '.join(ENCODERS)})")
+    return ENCODERS[backend]()
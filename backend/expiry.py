@@ -0,0 +1,252 @@
+import bisect
+import re
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+WEEKDAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6}
+
+_DEADLINE = r'(?:expires?|expiring|ends?|ending|valid\s+(?:through|thru|until|till)|through|thru|until|till)'
+# "by" and "before" are too common to count as a deadline on their own, so
+# they are only accepted directly before a date token
+_BY = r'(?:by|before)'
+# A relative duration only counts after one of these or a deadline word, so
+# "arrives in 2 days" or "replies within 48 hours" is not an expiry
+_OFFER = r'(?:offers?|sales?|deals?|discounts?|promo(?:tion)?s?|coupons?|codes?)'
+_MONTH_NAME = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?'
+# Calendar dates end at a word boundary: "4.8 by 10/10" is a date, "by 12/345" and "august 2024" are not
+_NUMERIC_DATE = r'(?:0?[1-9]|1[0-2])/(?:0?[1-9]|[12]\d|3[01])(?:/(?:\d{4}|\d{2}))?(?![\d/])|\d{4}-\d{2}-\d{2}(?!\d)'
+_NAMED_DAY = rf'{_MONTH_NAME}\s+(?:[12]\d|3[01]|0?[1-9])(?:st|nd|rd|th)?(?!\d)(?:,?\s+\d{{4}})?'
+
+# One alternation over lowercased text; the named group that matched says which form it is.
+# The lookahead on the first characters any branch can start with, then \b, lets the
+# engine reject most start positions before trying every branch.
+EXPIRY_PATTERN = re.compile(r'(?=[\dbcdeopstuvw])\b(?:' + '|'.join([
+    # "48 hours left", "2 days remaining"
+    r'(?P<rel_n>\d{1,3})\s*(?P<rel_unit>hours?|hrs?|days?)\s+(?:left|remaining|to\s+go)',
+    # "ends in 3 days", "offer expires within 24 hours", "sale for 3 days only"
+    rf'(?:(?:{_DEADLINE}|{_OFFER})\s+(?:in|within)\s+(?:the\s+next\s+)?|{_OFFER}\s+(?:for\s+)?(?:just\s+|only\s+)?)'
+    r'(?P<in_n>\d{1,3})\s*(?P<in_unit>hours?|hrs?|days?)',
+    # "ends tonight", "today only", "ends at midnight", "by midnight"
+    rf'(?P<tonight>(?:{_DEADLINE}|{_BY})\s+(?:at\s+)?(?:tonight|today|midnight)|today\s+only|tonight\s+only)',
+    rf'(?P<tomorrow>(?:{_DEADLINE}|{_BY})\s+tomorrow)',
+    rf'(?P<weekend>(?:{_DEADLINE}|{_BY})\s+(?:this\s+)?weekend|this\s+weekend\s+only)',
+    rf'(?:{_DEADLINE}|{_BY})\s+(?:this\s+)?(?P<weekday>monday|tuesday|wednesday|thursday|friday|saturday|sunday)',
+    # "expires 10/31", "valid through 12/31/2024", "ends 2024-11-30", "by 11/30"
+    rf'(?:{_DEADLINE}\s+(?:on\s+)?|{_BY}\s+)(?P<numeric>{_NUMERIC_DATE})',
+    # "offer ends november 30", "expires oct 31, 2024", "before dec 1st"
+    rf'(?:{_DEADLINE}\s+(?:on\s+)?|{_BY}\s+)(?P<named>{_NAMED_DAY})',
+]) + ')')
+# Every branch contains one of these; text without any skips the regex entirely
+_TRIGGERS = ('day', 'hour', 'hr', 'night', 'tomorrow', 'expir', 'end', 'valid', 'thr', 'til', 'by', 'before')
+
+_NAMED_DATE = re.compile(r'([a-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?')
+
+
+def _end_of_day(day: datetime) -> datetime:
+    return day.replace(hour=23, minute=59, second=59, microsecond=0)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text: str) -> Optional[Tuple[Optional[int], int, int]]:
+    """(year or None, month, day) of a matched date; cached on the text alone, which templated mail repeats"""
+    year = None
+    if '-' in text:
+        year, month, day = (int(p) for p in text.split('-'))
+    elif '/' in text:
+        parts = [int(p) for p in text.split('/')]
+        month, day = parts[0], parts[1]
+        if len(parts) == 3:
+            year = parts[2] + 2000 if parts[2] < 100 else parts[2]
+    else:
+        match = _NAMED_DATE.match(text)
+        if not match or match.group(1)[:3] not in MONTHS:
+            return None
+        month, day = MONTHS[match.group(1)[:3]], int(match.group(2))
+        year = int(match.group(3)) if match.group(3) else None
+    return year, month, day
+
+
+def _parse_calendar_date(text: str, reference_day: datetime) -> Optional[datetime]:
+    """End of the day named by ``text``; a missing year means the next such date on/after the reference"""
+    parsed = _parse_date_text(text)
+    if parsed is None:
+        return None
+    year, month, day = parsed
+    try:
+        if year is not None:
+            return _end_of_day(datetime(year, month, day))
+        candidate = datetime(reference_day.year, month, day)
+        if candidate < reference_day:
+            candidate = datetime(reference_day.year + 1, month, day)
+        return _end_of_day(candidate)
+    except ValueError:
+        return None
+
+
+def extract_expiry(text: str, reference: Optional[datetime] = None) -> Optional[datetime]:
+    """Earliest deadline stated in ``text``, resolved against ``reference`` (usually the send date).
+
+    Date strings are parsed through an LRU cache keyed on the matched text,
+    since templated promotions repeat the same phrases.
+    """
+    lowered = text.lower()
+    if not any(trigger in lowered for trigger in _TRIGGERS):
+        return None
+    reference = reference or datetime.now()
+    reference_day = reference.replace(hour=0, minute=0, second=0, microsecond=0)
+    deadlines = []
+    for match in EXPIRY_PATTERN.finditer(lowered):
+        groups = match.groupdict()
+        if groups['rel_n'] or groups['in_n']:
+            n = int(groups['rel_n'] or groups['in_n'])
+            unit = groups['rel_unit'] or groups['in_unit']
+            deadlines.append(reference + (timedelta(days=n) if unit.startswith('d') else timedelta(hours=n)))
+        elif groups['tonight']:
+            deadlines.append(_end_of_day(reference))
+        elif groups['tomorrow']:
+            deadlines.append(_end_of_day(reference + timedelta(days=1)))
+        elif groups['weekend']:
+            deadlines.append(_end_of_day(reference + timedelta(days=(6 - reference.weekday()) % 7)))
+        elif groups['weekday']:
+            deadlines.append(_end_of_day(reference + timedelta(days=(WEEKDAYS[groups['weekday']] - reference.weekday()) % 7)))
+        else:
+            parsed = _parse_calendar_date(groups['numeric'] or groups['named'], reference_day)
+            if parsed is not None:
+                deadlines.append(parsed)
+    return min(deadlines) if deadlines else None
+
+
+class ExpiryIndex:
+    """Classified deals ordered by expiry, split into discount tiers.
+
+    Each tier of 10 discount points keeps a sorted array of expiry timestamps, so
+    "discount >= X expiring within N hours" is a binary search per tier (at most
+    11) plus at most ``limit`` deals read from each. Deals are keyed by email id;
+    re-adding replaces.
+    """
+
+    TIER_WIDTH = 10
+    TIERS = 11
+
+    def __init__(self):
+        self._keys = [[] for _ in range(self.TIERS)]
+        self._deals = [[] for _ in range(self.TIERS)]
+        self._by_id = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _tier(self, discount: float) -> int:
+        return min(self.TIERS - 1, max(0, int(discount) // self.TIER_WIDTH))
+
+    def _deal(self, email: Dict) -> Optional[Dict]:
+        expiry = email.get('expiry')
+        if expiry is None:
+            return None
+        return {
+            'email_id': email.get('email_id') or f"{email['sender']}|{email['subject']}|{expiry.isoformat()}",
+            'sender': email['sender'],
+            'subject': email['subject'],
+            'discount': email.get('discount') or 0,
+            'promotion_type': email.get('promotion_type', 'other'),
+            'urgency_score': email.get('urgency_score', 5),
+            'expiry': expiry
+        }
+
+    def add(self, email: Dict):
+        self.add_many([email])
+
+    def add_many(self, emails: List[Dict]):
+        """Index a batch of deals.
+
+        Small batches are inserted by binary search. A batch that is large next
+        to the tier it lands in is appended and the tier sorted once (two
+        sorted runs, which the sort merges in linear time), instead of paying a
+        list insert per deal.
+        """
+        deals = [deal for deal in map(self._deal, emails) if deal is not None]
+        if not deals:
+            return
+        with self._lock:
+            added = [[] for _ in range(self.TIERS)]
+            replaced = [set() for _ in range(self.TIERS)]
+            for deal in deals:
+                previous = self._by_id.get(deal['email_id'])
+                if previous is not None:
+                    replaced[previous[0]].add(previous[1])
+                tier = self._tier(deal['discount'])
+                key = (deal['expiry'].timestamp(), self._seq)
+                self._seq += 1
+                added[tier].append((key, deal))
+                self._by_id[deal['email_id']] = (tier, key)
+
+            for tier in range(self.TIERS):
+                if not added[tier] and not replaced[tier]:
+                    continue
+                keys, tier_deals = self._keys[tier], self._deals[tier]
+                if 16 * (len(added[tier]) + len(replaced[tier])) < len(keys):
+                    for key in replaced[tier]:
+                        position = bisect.bisect_left(keys, key)
+                        if position < len(keys) and keys[position] == key:
+                            del keys[position]
+                            del tier_deals[position]
+                    for key, deal in added[tier]:
+                        if key in replaced[tier]:
+                            continue
+                        position = bisect.bisect(keys, key)
+                        keys.insert(position, key)
+                        tier_deals.insert(position, deal)
+                else:
+                    entries = [entry for entry in zip(keys, tier_deals) if entry[0] not in replaced[tier]]
+                    entries.extend(entry for entry in added[tier] if entry[0] not in replaced[tier])
+                    entries.sort(key=itemgetter(0))
+                    self._keys[tier] = [key for key, _ in entries]
+                    self._deals[tier] = [deal for _, deal in entries]
+
+    def expiring(self, within_hours: float = 48, min_discount: float = 0, limit: int = 20,
+                 now: Optional[datetime] = None) -> List[Dict]:
+        """Deals with discount >= ``min_discount`` expiring in [now, now + within_hours], soonest first"""
+        now = now or datetime.now()
+        low = (now.timestamp(), -1)
+        high = ((now + timedelta(hours=within_hours)).timestamp(), float('inf'))
+        candidates = []
+        with self._lock:
+            for tier in range(self._tier(min_discount), self.TIERS):
+                keys = self._keys[tier]
+                end = bisect.bisect_right(keys, high)
+                taken = 0
+                # Tiers are sorted by expiry, so only each tier's first ``limit`` matches can win
+                for position in range(bisect.bisect_left(keys, low), end):
+                    deal = self._deals[tier][position]
+                    if deal['discount'] >= min_discount:
+                        candidates.append((keys[position], deal))
+                        taken += 1
+                        if taken == limit:
+                            break
+        candidates.sort(key=lambda item: item[0])
+        return [dict(deal, expires_in_hours=round((deal['expiry'] - now).total_seconds() / 3600, 1))
+                for _, deal in candidates[:limit]]
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop deals that have already expired"""
+        cutoff = ((now or datetime.now()).timestamp(), -1)
+        removed = 0
+        with self._lock:
+            for tier in range(self.TIERS):
+                end = bisect.bisect_left(self._keys[tier], cutoff)
+                for deal in self._deals[tier][:end]:
+                    self._by_id.pop(deal['email_id'], None)
+                del self._keys[tier][:end]
+                del self._deals[tier][:end]
+                removed += end
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_id)
@@ -0,0 +1,231 @@
+"""Bulk export of classified emails and their embeddings as NDJSON, Parquet or Arrow.
+
+Records are read and written one batch at a time, so memory stays bounded by
+the batch size rather than the size of the dataset.
+
+Usage: python exporter.py --format parquet --out classified.parquet [--input emails.txt]
+"""
+import argparse
+import os
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from response_cache import dumps
+
+# pyarrow is optional; without it only NDJSON is available
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+PARQUET_COMPRESSION = os.getenv('EXPORT_PARQUET_COMPRESSION', 'snappy')
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+
+def store_batches(store, batch_size: int = EXPORT_BATCH_SIZE, include_embeddings: bool = True) -> Iterator[Dict]:
+    """Every record indexed in a vector store"""
+    return store.iter_batches(batch_size, include_embeddings)
+
+
+def pipeline_batches(classifier, emails: Iterable[Dict], batch_size: int = EXPORT_BATCH_SIZE,
+                     include_embeddings: bool = True) -> Iterator[Dict]:
+    """Classify ``emails`` lazily and yield them in the vector store's batch layout.
+
+    Near-duplicates and already indexed emails are exported too; their
+    embeddings come from the embedding cache when the classifier just computed them.
+    """
+    emails = iter(emails)
+    while True:
+        chunk = classifier.classify_promotions(list(islice(emails, batch_size)), batch_size)
+        if not chunk:
+            return
+        documents = [classifier._embedding_text(email) for email in chunk]
+        embeddings = None
+        if include_embeddings:
+            embeddings = np.atleast_2d(np.asarray(classifier._encode(documents, batch_size), dtype=np.float32))
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            embeddings /= norms
+        yield {
+            'ids': [email['email_id'] for email in chunk],
+            'documents': documents,
+            'metadatas': [classifier._metadata(email) for email in chunk],
+            'embeddings': embeddings
+        }
+
+
+def ndjson_chunks(batches: Iterable[Dict]) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per batch; ``date`` stays in epoch seconds"""
+    for batch in batches:
+        embeddings = batch['embeddings']
+        lines = []
+        for i, (email_id, document, metadata) in enumerate(zip(batch['ids'], batch['documents'],
+                                                               batch['metadatas'])):
+            row = {'id': email_id, **metadata, 'document': document}
+            if embeddings is not None:
+                row['embedding'] = embeddings[i]
+            lines.append(dumps(row))
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+
+
+def _schema(dim: Optional[int]) -> 'pa.Schema':
+    embedding = pa.list_(pa.float32(), dim) if dim else pa.list_(pa.float32())
+    return pa.schema([
+        ('id', pa.string()),
+        ('sender', pa.string()),
+        ('subject', pa.string()),
+        ('date', pa.timestamp('s')),
+        ('discount', pa.int32()),
+        ('promotion_type', pa.string()),
+        ('urgency_score', pa.int32()),
+        ('value_score', pa.int32()),
+        ('document', pa.string()),
+        ('embedding', embedding)
+    ])
+
+
+def _record_batch(batch: Dict, schema: 'pa.Schema') -> 'pa.RecordBatch':
+    metadatas = batch['metadatas']
+    embeddings = batch['embeddings']
+    columns = [pa.array(batch['ids'], pa.string())]
+    for field in schema.names[1:-2]:
+        values = [metadata.get(field) for metadata in metadatas]
+        columns.append(pa.array(values, schema.field(field).type))
+    columns.append(pa.array(batch['documents'], pa.string()))
+    if embeddings is None:
+        columns.append(pa.nulls(len(metadatas), schema.field('embedding').type))
+    else:
+        flat = pa.array(np.ascontiguousarray(embeddings, dtype=np.float32).ravel())
+        columns.append(pa.FixedSizeListArray.from_arrays(flat, embeddings.shape[1]))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object collecting what a pyarrow writer emits, drained after each batch"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _open_writer(sink: _ChunkSink, schema: 'pa.Schema', fmt: str):
+    if fmt == 'parquet':
+        # Dictionary-encoding the float embeddings costs time and space; byte-stream
+        # split lets the compressor find the shared exponent bytes instead
+        return pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION,
+                                use_dictionary=['sender', 'promotion_type'],
+                                column_encoding={'embedding.list.element': 'BYTE_STREAM_SPLIT'})
+    return pa.ipc.new_stream(sink, schema)
+
+
+def arrow_chunks(batches: Iterable[Dict], fmt: str = 'parquet') -> Iterator[bytes]:
+    """Parquet (one row group per batch) or an Arrow IPC stream, emitted as each batch is written"""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet and Arrow export")
+    sink = _ChunkSink()
+    writer = schema = None
+    try:
+        for batch in batches:
+            if not batch['ids']:
+                continue
+            if writer is None:
+                embeddings = batch['embeddings']
+                schema = _schema(embeddings.shape[1] if embeddings is not None else None)
+                writer = _open_writer(sink, schema, fmt)
+            writer.write_batch(_record_batch(batch, schema))
+            data = sink.drain()
+            if data:
+                yield data
+        # An empty export is still a valid file
+        if writer is None:
+            writer = _open_writer(sink, _schema(None), fmt)
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+def export_chunks(batches: Iterable[Dict], fmt: str = 'ndjson') -> Iterator[bytes]:
+    """Encoded bytes of ``batches`` in ``fmt`` ('ndjson', 'parquet' or 'arrow'), chunk by chunk"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'ndjson':
+        return ndjson_chunks(batches)
+    return arrow_chunks(batches, fmt)
+
+
+def write_export(batches: Iterable[Dict], path: str, fmt: str = 'ndjson') -> int:
+    """Stream an export to ``path`` (or stdout for '-'); returns bytes written"""
+    written = 0
+    out = sys.stdout.buffer if path == '-' else open(path, 'wb')
+    try:
+        for chunk in export_chunks(batches, fmt):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--out', default='-', help="output file, '-' for stdout")
+    parser.add_argument('--input', help='email dump to classify and export; default: the vector store')
+    parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument('--no-embeddings', action='store_true')
+    args = parser.parse_args()
+    include_embeddings = not args.no_embeddings
+
+    if args.input:
+        from ai_classifier import AIClassifier
+        from email_analyzer import EmailAnalyzer
+
+        classifier = AIClassifier()
+        emails = EmailAnalyzer().iter_emails(args.input)
+        batches = pipeline_batches(classifier, emails, args.batch_size, include_embeddings)
+    else:
+        from vector_store import create_vector_store
+
+        batches = store_batches(create_vector_store(), args.batch_size, include_embeddings)
+
+    written = write_export(batches, args.out, args.format)
+    print(f"Exported {written:,} bytes of {args.format}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
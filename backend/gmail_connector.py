@@ -0,0 +1,455 @@
+import base64
+import gzip
+import http.client
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.utils import parseaddr
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from text_normalizer import html_to_text
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+# Point GMAIL_API_BASE at a local fake server to test without Google
+GMAIL_API_BASE = os.getenv('GMAIL_API_BASE', 'https://gmail.googleapis.com/gmail/v1')
+GMAIL_TOKEN_FILE = os.getenv('GMAIL_TOKEN_FILE', 'token.json')
+GMAIL_CACHE_DB = os.getenv('GMAIL_CACHE_DB', 'gmail_cache.sqlite3')
+# Parallel message fetches, and messages fetched and cached per batch
+GMAIL_FETCH_WORKERS = int(os.getenv('GMAIL_FETCH_WORKERS', '8'))
+GMAIL_FETCH_BATCH = int(os.getenv('GMAIL_FETCH_BATCH', '100'))
+# Polls within this many seconds of the last sync are answered from the cache
+GMAIL_SYNC_INTERVAL = float(os.getenv('GMAIL_SYNC_INTERVAL', '5'))
+
+PROMOTIONS_LABEL = 'CATEGORY_PROMOTIONS'
+PROMOTIONS_QUERY = 'category:promotions'
+LIST_PAGE_SIZE = 500
+MAX_RETRIES = 3
+
+
+class GmailAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Gmail API error {status}: {message}")
+        self.status = status
+
+
+class HTTPConnectionPool:
+    """Keep-alive connections to one host, shared by the fetch workers"""
+
+    def __init__(self, base_url: str, size: int, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max(1, size))
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, headers: Dict) -> (int, bytes):
+        """Send one request, retrying once on a connection the server already closed"""
+        for attempt in range(2):
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                conn.request(method, self.prefix + path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                if response.getheader('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+
+            if response.will_close:
+                conn.close()
+            else:
+                try:
+                    self._idle.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+            return response.status, body
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class MessageCache:
+    """SQLite cache of fetched messages and the per-account sync cursor"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS messages (
+                account TEXT NOT NULL,
+                id TEXT NOT NULL,
+                internal_date INTEGER NOT NULL,
+                sender TEXT,
+                subject TEXT,
+                body TEXT,
+                labels TEXT,
+                PRIMARY KEY (account, id))''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS messages_by_date ON messages (account, internal_date)')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS sync_state (
+                account TEXT PRIMARY KEY,
+                history_id TEXT,
+                synced_since INTEGER,
+                synced_at REAL,
+                list_limit INTEGER)''')
+            try:
+                # Caches written before list_limit was tracked listed one page or more
+                self._conn.execute(f"ALTER TABLE sync_state ADD COLUMN list_limit INTEGER DEFAULT {LIST_PAGE_SIZE}")
+            except sqlite3.OperationalError:
+                pass
+
+    def missing(self, account: str, ids: Iterable[str]) -> List[str]:
+        """The ids not cached yet, in input order"""
+        ids = list(dict.fromkeys(ids))
+        with self._lock:
+            cached = set()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id FROM messages WHERE account = ? AND id IN ({','.join('?' * len(chunk))})",
+                    [account, *chunk])
+                cached.update(row[0] for row in rows)
+        return [i for i in ids if i not in cached]
+
+    def put(self, account: str, messages: List[Dict]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(account, m['id'], m['internal_date'], m['sender'], m['subject'], m['body'],
+                  ','.join(m['labels'])) for m in messages])
+
+    def delete(self, account: str, ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM messages WHERE account = ? AND id = ?',
+                                   [(account, i) for i in ids])
+
+    def recent(self, account: str, since_ms: int, limit: int) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, internal_date, sender, subject, body FROM messages '
+                'WHERE account = ? AND internal_date >= ? ORDER BY internal_date DESC LIMIT ?',
+                (account, since_ms, limit)).fetchall()
+        return [_to_email(*row) for row in rows]
+
+    def get_many(self, account: str, ids: List[str]) -> List[Dict]:
+        """Cached messages for ``ids``, in input order"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    'SELECT id, internal_date, sender, subject, body FROM messages '
+                    f"WHERE account = ? AND id IN ({','.join('?' * len(chunk))})", [account, *chunk])
+                found.update((row[0], row) for row in rows)
+        return [_to_email(*found[i]) for i in ids if i in found]
+
+    def state(self, account: str) -> Dict:
+        """The sync cursor; ``list_limit`` is the size of the last full listing when
+        it was cut off at that limit, None when it listed the whole window"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT history_id, synced_since, synced_at, list_limit FROM sync_state WHERE account = ?',
+                (account,)).fetchone()
+        return dict(zip(('history_id', 'synced_since', 'synced_at', 'list_limit'), row)) if row else {}
+
+    def save_state(self, account: str, history_id: str, synced_since: Optional[int],
+                   list_limit: Optional[int] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync_state (account, history_id, synced_since, synced_at, list_limit) '
+                'VALUES (?, ?, ?, ?, ?)', (account, history_id, synced_since, time.time(), list_limit))
+
+    def count(self, account: str) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM messages WHERE account = ?', (account,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _to_email(message_id, internal_date, sender, subject, body) -> Dict:
+    return {
+        'id': message_id,
+        'sender': sender,
+        'subject': subject,
+        'body': body,
+        'date': datetime.fromtimestamp(internal_date / 1000.0)
+    }
+
+
+def _decode_part(data: str) -> str:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)).decode('utf-8', errors='replace')
+
+
+def _extract_body(payload: Dict) -> str:
+    """Prefer the first text/plain part; fall back to stripped text/html"""
+    plain, html = [], []
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        stack.extend(reversed(part.get('parts', [])))
+        data = part.get('body', {}).get('data')
+        if not data:
+            continue
+        mime = part.get('mimeType', '')
+        if mime == 'text/plain':
+            plain.append(_decode_part(data))
+        elif mime == 'text/html':
+            html.append(_decode_part(data))
+    if plain:
+        return plain[0].strip()
+    return html_to_text(html[0]).strip() if html else ''
+
+
+def parse_message(message: Dict) -> Dict:
+    """Flatten a Gmail API message (format=full) into a cache row"""
+    payload = message.get('payload', {})
+    headers = {h['name'].lower(): h['value'] for h in payload.get('headers', [])}
+    return {
+        'id': message['id'],
+        'internal_date': int(message.get('internalDate', 0)),
+        'sender': parseaddr(headers.get('from', ''))[1] or headers.get('from', ''),
+        'subject': headers.get('subject', ''),
+        'body': _extract_body(payload) or message.get('snippet', ''),
+        'labels': message.get('labelIds', [])
+    }
+
+
+def _load_credentials(token_file: str):
+    """OAuth credentials from ``token_file`` via google-auth, if both are available"""
+    if not os.path.exists(token_file):
+        return None
+    try:
+        from google.oauth2.credentials import Credentials
+    except ImportError:
+        print("google-auth not installed; set GMAIL_ACCESS_TOKEN or install google-auth")
+        return None
+    return Credentials.from_authorized_user_file(token_file, SCOPES)
+
+
+class GmailConnector:
+    """Gmail promotions with incremental history sync and a local SQLite message cache.
+
+    The first sync lists promotion ids for the requested window; later syncs ask
+    the History API for messages added since the stored cursor. Only ids missing
+    from the cache are fetched, concurrently over pooled keep-alive connections.
+    Authentication uses ``access_token`` / GMAIL_ACCESS_TOKEN, or google-auth
+    credentials loaded from GMAIL_TOKEN_FILE when google-auth is installed.
+    """
+
+    def __init__(self, credentials=None, access_token: Optional[str] = None,
+                 base_url: str = GMAIL_API_BASE, cache_path: str = GMAIL_CACHE_DB,
+                 workers: int = GMAIL_FETCH_WORKERS, batch_size: int = GMAIL_FETCH_BATCH,
+                 sync_interval: float = GMAIL_SYNC_INTERVAL):
+        self.credentials = credentials
+        self.access_token = access_token or os.getenv('GMAIL_ACCESS_TOKEN')
+        if self.credentials is None and not self.access_token:
+            self.credentials = _load_credentials(GMAIL_TOKEN_FILE)
+
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.sync_interval = sync_interval
+        self.pool = HTTPConnectionPool(base_url, self.workers)
+        self.cache_path = cache_path
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='gmail-fetch')
+        self._sync_lock = threading.Lock()
+
+        # app.py treats a truthy .service as "connected"
+        self.service = None
+        self.user_email = None
+        if self.credentials is not None or self.access_token:
+            try:
+                profile = self._get('/users/me/profile')
+                self.user_email = profile.get('emailAddress')
+                self.service = self
+            except Exception as e:
+                print(f"Gmail authentication failed: {e}")
+
+    @property
+    def cache(self) -> MessageCache:
+        """Opened on first use, so an app that never syncs never creates the database"""
+        if self._cache is None:
+            with self._cache_lock:
+                if self._cache is None:
+                    self._cache = MessageCache(self.cache_path)
+        return self._cache
+
+    # HTTP
+
+    def _token(self) -> str:
+        if self.credentials is None:
+            return self.access_token
+        if not self.credentials.valid:
+            self._refresh()
+        return self.credentials.token
+
+    def _refresh(self):
+        from google.auth.transport.requests import Request
+        self.credentials.refresh(Request())
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        if params:
+            path = f"{path}?{urlencode(params, doseq=True)}"
+        for attempt in range(MAX_RETRIES):
+            status, body = self.pool.request('GET', path, {
+                'Authorization': f"Bearer {self._token()}",
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip'
+            })
+            if status == 200:
+                return json.loads(body)
+            # Rate limits and transient server errors back off and retry
+            if status in (429, 500, 502, 503) and attempt < MAX_RETRIES - 1:
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+            if status == 401 and self.credentials is not None and attempt < MAX_RETRIES - 1:
+                self._refresh()
+                continue
+            raise GmailAPIError(status, body[:200].decode('utf-8', errors='replace'))
+
+    # Sync
+
+    def _list_ids(self, query: str, limit: int) -> List[str]:
+        """Up to ``limit`` message ids matching ``query``, newest first"""
+        ids, page_token = [], None
+        while len(ids) < limit:
+            params = {'q': query, 'maxResults': min(LIST_PAGE_SIZE, limit - len(ids))}
+            if page_token:
+                params['pageToken'] = page_token
+            page = self._get('/users/me/messages', params)
+            ids.extend(m['id'] for m in page.get('messages', []))
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                break
+        return ids
+
+    def _history(self, start_history_id: str) -> (List[str], List[str], str):
+        """Ids added to and removed from promotions since the cursor, and the new cursor"""
+        added, removed, page_token = [], [], None
+        latest = start_history_id
+        while True:
+            params = {'startHistoryId': start_history_id, 'labelId': PROMOTIONS_LABEL,
+                      'historyTypes': ['messageAdded', 'messageDeleted'], 'maxResults': LIST_PAGE_SIZE}
+            if page_token:
+                params['pageToken'] = page_token
+            page = self._get('/users/me/history', params)
+            for record in page.get('history', []):
+                added.extend(m['message']['id'] for m in record.get('messagesAdded', []))
+                removed.extend(m['message']['id'] for m in record.get('messagesDeleted', []))
+            latest = page.get('historyId', latest)
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return added, removed, latest
+
+    def _fetch_one(self, message_id: str) -> Optional[Dict]:
+        try:
+            return parse_message(self._get(f"/users/me/messages/{message_id}", {'format': 'full'}))
+        except GmailAPIError as e:
+            # Deleted between listing and fetching
+            if e.status == 404:
+                return None
+            raise
+
+    def _fetch_missing(self, ids: List[str]) -> int:
+        """Fetch uncached ids in concurrent batches, committing each batch to the cache"""
+        missing = self.cache.missing(self.user_email, ids)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            messages = [m for m in self._executor.map(self._fetch_one, batch) if m is not None]
+            self.cache.put(self.user_email, messages)
+        return len(missing)
+
+    def sync(self, days_back: int = 7, max_results: int = 500, force: bool = False) -> Dict:
+        """Bring the cache up to date; returns how many messages were fetched"""
+        since = int((datetime.now() - timedelta(days=days_back)).timestamp())
+        with self._sync_lock:
+            state = self.cache.state(self.user_email)
+            history_id = state.get('history_id')
+            synced_since = state.get('synced_since')
+            list_limit = state.get('list_limit')
+            # The last full listing was cut off below what this call asks for
+            listed_enough = list_limit is None or max_results <= list_limit
+            if (not force and state.get('synced_at') and time.time() - state['synced_at'] < self.sync_interval
+                    and synced_since is not None and synced_since <= since and listed_enough):
+                return {'fetched': 0, 'mode': 'cached'}
+
+            fetched, mode = 0, 'incremental'
+
+            if history_id:
+                try:
+                    added, removed, history_id = self._history(history_id)
+                    self.cache.delete(self.user_email, removed)
+                    fetched += self._fetch_missing([i for i in added if i not in set(removed)])
+                except GmailAPIError as e:
+                    # Cursor too old: Gmail only keeps about a week of history
+                    if e.status != 404:
+                        raise
+                    history_id, synced_since = None, None
+
+            # First sync, expired cursor, or a wider window or more results than
+            # have been listed before
+            if not history_id or synced_since is None or since < synced_since or not listed_enough:
+                mode = 'full' if not history_id else 'backfill'
+                history_id = self._get('/users/me/profile').get('historyId', history_id)
+                # List at least a page so later small polls are served from history + cache
+                limit = max(max_results, LIST_PAGE_SIZE)
+                ids = self._list_ids(f"{PROMOTIONS_QUERY} after:{since}", limit)
+                fetched += self._fetch_missing(ids)
+                synced_since = since if synced_since is None else min(since, synced_since)
+                list_limit = limit if len(ids) >= limit else None
+
+            self.cache.save_state(self.user_email, history_id, synced_since, list_limit)
+            return {'fetched': fetched, 'mode': mode}
+
+    # Interface used by app.py
+
+    def get_promotional_emails(self, max_results: int = 50, days_back: int = 7) -> List[Dict]:
+        """Promotional emails from the last ``days_back`` days, newest first"""
+        if not self.service:
+            return []
+        self.sync(days_back=days_back, max_results=max_results)
+        since_ms = int((datetime.now() - timedelta(days=days_back)).timestamp() * 1000)
+        return self.cache.recent(self.user_email, since_ms, max_results)
+
+    def search_deals(self, search_term: str, max_results: int = 20) -> List[Dict]:
+        """Gmail search within promotions; message bodies come from the cache when present"""
+        if not self.service:
+            return []
+        ids = self._list_ids(f"{PROMOTIONS_QUERY} {search_term}", max_results)
+        self._fetch_missing(ids)
+        return self.cache.get_many(self.user_email, ids)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+        if self._cache is not None:
+            self._cache.close()
@@ -0,0 +1,41 @@
+"""Production serving: gunicorn -c gunicorn.conf.py wsgi:app
+
+One process with a pool of threads (gthread) by default. The app keeps its
+vector store, index manifest, response cache, job queue and realtime poller in
+process memory and writes the store and aggregate files from that process, so
+a second worker would start a second poller and overwrite the first one's files
+with its own diverging copy. WEB_WORKERS > 1 is refused; scale with WEB_THREADS
+or run separate instances on separate VECTOR_STORE_DIR / CHROMA_DIR copies.
+
+Each /realtime-stream client holds a thread for as long as it is connected.
+The pool has WEB_THREADS threads for requests plus REALTIME_MAX_STREAMS for
+streams, and the app refuses streams beyond that (503), so dashboards never
+take the request threads.
+"""
+import os
+import sys
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_WORKERS', '1'))
+worker_class = 'gthread'
+# Threads for ordinary requests, plus one per allowed realtime stream
+realtime_streams = max(1, int(os.getenv('REALTIME_MAX_STREAMS', '32')))
+threads = int(os.getenv('WEB_THREADS', '8')) + realtime_streams
+# Read by realtime_stream when the worker loads the app
+os.environ['REALTIME_MAX_STREAMS'] = str(realtime_streams)
+# Synchronous /analyze* requests classify whole mailboxes
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+# Connections queued while all threads are busy
+backlog = 2048
+accesslog = os.getenv('WEB_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Checked here rather than on WEB_WORKERS so a --workers flag is refused too
+    if server.cfg.workers > 1:
+        sys.exit(f"workers={server.cfg.workers}: the app is a single writer of its store files and runs one "
+                 f"realtime poller, so it must run in one worker process; raise WEB_THREADS instead")
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+MANIFEST_META = 'index_manifest.json'
+MANIFEST_LOG = 'index_manifest.jsonl'
+
+
+class IndexManifest:
+    """Persistent record of which messages are embedded in a vector store, and by which model.
+
+    Entries map a message key (the Gmail message id when known, else the content
+    id) to the content id that was embedded, so an unchanged message is skipped
+    after a restart while an edited one is embedded again. Stored as ``meta`` +
+    an append-only JSONL log next to the vector store; if the embedding model
+    changes the manifest starts over and everything is re-embedded.
+    """
+
+    def __init__(self, path: str, model_version: str):
+        self.path = path
+        self.model_version = model_version
+        self._entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta = {}
+        if os.path.exists(self._file(MANIFEST_META)):
+            with open(self._file(MANIFEST_META)) as f:
+                meta = json.load(f)
+
+        if meta.get('model_version') != self.model_version:
+            if meta:
+                print(f"Embedding model changed ({meta.get('model_version')} -> {self.model_version}); "
+                      f"re-indexing all emails")
+            self._reset()
+            return
+
+        if os.path.exists(self._file(MANIFEST_LOG)):
+            with open(self._file(MANIFEST_LOG)) as f:
+                for line in f:
+                    try:
+                        key, email_id = json.loads(line)
+                    except ValueError:
+                        # Torn final write from a crash; everything before it is intact
+                        break
+                    self._entries[key] = email_id
+
+    def _reset(self):
+        self._entries = {}
+        with open(self._file(MANIFEST_LOG), 'w'):
+            pass
+        with open(self._file(MANIFEST_META), 'w') as f:
+            json.dump({'model_version': self.model_version, 'created_at': time.time()}, f)
+
+    def contains(self, key: str, email_id: str) -> bool:
+        """True if ``key`` was indexed with exactly this content"""
+        with self._lock:
+            return self._entries.get(key) == email_id
+
+    def add(self, entries: Iterable[Tuple[str, str]]):
+        """Record (key, email_id) pairs once they are durably stored"""
+        with self._lock:
+            new = [(key, email_id) for key, email_id in entries if self._entries.get(key) != email_id]
+            if not new:
+                return
+            with open(self._file(MANIFEST_LOG), 'a') as f:
+                for key, email_id in new:
+                    f.write(json.dumps([key, email_id]) + '\n')
+                    self._entries[key] = email_id
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'model_version': self.model_version, 'indexed': len(self._entries), 'path': self.path}
+
+
+def open_manifest(store, model_version: str) -> Optional[IndexManifest]:
+    """Manifest stored alongside a persistent vector store, or None for in-memory stores"""
+    path = getattr(store, 'path', None)
+    if not path:
+        return None
+    manifest = IndexManifest(path, model_version)
+    # A manifest that outlived its store (e.g. the vectors were deleted) would
+    # suppress re-indexing forever
+    if len(manifest) and store.count() == 0:
+        manifest.clear()
+    return manifest
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# Latency samples kept per stage for percentile estimates
+RESERVOIR_SIZE = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+PREFIX = 'email_analyzer'
+
+
+class _NoopTimer:
+    """Shared do-nothing timer returned while metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _Summary:
+    """Count, sum and a sliding window of recent samples for quantiles"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.items = 0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, items: int = 0):
+        with self.lock:
+            self.count += 1
+            self.total += value
+            self.items += items
+            self.samples.append(value)
+
+    def snapshot(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            return self.count, self.total, self.items, samples
+
+
+def _quantile(samples: List[float], q: float) -> float:
+    if not samples:
+        return float('nan')
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class _Timer:
+    __slots__ = ('registry', 'stage', 'items', 'start')
+
+    def __init__(self, registry: 'MetricsRegistry', stage: str, items: int):
+        self.registry = registry
+        self.stage = stage
+        self.items = items
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry._stage(self.stage).observe(time.perf_counter() - self.start, self.items or 0)
+        return False
+
+
+class MetricsRegistry:
+    """Stage timers, value distributions and gauges rendered as Prometheus text"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._stages = {}
+        self._distributions = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str, items: int = 0):
+        """Context manager timing one run of ``stage``; set ``.items`` to count emails handled"""
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, stage, items)
+
+    def observe(self, name: str, value: float):
+        """Record a value such as an embedding batch size"""
+        if not self.enabled:
+            return
+        self._get(self._distributions, name).observe(value)
+
+    def register_gauge(self, name: str, fn: Callable[[], Optional[float]], help_text: str = ''):
+        """Register a callback read at scrape time (e.g. cache hit rate)"""
+        with self._lock:
+            self._gauges[name] = (fn, help_text)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._distributions.clear()
+
+    def _stage(self, stage: str) -> _Summary:
+        return self._get(self._stages, stage)
+
+    def _get(self, table: Dict, name: str) -> _Summary:
+        summary = table.get(name)
+        if summary is None:
+            with self._lock:
+                summary = table.setdefault(name, _Summary())
+        return summary
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+            distributions = sorted(self._distributions.items())
+            gauges = sorted(self._gauges.items())
+
+        if stages:
+            name = f"{PREFIX}_stage_duration_seconds"
+            lines.append(f"# HELP {name} Latency of pipeline stages")
+            lines.append(f"# TYPE {name} summary")
+            for stage, summary in stages:
+                count, total, _, samples = summary.snapshot()
+                for q in QUANTILES:
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {_quantile(samples, q):.6f}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+            name = f"{PREFIX}_stage_emails_total"
+            lines.append(f"# HELP {name} Emails processed by each stage")
+            lines.append(f"# TYPE {name} counter")
+            for stage, summary in stages:
+                lines.append(f'{name}{{stage="{stage}"}} {summary.snapshot()[2]}')
+
+            name = f"{PREFIX}_stage_emails_per_second"
+            lines.append(f"# HELP {name} Emails processed per second of stage time")
+            lines.append(f"# TYPE {name} gauge")
+            for stage, summary in stages:
+                _, total, items, _ = summary.snapshot()
+                if items:
+                    lines.append(f'{name}{{stage="{stage}"}} {items / total if total else 0:.3f}')
+
+        for metric, summary in distributions:
+            name = f"{PREFIX}_{metric}"
+            count, total, _, samples = summary.snapshot()
+            lines.append(f"# TYPE {name} summary")
+            for q in QUANTILES:
+                lines.append(f'{name}{{quantile="{q}"}} {_quantile(samples, q):g}')
+            lines.append(f"{name}_sum {total:g}")
+            lines.append(f"{name}_count {count}")
+
+        for metric, (fn, help_text) in gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            name = f"{PREFIX}_{metric}"
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry; METRICS_ENABLED=0 turns every timer into a no-op
+metrics = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', '1') == '1')
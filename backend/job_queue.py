@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Pipeline stages reported while a job runs
+STAGES = ('fetched', 'classified', 'stored')
+
+DEFAULT_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '2'))
+DEFAULT_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', '3600'))
+
+
+class Job:
+    """A unit of background work with stage-level progress"""
+
+    def __init__(self, kind: str, key: str, params: Dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.params = params
+        self.status = QUEUED
+        self.progress = {stage: 0 for stage in STAGES}
+        self.total = None
+        self.result = None
+        self.result_status = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def set_total(self, total: int):
+        with self._lock:
+            self.total = total
+
+    def advance(self, stage: str, count: int = 1):
+        """Record ``count`` more emails as having reached ``stage``"""
+        with self._lock:
+            self.progress[stage] += count
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            data = {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'total': self.total,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+            if self.status == SUCCEEDED:
+                data['result'] = self.result
+                data['result_status'] = self.result_status
+            elif self.status == FAILED:
+                data['error'] = self.error
+            return data
+
+
+class JobQueue:
+    """Runs jobs on a bounded thread pool and de-duplicates identical active requests"""
+
+    def __init__(self, max_workers: int = DEFAULT_CONCURRENCY,
+                 retention_seconds: int = DEFAULT_RETENTION_SECONDS):
+        self.max_workers = max(1, max_workers)
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._active_by_key = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(kind: str, params: Dict) -> str:
+        payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def submit(self, kind: str, params: Dict,
+               fn: Callable[[Job], Tuple[Dict, int]]) -> Tuple[Job, bool]:
+        """Queue ``fn(job)`` unless an identical job is already queued or running.
+
+        ``fn`` returns the response payload and HTTP status for the job result.
+        Returns the job and whether it was newly created.
+        """
+        key = self.fingerprint(kind, params)
+        with self._lock:
+            self._prune()
+            existing = self._active_by_key.get(key)
+            if existing is not None and existing.active:
+                return existing, False
+
+            job = Job(kind, key, params)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+
+        self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, fn: Callable[[Job], Tuple[Dict, int]]):
+        with job._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result, status = fn(job)
+            with job._lock:
+                job.result, job.result_status = result, status
+                job.status = SUCCEEDED
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            with job._lock:
+                job.error = str(e)
+                job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if not job.active and job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from instrumentation import metrics
+
+# Collect window after the first request arrives; 0 disables batching
+DEFAULT_WINDOW_MS = float(os.getenv('SEARCH_BATCH_WINDOW_MS', '3'))
+DEFAULT_MAX_BATCH = int(os.getenv('SEARCH_MAX_BATCH', '32'))
+
+
+class _Pending:
+    __slots__ = ('item', 'result', 'error', 'done')
+
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item calls into one batched call.
+
+    Callers block in ``submit(item)``. A worker thread waits for the first item,
+    keeps collecting for up to ``window_ms`` or until ``max_batch`` items are
+    queued, then calls ``process(items)`` once and hands each caller its result.
+    ``process`` must return one result per item, in order; an Exception
+    returned as a result is raised to that item's caller only.
+    """
+
+    def __init__(self, process: Callable[[List], List], window_ms: float = DEFAULT_WINDOW_MS,
+                 max_batch: int = DEFAULT_MAX_BATCH, name: str = 'micro-batcher'):
+        self.process = process
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.name = name
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, item, timeout: Optional[float] = None):
+        """Queue ``item`` and block until its batch has been processed"""
+        pending = _Pending(item)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.append(pending)
+            self._cond.notify()
+
+        if not pending.done.wait(timeout):
+            raise TimeoutError(f"{self.name} did not answer within {timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _next_batch(self) -> List[_Pending]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return []
+
+            # Hold the batch open for the window unless it fills first
+            deadline = time.perf_counter() + self.window
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(self.max_batch, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            metrics.observe(f"{self.name.replace('-', '_')}_batch_size", len(batch))
+            try:
+                results = self.process([pending.item for pending in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: expected {len(batch)} results, got {len(results)}")
+                for pending, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        pending.error = result
+                    else:
+                        pending.result = result
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+SIMHASH_BITS = 64
+# 8 bands of 8 bits: any two signatures within 7 bits share at least one band.
+# Templated mail differing in name/code/date lands within ~7 bits; unrelated
+# bodies sit around 32.
+DEFAULT_BANDS = 8
+DEFAULT_MAX_DISTANCE = 7
+DEFAULT_MAX_PER_BUCKET = 500
+# Signatures kept in the index; the least recently indexed are forgotten first
+DEFAULT_MAX_SIGNATURES = int(os.getenv('NEAR_DEDUP_MAX_SIGNATURES', '200000'))
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def content_id(email: Dict) -> str:
+    """Deterministic id from the email content, stable across runs and processes"""
+    date = email.get('date')
+    payload = '\x00'.join([
+        email.get('sender', ''),
+        email.get('subject', ''),
+        date.isoformat() if hasattr(date, 'isoformat') else str(date or ''),
+        email.get('body', '')
+    ])
+    return 'email_' + hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles of the lowercased text"""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) < shingle_size:
+        shingles = [' '.join(tokens)] if tokens else []
+    else:
+        shingles = [' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+
+    if not shingles:
+        return 0
+
+    # Sum +1/-1 per bit across all shingle hashes, vectorized over the bit positions
+    digests = b''.join(hashlib.md5(s.encode('utf-8')).digest()[:8] for s in shingles)
+    hashes = np.frombuffer(digests, dtype='<u8')
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    positive = bits.sum(axis=0) * 2 > len(shingles)
+    return int(np.packbits(positive, bitorder='little').view('<u8')[0])
+
+
+class NearDuplicateDetector:
+    """Per-sender SimHash index with LSH banding for templated-email suppression.
+
+    Emails are looked up with ``check`` and only indexed with ``add`` once they
+    have been stored, so a failed write does not leave signatures behind that
+    would suppress the email's retry. At most ``max_signatures`` are kept.
+    """
+
+    def __init__(self, bands: int = DEFAULT_BANDS, max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_per_bucket: int = DEFAULT_MAX_PER_BUCKET, max_signatures: int = DEFAULT_MAX_SIGNATURES):
+        self.bands = bands
+        self.band_bits = SIMHASH_BITS // bands
+        self.max_distance = max_distance
+        self.max_per_bucket = max_per_bucket
+        self.max_signatures = max(1, max_signatures)
+        self._buckets = {}
+        self._signatures = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.checked = 0
+        self.duplicates = 0
+
+    def _band_keys(self, sender: str, signature: int):
+        mask = (1 << self.band_bits) - 1
+        return [(sender, band, (signature >> (band * self.band_bits)) & mask)
+                for band in range(self.bands)]
+
+    def _match(self, buckets: Dict, email_id: str, keys, signature: int) -> Optional[str]:
+        for key in keys:
+            for other_id, other_signature in buckets.get(key, ()):
+                if other_id != email_id and bin(signature ^ other_signature).count('1') <= self.max_distance:
+                    return other_id
+        return None
+
+    def seen(self, email_id: str) -> bool:
+        with self._lock:
+            return email_id in self._signatures
+
+    def check(self, email_id: str, sender: str, text: str,
+              pending: Optional[Dict] = None) -> Tuple[Optional[str], int]:
+        """(id of an earlier near-duplicate from the same sender or None, signature of ``text``).
+
+        ``pending`` collects the signatures of emails checked but not yet added,
+        so duplicates within one batch are caught before the batch is stored.
+        An email whose id is already indexed (an exact re-run) is not reported
+        as a near-duplicate of itself.
+        """
+        signature = simhash(text)
+        keys = self._band_keys(sender, signature)
+
+        with self._lock:
+            if email_id in self._signatures:
+                return None, signature
+            self.checked += 1
+            duplicate_of = self._match(self._buckets, email_id, keys, signature)
+            if duplicate_of is None and pending is not None:
+                duplicate_of = self._match(pending, email_id, keys, signature)
+            if duplicate_of is not None:
+                self.duplicates += 1
+
+        if duplicate_of is None and pending is not None:
+            for key in keys:
+                pending.setdefault(key, []).append((email_id, signature))
+        return duplicate_of, signature
+
+    def add(self, entries: Iterable[Tuple[str, str, int]]):
+        """Index (email_id, sender, signature) entries, evicting the oldest beyond ``max_signatures``"""
+        with self._lock:
+            for email_id, sender, signature in entries:
+                if email_id in self._signatures:
+                    self._signatures.move_to_end(email_id)
+                    continue
+                self._signatures[email_id] = (sender, signature)
+                for key in self._band_keys(sender, signature):
+                    bucket = self._buckets.setdefault(key, deque(maxlen=self.max_per_bucket))
+                    bucket.append((email_id, signature))
+            while len(self._signatures) > self.max_signatures:
+                self._forget(*self._signatures.popitem(last=False))
+
+    def _forget(self, email_id: str, entry: Tuple[str, int]):
+        sender, signature = entry
+        for key in self._band_keys(sender, signature):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove((email_id, signature))
+            except ValueError:
+                pass  # already pushed out by the bucket's maxlen
+            if not bucket:
+                del self._buckets[key]
+
+    def check_and_add(self, email_id: str, sender: str, text: str) -> Optional[str]:
+        """Return the id of an earlier near-duplicate from the same sender, else index this email"""
+        duplicate_of, signature = self.check(email_id, sender, text)
+        if duplicate_of is None:
+            self.add([(email_id, sender, signature)])
+        return duplicate_of
+
+    def clear(self):
+        """Forget every signature, e.g. when the vector store is wiped"""
+        with self._lock:
+            self._buckets.clear()
+            self._signatures.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'duplicates': self.duplicates,
+                'dedup_ratio': round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+                'indexed': len(self._signatures)
+            }
@@ -0,0 +1,92 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from ai_classifier import classify_with_rules
+from email_analyzer import (AnalyticsAccumulator, DEFAULT_CHUNK_SIZE, EMAIL_SEPARATOR,
+                            EmailAnalyzer, _iter_blocks)
+from encoders import available_cpus
+
+DEFAULT_WORKERS = int(os.getenv('PARALLEL_WORKERS', '0')) or available_cpus()
+
+# Emails per task shipped to a worker process
+DEFAULT_EMAILS_PER_TASK = 2000
+
+
+def _process_chunk(args) -> AnalyticsAccumulator:
+    """Worker: parse and rule-classify one chunk, return only its aggregates"""
+    text, now = args
+    analyzer = EmailAnalyzer()
+    accumulator = AnalyticsAccumulator(now=now)
+    for block in text.split(EMAIL_SEPARATOR):
+        if block.strip():
+            email = analyzer.extract_email_info(block)
+            email.update(classify_with_rules(email, analyzer.matcher))
+            accumulator.add(email)
+    return accumulator
+
+
+def _iter_chunks(f, emails_per_task: int, chunk_size: int) -> Iterator[str]:
+    """Group raw email blocks from a file object into task-sized texts"""
+    batch = []
+    for block in _iter_blocks(f, chunk_size):
+        batch.append(block)
+        if len(batch) >= emails_per_task:
+            yield EMAIL_SEPARATOR.join(batch)
+            batch = []
+    if batch:
+        yield EMAIL_SEPARATOR.join(batch)
+
+
+def analyze_parallel(source, workers: Optional[int] = None,
+                     emails_per_task: int = DEFAULT_EMAILS_PER_TASK,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """Parse + rule-classify + aggregate a corpus across a process pool.
+
+    ``source`` is a path or text file object, as for EmailAnalyzer.iter_emails.
+    Each worker returns an AnalyticsAccumulator rather than email dicts;
+    accumulators are merged in input order so the result matches the
+    single-process pipeline.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r') as f:
+            return analyze_parallel(f, workers, emails_per_task, chunk_size)
+
+    workers = max(1, workers or DEFAULT_WORKERS)
+    now = datetime.now()
+    chunks = ((text, now) for text in _iter_chunks(source, emails_per_task, chunk_size))
+
+    total = AnalyticsAccumulator(now=now)
+    if workers == 1:
+        for args in chunks:
+            total.merge(_process_chunk(args))
+        return total.result()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded window of tasks in flight and merge in submission order
+        pending = deque()
+        for args in chunks:
+            pending.append(executor.submit(_process_chunk, args))
+            if len(pending) >= 2 * workers:
+                total.merge(pending.popleft().result())
+        while pending:
+            total.merge(pending.popleft().result())
+    return total.result()
+
+
+def analyze_parallel_text(text: str, workers: Optional[int] = None,
+                          emails_per_task: int = DEFAULT_EMAILS_PER_TASK) -> Dict:
+    """analyze_parallel for raw email text already in memory"""
+    return analyze_parallel(io.StringIO(text), workers, emails_per_task)
+
+
+def analyze_serial(text: str) -> Dict:
+    """The single-core reference pipeline: parse_emails -> rule classification -> analytics"""
+    analyzer = EmailAnalyzer()
+    emails: List[Dict] = analyzer.parse_emails(text)
+    for email in emails:
+        email.update(classify_with_rules(email, analyzer.matcher))
+    return analyzer.generate_analytics(emails)
@@ -0,0 +1,263 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+# Rules are listed in priority order: when several promotion types match,
+# the one defined first wins. Literal ``keywords`` are folded into a single
+# trie-shaped regex so adding keywords does not add a scan per keyword.
+# Text is lowercased once before scanning, so patterns should be lowercase.
+# A ``pattern`` rule may list the characters it can start with in
+# ``first_chars``; when every rule's first characters are known the scanner
+# skips positions that cannot start any match. A pattern rule that also has
+# ``keywords`` only matches in text containing one of them.
+#
+#
+# With few keywords (the default rules) substring checks in priority order,
+# stopping at the first promotion type that matches like an if/elif chain,
+# are faster than entering the combined regex. Rule sets up to
+# SUBSTRING_SCAN_KEYWORDS keywords are scanned that way; their ``rule_names``
+# then hold the winning promotion type plus every flag and extract rule. See
+# benchmarks/bench_promotion_rules.py for where the two approaches cross over.
+SUBSTRING_SCAN_KEYWORDS = 16
+
+DEFAULT_RULES = [
+    {
+        'name': 'flash_sale',
+        'promotion_type': 'flash_sale',
+        'keywords': ['flash', 'limited time', 'today only', 'ends tonight'],
+        'urgency_score': 9
+    },
+    {
+        'name': 'clearance',
+        'promotion_type': 'clearance',
+        'keywords': ['clearance', 'final sale', 'last chance'],
+        'urgency_score': 7
+    },
+    {
+        'name': 'bogo',
+        'promotion_type': 'bogo',
+        'keywords': ['bogo', 'buy one get', 'b1g1'],
+        'value_score': 8
+    },
+    {
+        'name': 'percentage_off',
+        'promotion_type': 'percentage_off',
+        'pattern': r'(?P<value>[0-9]+)(?:%\s*off|\s*percent\s+off)',
+        'keywords': ['% off', '%off', 'percent off'],
+        'extracts': 'discount',
+        'first_chars': '0123456789'
+    },
+    {
+        'name': 'free_shipping',
+        'promotion_type': 'free_shipping',
+        'keywords': ['free shipping', 'free delivery']
+    },
+    {
+        'name': 'expires',
+        'keywords': ['expires'],
+        'flag': 'expires'
+    }
+]
+
+DEFAULT_URGENCY_SCORE = 5
+DEFAULT_VALUE_SCORE = 5
+
+
+class Rule:
+    """A single promotion/discount/urgency rule"""
+
+    def __init__(self, name: str, priority: int, promotion_type: Optional[str] = None,
+                 keywords: Optional[List[str]] = None, pattern: Optional[str] = None,
+                 urgency_score: Optional[int] = None, value_score: Optional[int] = None,
+                 extracts: Optional[str] = None, flag: Optional[str] = None,
+                 first_chars: Optional[str] = None):
+        self.name = name
+        self.priority = priority
+        self.promotion_type = promotion_type
+        self.keywords = [k.lower() for k in (keywords or []) if k]
+        self.pattern = pattern
+        self.urgency_score = urgency_score
+        self.value_score = value_score
+        self.extracts = extracts
+        self.flag = flag
+        self.first_chars = first_chars
+
+
+class RuleMatches:
+    """Everything the scanner found in one pass over a text"""
+
+    __slots__ = ('matches', 'rule_names', 'flags', 'extracted', '_best')
+
+    def __init__(self):
+        self.matches = []
+        self.rule_names = set()
+        self.flags = set()
+        self.extracted = {}
+        self._best = None
+
+    def add(self, rule: Rule, text: str, start: int, value: Optional[str] = None):
+        self.matches.append((rule.name, text, start))
+        self.rule_names.add(rule.name)
+        if rule.flag:
+            self.flags.add(rule.flag)
+        if rule.extracts and value is not None and rule.extracts not in self.extracted:
+            self.extracted[rule.extracts] = int(value)
+        if rule.promotion_type and (self._best is None or rule.priority < self._best.priority):
+            self._best = rule
+
+    @property
+    def promotion_type(self) -> str:
+        return self._best.promotion_type if self._best else 'general'
+
+    @property
+    def urgency_score(self) -> int:
+        if self._best and self._best.urgency_score is not None:
+            return self._best.urgency_score
+        return DEFAULT_URGENCY_SCORE
+
+    @property
+    def value_score(self) -> int:
+        if self._best and self._best.value_score is not None:
+            return self._best.value_score
+        return DEFAULT_VALUE_SCORE
+
+    @property
+    def discount(self) -> Optional[int]:
+        return self.extracted.get('discount')
+
+
+def _trie_regex(words: List[str]) -> str:
+    """Build a regex for a set of literals that shares common prefixes"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            if len(branches) == 1 and len(branches[0]) > 1:
+                body = '(?:' + body + ')'
+            body += '?'
+        return body
+
+    return build(trie)
+
+
+class PromotionMatcher:
+    """Compiles every rule into one alternation regex and scans text in a single pass
+    (small rule sets are checked with substring searches instead)"""
+
+    def __init__(self, rules: Optional[List[Dict]] = None):
+        rules = DEFAULT_RULES if rules is None else rules
+        self.rules = [Rule(priority=i, **rule) for i, rule in enumerate(rules)]
+
+        self._group_rules = {}
+        self._keyword_rules = {}
+        alternatives = []
+        first_chars = set()
+        for i, rule in enumerate(self.rules):
+            if rule.pattern:
+                group = f"r{i}"
+                # Each rule gets its own named value group so names never clash
+                pattern = rule.pattern.replace('(?P<value>', f"(?P<v{i}>")
+                alternatives.append(f"(?P<{group}>{pattern})")
+                value_group = f"v{i}" if '(?P<value>' in rule.pattern else None
+                self._group_rules[group] = (rule, value_group)
+                if first_chars is not None and rule.first_chars:
+                    first_chars.update(rule.first_chars.lower())
+                else:
+                    first_chars = None
+            for keyword in rule.keywords:
+                self._keyword_rules.setdefault(keyword, rule)
+                if first_chars is not None:
+                    first_chars.add(keyword[0])
+
+        # For the substring scan: each rule's keywords and pattern, in priority order. Rules
+        # that only set a promotion type are skipped once a higher-priority type matched.
+        self._chain = [(rule, tuple(rule.keywords), rule.pattern and re.compile(rule.pattern),
+                        'value' if rule.pattern and '(?P<value>' in rule.pattern else None,
+                        bool(rule.flag or rule.extracts or not rule.promotion_type))
+                       for rule in self.rules]
+        self.substring_scan = len(self._keyword_rules) <= SUBSTRING_SCAN_KEYWORDS
+
+        if self._keyword_rules:
+            alternatives.append(f"(?P<kw>{_trie_regex(list(self._keyword_rules))})")
+
+        pattern = '|'.join(alternatives) or r'(?!)'
+        if alternatives and first_chars:
+            # Entering the alternation costs more than this one-character check
+            # at the many positions where nothing can match
+            pattern = f"(?=[{''.join(re.escape(c) for c in sorted(first_chars))}])(?:{pattern})"
+        self._regex = re.compile(pattern)
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> 'PromotionMatcher':
+        """Load rules from a JSON file (PROMOTION_RULES_FILE), or use the defaults"""
+        path = path or os.getenv('PROMOTION_RULES_FILE')
+        if not path:
+            return cls()
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config['rules'] if isinstance(config, dict) else config)
+
+    def scan(self, text: str) -> RuleMatches:
+        """Rule matches in ``text``: every non-overlapping one from the combined regex, or
+        the first of each rule the substring chain reaches (see SUBSTRING_SCAN_KEYWORDS)"""
+        result = RuleMatches()
+        text = (text or '').lower()
+        if self.substring_scan:
+            return self._scan_substrings(text, result)
+        for match in self._regex.finditer(text):
+            group = match.lastgroup
+            if group == 'kw':
+                matched = match.group()
+                result.add(self._keyword_rules[matched], matched, match.start())
+            else:
+                rule, value_group = self._group_rules[group]
+                if rule.keywords and not any(keyword in text for keyword in rule.keywords):
+                    continue
+                value = match.group(value_group) if value_group else None
+                result.add(rule, match.group(), match.start(), value)
+        return result
+
+    def _scan_substrings(self, text: str, result: RuleMatches) -> RuleMatches:
+        """First keyword or pattern match of each rule the if/elif chain reaches"""
+        typed = False
+        for rule, keywords, regex, value_group, always in self._chain:
+            if typed and not always:
+                continue
+            for keyword in keywords:
+                if keyword in text:
+                    break
+            else:
+                if keywords:
+                    continue
+            match = regex.search(text) if regex else None
+            if match:
+                result.add(rule, match.group(), match.start(), match.group(value_group) if value_group else None)
+            elif keywords:
+                result.add(rule, keyword, text.find(keyword))
+            else:
+                continue
+            typed = typed or rule.promotion_type is not None
+        return result
+
+
+_default_matcher = None
+
+
+def get_default_matcher() -> PromotionMatcher:
+    """Shared matcher used by EmailAnalyzer and AIClassifier"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = PromotionMatcher.from_config()
+    return _default_matcher
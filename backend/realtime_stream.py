@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from instrumentation import metrics
+
+# Seconds between polls of the mailbox by the single background loop
+REALTIME_POLL_INTERVAL = float(os.getenv('REALTIME_POLL_INTERVAL', '30'))
+# Messages read per poll (the last 24 hours, newest first)
+REALTIME_WINDOW_EMAILS = int(os.getenv('REALTIME_WINDOW_EMAILS', '200'))
+# Undelivered events a client may fall behind by before it is disconnected
+REALTIME_QUEUE_SIZE = int(os.getenv('REALTIME_QUEUE_SIZE', '100'))
+# Events kept for Last-Event-ID resume (should exceed the queue size)
+REALTIME_HISTORY = int(os.getenv('REALTIME_HISTORY', '1000'))
+# Comment line sent to idle clients so proxies keep the connection and dead clients are noticed
+REALTIME_HEARTBEAT = float(os.getenv('REALTIME_HEARTBEAT', '15'))
+# Open streams allowed at once (0: no limit). Each holds a server thread; gunicorn.conf.py
+# sets this and adds as many threads to the pool, so streams never take request threads.
+REALTIME_MAX_STREAMS = int(os.getenv('REALTIME_MAX_STREAMS', '0'))
+URGENCY_THRESHOLD = int(os.getenv('REALTIME_URGENCY', '7'))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class Event:
+    """A published event; the SSE frame is rendered once and shared by every client"""
+
+    __slots__ = ('id', 'type', 'data', 'published_at', 'frame')
+
+    def __init__(self, event_id: int, event_type: str, data: Dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.published_at = time.time()
+        payload = json.dumps(data, default=_json_default)
+        self.frame = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """One client's bounded queue of pending events"""
+
+    def __init__(self, broadcaster: 'EventBroadcaster', max_queue: int, replay: List[Event]):
+        self._broadcaster = broadcaster
+        self.max_queue = max_queue
+        # Replayed history may exceed max_queue; it is bounded by the history size
+        self._events = deque(replay)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.overflowed = False
+
+    def _push(self, event: Event) -> bool:
+        """Called by the broadcaster; never blocks. False once the client is dropped."""
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._events) >= self.max_queue:
+                # A slow client is cut off instead of stalling the publisher or growing
+                # without bound; it reconnects with Last-Event-ID and resumes from history
+                self.overflowed = True
+                self.closed = True
+                self._cond.notify_all()
+                return False
+            self._events.append(event)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None after ``timeout`` seconds or once closed and drained"""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._broadcaster._unsubscribe(self)
+
+    def stream(self, heartbeat: float = REALTIME_HEARTBEAT, retry_ms: int = 3000) -> Iterator[str]:
+        """SSE text for a streaming response; closes the subscription when the client goes away"""
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            while True:
+                event = self.get(timeout=heartbeat)
+                if event is not None:
+                    yield event.frame
+                elif self.closed:
+                    return
+                else:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.close()
+
+
+class EventBroadcaster:
+    """Fans published events out to subscribers and keeps recent history for resume.
+
+    Publishing appends the event to a bounded history and to each subscriber's
+    queue without blocking, so its cost does not depend on how fast clients read.
+    Event ids increase monotonically; ``subscribe(last_event_id)`` replays the
+    history after that id.
+    """
+
+    def __init__(self, history: int = REALTIME_HISTORY, max_queue: int = REALTIME_QUEUE_SIZE,
+                 max_subscribers: int = REALTIME_MAX_STREAMS):
+        self.max_queue = max(1, max_queue)
+        self.max_subscribers = max(0, max_subscribers)
+        self._history = deque(maxlen=max(1, history))
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: Dict) -> Event:
+        with self._lock:
+            event = Event(self._next_id, event_type, data)
+            self._next_id += 1
+            self._history.append(event)
+            dropped = [sub for sub in self._subscribers if not sub._push(event)]
+            self._subscribers.difference_update(dropped)
+        if dropped:
+            metrics.observe('realtime_dropped_clients', len(dropped))
+        return event
+
+    def subscribe(self, last_event_id=None) -> Optional[Subscription]:
+        """New subscription, or None when ``max_subscribers`` (if set) are already connected;
+        with ``last_event_id``, first replays the events published after it"""
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                return None
+            replay = []
+            if last_event_id not in (None, ''):
+                try:
+                    last = int(last_event_id)
+                except (TypeError, ValueError):
+                    last = 0
+                # An id from before a restart is ahead of ours: replay everything kept
+                if last >= self._next_id:
+                    last = 0
+                replay = [event for event in self._history if event.id > last]
+            subscription = Subscription(self, self.max_queue, replay)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def recent(self, event_type: Optional[str] = None, limit: Optional[int] = None) -> List[Event]:
+        """Kept events, newest first"""
+        with self._lock:
+            events = [event for event in reversed(self._history) if event_type is None or event.type == event_type]
+        return events[:limit] if limit is not None else events
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+class RealtimeMonitor:
+    """One background loop that classifies each new message once and publishes urgent deals.
+
+    ``fetch()`` returns the current window of messages (dicts with an ``id``),
+    ``classify(emails)`` returns them classified as dicts. Only ids not seen
+    before are classified, so the cost follows new mail, not clients or polls.
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict]], classify: Callable[[List[Dict]], List[Dict]],
+                 broadcaster: EventBroadcaster, interval: float = REALTIME_POLL_INTERVAL,
+                 urgency_threshold: int = URGENCY_THRESHOLD, max_seen: int = 100_000):
+        self.fetch = fetch
+        self.classify = classify
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.urgency_threshold = urgency_threshold
+        self.max_seen = max_seen
+        self.last_poll = None
+        self._seen = OrderedDict()
+        self._poll_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the polling thread if it is not running yet"""
+        with self._thread_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='realtime-monitor', daemon=True)
+                self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Realtime poll failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def poll_once(self) -> Dict:
+        """Fetch, classify the unseen messages, publish the urgent ones; returns poll stats"""
+        with self._poll_lock:
+            emails = self.fetch() or []
+            new = [email for email in emails if email['id'] not in self._seen]
+            urgent = []
+            with metrics.timer('realtime_poll', items=len(new)):
+                if new:
+                    classified = self.classify(new)
+                    # Marked only after classification succeeds, so a failed poll is retried
+                    for email in new:
+                        self._seen[email['id']] = None
+                    while len(self._seen) > self.max_seen:
+                        self._seen.popitem(last=False)
+                    urgent = [email for email in classified if email.get('urgency_score', 0) >= self.urgency_threshold]
+                    for email in urgent:
+                        self.broadcaster.publish('urgent_deal', email)
+            self.last_poll = {
+                'at': time.time(),
+                'window_emails': len(emails),
+                'new_emails': len(new),
+                'urgent_deals': len(urgent)
+            }
+            return self.last_poll
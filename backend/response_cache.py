@@ -0,0 +1,242 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+# orjson and brotli are optional; without them responses use json and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '128'))
+# Cached analytics contain "days until expiry"-style fields, so entries expire
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '300'))
+# Smaller bodies are sent uncompressed: the framing overhead outweighs the saving
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+
+
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def http_date(value: date) -> str:
+    """RFC 1123 date as werkzeug.http.http_date renders it (naive datetimes are UTC), without locale lookups"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    hour, minute, second = (value.hour, value.minute, value.second) if isinstance(value, datetime) else (0, 0, 0)
+    return (f"{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} "
+            f"{hour:02d}:{minute:02d}:{second:02d} GMT")
+
+
+def _default(value):
+    """Non-JSON types, rendered the way Flask's provider renders them"""
+    if isinstance(value, date):
+        return http_date(value)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY \
+        | orjson.OPT_SORT_KEYS
+
+    def dumps(obj) -> bytes:
+        """Compact JSON bytes with sorted keys (orjson)"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(obj) -> bytes:
+        """Compact JSON bytes with sorted keys"""
+        return json.dumps(obj, default=_default, separators=(',', ':'), sort_keys=True).encode()
+
+
+def fingerprint(*parts) -> str:
+    """Stable digest of request inputs (text, ids, parameters)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str) -> str:
+    """Changes whenever the file is rewritten, without reading it"""
+    stat = os.stat(path)
+    return fingerprint(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """'br' or 'gzip' from an Accept-Encoding header (brotli preferred when installed), else None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class CachedResponse:
+    """A serialized JSON body with its ETag and lazily built compressed variants"""
+
+    __slots__ = ('body', 'etag', 'status', 'created_at', '_encoded', '_lock')
+
+    def __init__(self, body: bytes, status: int = 200):
+        self.body = body
+        self.status = status
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.created_at = time.time()
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_payload(cls, payload, status: int = 200) -> 'CachedResponse':
+        return cls(dumps(payload), status)
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """Body in ``encoding``; each encoding is compressed once per entry"""
+        if encoding is None or len(self.body) < COMPRESS_MIN_BYTES:
+            return self.body
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                data = self._encoded[encoding] = compress(self.body, encoding)
+            return data
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Weak comparison against an If-None-Match header"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = (tag.strip() for tag in if_none_match.split(','))
+        return any(tag.removeprefix('W/').strip('"') == self.etag for tag in tags)
+
+    def render(self, method: str = 'GET', if_none_match: Optional[str] = None,
+               accept_encoding: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """(status, headers, body) for a request: 304 on a matching ETag, else the negotiated body"""
+        headers = {'ETag': f'W/"{self.etag}"', 'Vary': 'Accept-Encoding'}
+        if method in ('GET', 'HEAD') and self.matches(if_none_match):
+            return 304, headers, b''
+        encoding = choose_encoding(accept_encoding) if len(self.body) >= COMPRESS_MIN_BYTES else None
+        body = self.encoded(encoding)
+        headers['Content-Type'] = 'application/json'
+        headers['Content-Length'] = str(len(body))
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return self.status, headers, b'' if method == 'HEAD' else body
+
+
+class ResponseCache:
+    """LRU of serialized responses keyed by request fingerprint, with a TTL"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def _lookup(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl > 0 and time.time() - entry.created_at > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> CachedResponse:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Tuple[Dict, int]]) -> CachedResponse:
+        """Cached entry for ``key``, or ``compute()`` -> (payload, status) serialized once.
+
+        Concurrent misses on one key wait for a single computation. Only 200
+        responses are kept.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        # key -> [lock, threads holding or waiting on it]; the lock is dropped
+        # with its last user, so a late arrival can never get a second lock
+        with self._lock:
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                with self._lock:
+                    entry = self._lookup(key)
+                if entry is None:
+                    payload, status = compute()
+                    entry = CachedResponse.from_payload(payload, status)
+                    if status == 200:
+                        self.put(key, entry)
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del self._key_locks[key]
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(entry.body) for entry in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -1,29 +1,48 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from response_cache import CachedResponse
+
+DATA = {
+    "total_emails": 150,
+    "average_discount": 35.5,
+    "critical_deals": 10,
+    "top_senders": ["Amazon", "Best Buy", "Target", "Nike", "Walmart"]
+}
+
+# Serialized (and compressed, when large enough) once; every request reuses the bytes
+RESPONSE = CachedResponse.from_payload(DATA)
 
 class SimpleHandler(BaseHTTPRequestHandler):
+    # Keep-alive: responses carry Content-Length, so clients can reuse the connection
+    # (the threading server keeps one idle connection from blocking the others)
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        status, headers, body = RESPONSE.render(
+            self.command,
+            self.headers.get('If-None-Match'),
+            self.headers.get('Accept-Encoding')
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
         
-        data = {
-            "total_emails": 150,
-            "average_discount": 35.5,
-            "critical_deals": 10,
-            "top_senders": ["Amazon", "Best Buy", "Target", "Nike", "Walmart"]
-        }
-        
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+    
+    do_HEAD = do_GET
     
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
-print("Server starting on http://localhost:8000")
-server = HTTPServer(('localhost', 8000), SimpleHandler)
-server.serve_forever()
+if __name__ == '__main__':
+    print("Server starting on http://localhost:8000")
+    server = ThreadingHTTPServer(('localhost', 8000), SimpleHandler)
+    server.serve_forever()
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timedelta
+
+from aggregate_store import AggregateStore, SeenFilter, TopKSketch
+
+BASE = datetime(2024, 5, 1, 9, 30)
+
+
+def _email(i, sender='gap', hours=0, discount=20, promotion_type='flash_sale', duplicate=False):
+    return {'email_id': f"email_{i}", 'sender': sender, 'promotion_type': promotion_type,
+            'discount': discount, 'near_duplicate': duplicate, 'date': BASE + timedelta(hours=hours)}
+
+
+def _store(emails):
+    store = AggregateStore()
+    store.add_many(emails)
+    return store
+
+
+def test_summary_and_repeated_ids():
+    store = _store([_email(0), _email(1, sender='nike', discount=40), _email(2, discount=0, duplicate=True)])
+    assert not store.add(_email(0))
+    summary = store.summary()
+    assert summary['total_emails'] == 3
+    assert summary['average_discount'] == 30.0
+    assert summary['duplicate_emails'] == 1
+    assert summary['top_senders'] == {'gap': 2, 'nike': 1}
+    assert summary['date_range']['start'] == BASE.isoformat()
+
+
+def test_window_uses_hourly_edges_and_daily_buckets():
+    store = _store([_email(i, hours=i) for i in range(72)])
+    # 09:00 on day one to 09:00 on day three: partial days read hourly buckets
+    window = store.window(BASE.replace(minute=0), BASE.replace(minute=0) + timedelta(days=2))
+    assert window['total_emails'] == 48
+    assert store.window(datetime(2024, 5, 2), datetime(2024, 5, 3))['total_emails'] == 24
+
+
+def test_series_per_day():
+    store = _store([_email(i, hours=i) for i in range(48)])
+    points = store.series(datetime(2024, 5, 1), datetime(2024, 5, 4))
+    assert [point['total_emails'] for point in points] == [15, 24, 9]
+
+
+def test_merge_subtracts_overlapping_emails():
+    mine = _store([_email(0), _email(1, sender='nike'), _email(2, hours=30)])
+    theirs = _store([_email(1, sender='nike'), _email(2, hours=30), _email(3, sender='rei', discount=60)])
+    expected = _store([_email(0), _email(1, sender='nike'), _email(2, hours=30), _email(3, sender='rei', discount=60)])
+
+    mine.merge(theirs)
+    assert mine.summary() == expected.summary()
+    for start, end in ((datetime(2024, 5, 1), datetime(2024, 5, 3)), (BASE, BASE + timedelta(hours=1))):
+        assert mine.window(start, end) == expected.window(start, end)
+    assert not mine.add(_email(3, sender='rei'))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'aggregates.json')
+    store = _store([_email(i, hours=i) for i in range(10)])
+    store.save(path)
+    loaded = AggregateStore.load(path)
+    assert loaded.summary() == store.summary()
+    assert not loaded.add(_email(5))
+
+    # Merges after a restart still find overlaps
+    other = _store([_email(9, hours=9), _email(10, hours=10)])
+    loaded.merge(other)
+    assert loaded.summary()['total_emails'] == 11
+
+
+def test_load_converts_saved_id_list(tmp_path):
+    path = tmp_path / 'aggregates.json'
+    data = _store([_email(0), _email(1)]).to_dict()
+    data['seen'] = ['email_0', 'email_1']
+    del data['recent']
+    path.write_text(json.dumps(data))
+    loaded = AggregateStore.load(str(path))
+    assert loaded.summary()['total_emails'] == 2
+    assert not loaded.add(_email(1))
+    assert loaded.add(_email(2))
+
+
+def test_seen_filter_has_fixed_size():
+    seen = SeenFilter(capacity=1000, error_rate=0.01)
+    added = sum(seen.add(f"id{i}") for i in range(5000))
+    # Roughly capacity * error_rate false positives per generation
+    assert added > 4900
+    assert len(seen.current) == seen.size // 8
+    # Ids older than two generations are forgotten
+    assert 'id4999' in seen and 'id0' not in seen
+
+
+def test_top_k_sketch_keeps_heavy_hitters():
+    sketch = TopKSketch(capacity=3)
+    for key, count in (('a', 50), ('b', 30), ('c', 2), ('d', 1), ('e', 1)):
+        sketch.add(key, count)
+    top = dict(sketch.top(2))
+    assert set(top) == {'a', 'b'}
+    sketch.remove('a', 10)
+    assert dict(sketch.top(1)) == {'a': 40}
+
+
+def test_flush_saves_changes_made_since_the_last_save(tmp_path):
+    path = str(tmp_path / 'aggregates.json')
+    store = AggregateStore(path=path)
+    store.add_many([_email(0), _email(1)])
+    store.save()
+    store.add(_email(2))
+    # Within the save interval maybe_save waits; flush (used at exit) does not
+    store.maybe_save()
+    assert AggregateStore.load(path).summary()['total_emails'] == 2
+    store.flush()
+    assert AggregateStore.load(path).summary()['total_emails'] == 3
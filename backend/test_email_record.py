@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from email_analyzer import AnalyticsAccumulator, EmailAnalyzer
+from email_record import EmailRecord, field_reader
+
+NOW = datetime.now()
+
+
+def _fields(i):
+    return {'sender': f"store{i % 3}", 'subject': f"deal {i}", 'body': '', 'date': datetime(2024, 5, i + 1),
+            'discount': (i * 10) or None, 'expiry': NOW + timedelta(hours=6 * i + 1),
+            'promotion_type': 'flash_sale' if i % 2 else 'clearance', 'near_duplicate': i == 4}
+
+
+def test_record_behaves_like_a_dict():
+    record = EmailRecord.from_dict({'sender': 'gap', 'subject': 'hi', 'promo_code': 'SAVE'})
+    assert record['promo_code'] == 'SAVE'
+    assert 'urgency_score' not in record
+    assert record.get('urgency_score', 5) == 5
+    record['promotion_type'] = 'bogo'
+    assert record.to_dict()['ai_summary'] == 'Promotion from gap offering special% discount'
+
+
+def test_field_reader_matches_get():
+    records = [EmailRecord.from_dict(_fields(i)) for i in range(3)]
+    dicts = [_fields(i) for i in range(3)]
+    assert field_reader(records) is getattr
+    assert field_reader(dicts) is dict.get
+    for emails in (records, dicts, records[:1] + dicts[1:]):
+        read = field_reader(emails)
+        assert [read(e, 'urgency_score', 5) for e in emails] == [5, 5, 5]
+        assert [read(e, 'sender') for e in emails] == ['store0', 'store1', 'store2']
+
+
+def test_analytics_are_the_same_for_records_and_dicts():
+    dicts = [_fields(i) for i in range(10)]
+    records = [EmailRecord.from_dict(fields) for fields in dicts]
+    analyzer = EmailAnalyzer()
+    expected = analyzer.generate_analytics(dicts, backend='python')
+    assert expected['duplicate_emails'] == 1
+    assert len(expected['critical_deals']) == 7
+    for emails in (records, dicts[:5] + records[5:]):
+        assert analyzer.generate_analytics(emails, backend='python') == expected
+
+    accumulator = AnalyticsAccumulator()
+    for email in records:
+        accumulator.add(email)
+    result = accumulator.result()
+    assert result['critical_deals'] == expected['critical_deals']
+    assert result['top_senders'] == expected['top_senders']
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def _fake_encode(texts):
+    return np.array([[len(text), text.count('a'), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_encode_calls_model_once_per_distinct_text():
+    cache = EmbeddingCache()
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return _fake_encode(texts)
+
+    result = cache.encode(['Sale  today', 'sale today', 'other'], encode)
+    assert result.shape == (3, 3)
+    assert calls == [['Sale  today', 'other']]
+    cache.encode(['other'], encode)
+    assert len(calls) == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = EmbeddingCache(disk_path=str(tmp_path))
+    expected = cache.encode(['one', 'two', 'three'], _fake_encode)
+
+    reopened = EmbeddingCache(disk_path=str(tmp_path))
+    np.testing.assert_array_equal(reopened.encode(['one', 'two', 'three'], _fail), expected)
+    assert reopened.stats()['disk_hits'] == 3
+
+
+def test_torn_row_and_index_line_are_ignored(tmp_path):
+    cache = EmbeddingCache(disk_path=str(tmp_path))
+    cache.encode(['one', 'two'], _fake_encode)
+    # A crash mid-append: half a row in the matrix, half a line in the index
+    with open(tmp_path / 'embeddings.f32', 'ab') as f:
+        f.write(b'\x00' * 6)
+    with open(tmp_path / 'index.txt', 'a') as f:
+        f.write(f"{cache.key('three')} 2")
+
+    reopened = EmbeddingCache(disk_path=str(tmp_path))
+    assert reopened.stats()['disk_entries'] == 2
+    assert os.path.getsize(tmp_path / 'embeddings.f32') == 2 * 3 * 4
+    assert reopened.get('three') is None
+
+    # The next append lands on a row boundary
+    reopened.encode(['four'], _fake_encode)
+    again = EmbeddingCache(disk_path=str(tmp_path))
+    np.testing.assert_array_equal(again.get('four'), _fake_encode(['four'])[0])
+    np.testing.assert_array_equal(again.get('one'), _fake_encode(['one'])[0])
+
+
+def _fail(texts):
+    raise AssertionError(f"model called for {texts}")
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from expiry import ExpiryIndex, extract_expiry
+
+# A Wednesday morning
+SENT = datetime(2024, 5, 1, 10, 0)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Only 48 hours left!', SENT + timedelta(hours=48)),
+    ('Sale ends in 3 days.', SENT + timedelta(days=3)),
+    ('This offer expires within 24 hours', SENT + timedelta(hours=24)),
+    ('Flash sale for 2 days only', SENT + timedelta(days=2)),
+    ('Flash sale ends tonight at midnight.', datetime(2024, 5, 1, 23, 59, 59)),
+    ('Order by midnight for free shipping', datetime(2024, 5, 1, 23, 59, 59)),
+    ('Last chance, ends tomorrow', datetime(2024, 5, 2, 23, 59, 59)),
+    ('This weekend only.', datetime(2024, 5, 5, 23, 59, 59)),
+    ('Ends Sunday.', datetime(2024, 5, 5, 23, 59, 59)),
+    ('Offer expires 10/31.', datetime(2024, 10, 31, 23, 59, 59)),
+    ('Save 20% by 11/30.', datetime(2024, 11, 30, 23, 59, 59)),
+    ('Valid through December 15, 2026.', datetime(2026, 12, 15, 23, 59, 59)),
+    ('Shop before dec 1st', datetime(2024, 12, 1, 23, 59, 59)),
+    ('Offer expires 3/1', datetime(2025, 3, 1, 23, 59, 59)),
+    ('ends 2024-11-30', datetime(2024, 11, 30, 23, 59, 59)),
+])
+def test_deadlines(text, expected):
+    assert extract_expiry(text, SENT) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'New arrivals are here, shop the collection.',
+    'Shop by category and save.',
+    'Loved by 12/345 shoppers',
+    'Our summer sale before August 2024 was our biggest',
+    'Offer valid thru 13/40',
+    'Free shipping: arrives in 2 days',
+    'Ships within 24 hours of your order',
+    'Our team replies within 48 hours',
+    'We have served you for 5 days only',
+])
+def test_no_deadline(text):
+    assert extract_expiry(text, SENT) is None
+
+
+def test_earliest_deadline_wins():
+    assert extract_expiry('Ends Sunday. Members: only 2 days left!', SENT) == SENT + timedelta(days=2)
+
+
+def _deal(i, hours, discount=20):
+    return {'email_id': f"email_{i}", 'sender': 'gap', 'subject': f"deal {i}", 'discount': discount,
+            'expiry': SENT + timedelta(hours=hours)}
+
+
+def test_index_orders_by_expiry_and_filters_discount():
+    index = ExpiryIndex()
+    index.add_many([_deal(0, 30, 50), _deal(1, 5, 10), _deal(2, 10, 60), _deal(3, 100, 70), _deal(4, -1, 90)])
+    deals = index.expiring(within_hours=48, min_discount=40, now=SENT)
+    assert [deal['email_id'] for deal in deals] == ['email_2', 'email_0']
+    assert deals[0]['expires_in_hours'] == 10.0
+
+
+@pytest.mark.parametrize('batch', [1, 3, 1000])
+def test_batches_match_a_full_sort(batch):
+    deals = [_deal(i, (i * 37) % 200, (i * 13) % 100) for i in range(300)]
+    # Re-adding an id replaces it, also within one batch
+    deals += [_deal(5, 1, 95), _deal(5, 2, 95), _deal(7, 3, 0)]
+    index = ExpiryIndex()
+    for start in range(0, len(deals), batch):
+        index.add_many(deals[start:start + batch])
+
+    latest = {deal['email_id']: deal for deal in deals}
+    expected = {(deal['email_id'], deal['expiry']) for deal in latest.values()
+                if deal['expiry'] <= SENT + timedelta(hours=48)}
+    result = index.expiring(within_hours=48, limit=1000, now=SENT)
+    assert len(index) == 300
+    assert {(deal['email_id'], deal['expiry']) for deal in result} == expected
+    assert [deal['expiry'] for deal in result] == sorted(deal['expiry'] for deal in result)
+    assert sum(len(keys) for keys in index._keys) == 300
+
+
+def test_prune_drops_expired():
+    index = ExpiryIndex()
+    index.add_many([_deal(0, -5), _deal(1, 5)])
+    assert index.prune(now=SENT) == 1
+    assert len(index) == 1
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from benchmarks.fake_gmail import FakeMailbox, base_url, serve
+from gmail_connector import LIST_PAGE_SIZE, GmailConnector
+
+
+@pytest.fixture
+def mailbox():
+    mailbox = FakeMailbox(seed=1)
+    mailbox.add(30, age_days=3)
+    server = serve(mailbox)
+    mailbox.url = base_url(server)
+    yield mailbox
+    server.shutdown()
+
+
+@pytest.fixture
+def connect(mailbox, tmp_path):
+    connectors = []
+
+    def connect(sync_interval=0):
+        connector = GmailConnector(access_token='fake', base_url=mailbox.url, workers=2,
+                                   cache_path=str(tmp_path / 'gmail.sqlite3'), sync_interval=sync_interval)
+        connectors.append(connector)
+        return connector
+
+    yield connect
+    for connector in connectors:
+        connector.close()
+
+
+def test_cache_is_opened_on_first_sync(connect, tmp_path):
+    connector = connect()
+    assert connector.service is connector
+    assert not os.path.exists(tmp_path / 'gmail.sqlite3')
+    connector.sync()
+    assert os.path.exists(tmp_path / 'gmail.sqlite3')
+
+
+def test_first_sync_lists_and_fetches(connect):
+    connector = connect()
+    assert connector.sync(max_results=50) == {'fetched': 30, 'mode': 'full'}
+    emails = connector.get_promotional_emails(max_results=10)
+    assert len(emails) == 10
+    assert emails[0]['date'] >= emails[-1]['date']
+    assert emails[0]['sender'].startswith('deals@')
+
+
+def test_incremental_sync_fetches_only_new_messages(connect, mailbox):
+    connector = connect()
+    connector.sync()
+    mailbox.add(5)
+    before = mailbox.requests
+    assert connector.sync() == {'fetched': 5, 'mode': 'incremental'}
+    # One history page plus the five new messages, no listing
+    assert mailbox.requests - before == 6
+    assert connector.cache.count('shopper@example.com') == 35
+
+
+def test_expired_history_falls_back_to_listing(connect, mailbox):
+    connector = connect()
+    connector.sync()
+    mailbox.add(2)
+    mailbox.expire_history()
+    assert connector.sync() == {'fetched': 2, 'mode': 'full'}
+    # The new cursor works again
+    mailbox.add(1)
+    assert connector.sync() == {'fetched': 1, 'mode': 'incremental'}
+
+
+def test_recent_sync_is_served_from_cache(connect, mailbox):
+    connector = connect(sync_interval=60)
+    connector.sync()
+    before = mailbox.requests
+    assert connector.sync() == {'fetched': 0, 'mode': 'cached'}
+    assert len(connector.get_promotional_emails(max_results=50)) == 30
+    assert mailbox.requests == before
+    # A wider window than was listed still goes to the API
+    assert connector.sync(days_back=30)['mode'] == 'backfill'
+
+
+def test_more_results_than_listed_relists(connect, mailbox):
+    mailbox.add(LIST_PAGE_SIZE + 70, age_days=3)
+    connector = connect(sync_interval=60)
+    assert connector.sync(max_results=50)['fetched'] == LIST_PAGE_SIZE
+    assert connector.cache.state('shopper@example.com')['list_limit'] == LIST_PAGE_SIZE
+
+    emails = connector.get_promotional_emails(max_results=1000)
+    assert len(emails) == LIST_PAGE_SIZE + 100
+    # That listing reached the end of the window, so any size is served from cache now
+    assert connector.cache.state('shopper@example.com')['list_limit'] is None
+    assert connector.sync(max_results=5000)['mode'] == 'cached'
@@ -0,0 +1,69 @@
+import threading
+from datetime import datetime
+
+from ai_classifier import STATUS_READY, AIClassifier
+from encoders import HashingEncoder
+from job_queue import FAILED, SUCCEEDED, Job, JobQueue
+from vector_store import NumpyVectorStore
+
+
+def _wait(queue, job):
+    queue.shutdown(wait=True)
+    return queue.get(job.id)
+
+
+def test_identical_active_jobs_are_deduplicated():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+
+    def run(job):
+        release.wait()
+        return {'ok': True}, 200
+
+    first, created = queue.submit('analyze', {'emails': 'a'}, run)
+    second, created_again = queue.submit('analyze', {'emails': 'a'}, run)
+    other, created_other = queue.submit('analyze', {'emails': 'b'}, run)
+    assert created and not created_again and created_other
+    assert second is first
+    assert other is not first
+
+    release.set()
+    assert _wait(queue, first).status == SUCCEEDED
+    assert first.to_dict()['result'] == {'ok': True}
+
+
+def test_finished_job_is_not_reused():
+    queue = JobQueue(max_workers=1)
+    job, _ = queue.submit('analyze', {'emails': 'a'}, lambda job: ({}, 200))
+    queue._executor.submit(lambda: None).result()
+    again, created = queue.submit('analyze', {'emails': 'a'}, lambda job: ({}, 200))
+    assert created and again is not job
+    queue.shutdown()
+
+
+def test_failed_job_reports_error():
+    queue = JobQueue(max_workers=1)
+
+    def run(job):
+        raise RuntimeError('gmail unavailable')
+
+    job, _ = queue.submit('analyze-gmail', {}, run)
+    job = _wait(queue, job)
+    assert job.status == FAILED
+    assert job.to_dict()['error'] == 'gmail unavailable'
+
+
+def test_stored_progress_counts_rows_written(tmp_path):
+    classifier = AIClassifier(encoder_backend='hashing', search_window_ms=0)
+    classifier._model = HashingEncoder(64)
+    classifier._vector_store = NumpyVectorStore(str(tmp_path))
+    classifier.status = STATUS_READY
+
+    email = {'sender': 'Gap <deals@gap.example>', 'subject': 'Denim sale', 'date': datetime(2024, 5, 1),
+             'body': 'Save 40% on denim this weekend only with code DENIM40.'}
+    job = Job('analyze', 'key', {})
+    classified = list(classifier.classify_stream([dict(email), dict(email)], batch_size=1,
+                                                 on_stored=lambda count: job.advance('stored', count)))
+    assert len(classified) == 2
+    # The second copy is an exact re-run and is not written again
+    assert job.progress['stored'] == 1
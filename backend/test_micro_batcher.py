@@ -0,0 +1,59 @@
+import threading
+
+from ai_classifier import STATUS_READY, AIClassifier
+from encoders import HashingEncoder
+from micro_batcher import MicroBatcher
+from vector_store import NumpyVectorStore
+
+
+def test_an_error_result_fails_only_its_caller():
+    batches = []
+
+    def process(items):
+        batches.append(items)
+        return [ValueError(item) if item == 'bad' else item.upper() for item in items]
+
+    batcher = MicroBatcher(process, window_ms=200, max_batch=3)
+    results = {}
+
+    def call(item):
+        try:
+            results[item] = batcher.submit(item, timeout=5)
+        except ValueError as e:
+            results[item] = e
+
+    threads = [threading.Thread(target=call, args=(item,)) for item in ('a', 'bad', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert len(batches) == 1
+    assert results['a'] == 'A' and results['b'] == 'B'
+    assert isinstance(results['bad'], ValueError)
+
+
+class _PickyStore(NumpyVectorStore):
+    def query(self, embeddings, n_results=5, where=None):
+        if where and where.get('sender') == 'broken':
+            raise RuntimeError('filter failed')
+        return super().query(embeddings, n_results, where)
+
+
+def test_failing_filter_group_does_not_fail_the_batch(tmp_path):
+    classifier = AIClassifier(encoder_backend='hashing', search_window_ms=0)
+    classifier._model = encoder = HashingEncoder(64)
+    classifier._vector_store = store = _PickyStore(str(tmp_path))
+    classifier.status = STATUS_READY
+    store.upsert(['e1'], encoder.encode(['boots sale']), ['boots sale'],
+                 [{'sender': 'gap', 'subject': 'Boots', 'promotion_type': 'flash_sale', 'discount': '40',
+                   'urgency_score': 9, 'value_score': 5}])
+
+    results = classifier.search_batch([('boots', 5, None), ('boots', 5, {'sender': 'broken'}),
+                                       ('boots', 5, {'sender': 'gap'})])
+    assert len(results[0]) == 1 and len(results[2]) == 1
+    assert isinstance(results[1], RuntimeError)
+    # Unbatched searches still surface the error (logged, no hits)
+    assert classifier.semantic_search('boots', filters={'sender': 'broken'}) == []
+    assert classifier.semantic_search('boots', filters={'sender': 'gap'})[0]['sender'] == 'gap'
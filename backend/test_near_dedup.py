@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from ai_classifier import STATUS_READY, AIClassifier
+from encoders import HashingEncoder
+from near_dedup import NearDuplicateDetector, content_id, simhash
+from vector_store import NumpyVectorStore
+
+TEMPLATE = ("Hi there, this weekend only take 30% off running shoes, boots and jackets across the whole store. "
+            "Shop the full collection online or in store, with free returns on every order. Members earn double "
+            "points on all purchases made this month. Prices as marked, while supplies last. "
+            "Use code {code} at checkout.")
+
+
+def _email(code, sender='Nike <deals@nike.example>'):
+    return {'sender': sender, 'subject': 'Weekend sale', 'date': datetime(2024, 5, 1),
+            'body': TEMPLATE.format(code=code)}
+
+
+def test_templated_bodies_are_close_and_unrelated_ones_are_not():
+    first = simhash(TEMPLATE.format(code='A1'))
+    second = simhash(TEMPLATE.format(code='Q77'))
+    other = simhash('Quarterly statement for your savings account is now available to download.')
+    assert bin(first ^ second).count('1') <= 7
+    assert bin(first ^ other).count('1') > 7
+
+
+def test_content_id_is_stable():
+    assert content_id(_email('A1')) == content_id(_email('A1'))
+    assert content_id(_email('A1')) != content_id(_email('A3'))
+
+
+def test_check_does_not_index_until_added():
+    detector = NearDuplicateDetector()
+    duplicate_of, signature = detector.check('a', 'nike', TEMPLATE.format(code='A1'))
+    assert duplicate_of is None
+    assert detector.check('b', 'nike', TEMPLATE.format(code='Q77'))[0] is None
+
+    detector.add([('a', 'nike', signature)])
+    assert detector.seen('a')
+    assert detector.check('b', 'nike', TEMPLATE.format(code='Q77'))[0] == 'a'
+    # Other senders and exact re-runs are not duplicates
+    assert detector.check('c', 'gap', TEMPLATE.format(code='Q77'))[0] is None
+    assert detector.check('a', 'nike', TEMPLATE.format(code='A1'))[0] is None
+
+
+def test_pending_catches_duplicates_within_a_batch():
+    detector = NearDuplicateDetector()
+    pending = {}
+    assert detector.check('a', 'nike', TEMPLATE.format(code='A1'), pending)[0] is None
+    assert detector.check('b', 'nike', TEMPLATE.format(code='Q77'), pending)[0] == 'a'
+    assert detector.stats()['indexed'] == 0
+
+
+def test_signatures_are_bounded():
+    detector = NearDuplicateDetector(max_signatures=3)
+    detector.add([(f"id{i}", 'nike', simhash(f"unrelated promotion number {i} for item {i * 7}"))
+                  for i in range(10)])
+    assert detector.stats()['indexed'] == 3
+    assert not detector.seen('id0')
+    assert detector.seen('id9')
+    indexed = {email_id for bucket in detector._buckets.values() for email_id, _ in bucket}
+    assert indexed == {'id7', 'id8', 'id9'}
+
+
+class _FailingStore:
+    def upsert(self, **kwargs):
+        raise IOError('disk full')
+
+
+def _classifier(store):
+    classifier = AIClassifier(encoder_backend='hashing', search_window_ms=0)
+    classifier._model = HashingEncoder(64)
+    classifier._vector_store = store
+    classifier.status = STATUS_READY
+    return classifier
+
+
+def test_failed_upsert_records_no_signatures(caplog, tmp_path):
+    classifier = _classifier(_FailingStore())
+    classifier.classify_promotions([_email('A1')])
+    assert classifier.dedup.stats()['indexed'] == 0
+    assert 'Error storing 1 emails in vector DB' in caplog.text
+
+    # The retry is indexed rather than suppressed by the failed attempt
+    classifier._vector_store = store = NumpyVectorStore(str(tmp_path))
+    classified = classifier.classify_promotions([_email('A1'), _email('Q77')])
+    assert store.count() == 1
+    assert classified[1]['near_duplicate']
+    assert classified[1]['duplicate_of'] == classified[0]['email_id']
+    assert classifier.dedup.stats()['indexed'] == 1
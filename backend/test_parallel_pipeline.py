@@ -0,0 +1,27 @@
+from datetime import date
+
+import pytest
+
+from email_analyzer import EMAIL_SEPARATOR
+from parallel_pipeline import analyze_parallel_text, analyze_serial
+
+BODIES = ['Flash sale: 40% off everything. Only 48 hours left!',
+          'Clearance, 60% off. Sale ends in 3 days.',
+          'New arrivals picked for you.',
+          'Take 35% off, today only.']
+
+
+def _corpus(n):
+    today = date.today().isoformat()
+    return ''.join(f"{EMAIL_SEPARATOR}From: store{i % 3}@example.com\nSubject: Deal {i}\nDate: {today}\n"
+                   f"Body: {BODIES[i % len(BODIES)]}\n" for i in range(n))
+
+
+@pytest.mark.parametrize('workers, emails_per_task', [(1, 4), (2, 3), (2, 1000)])
+def test_merged_analytics_match_the_serial_pipeline(workers, emails_per_task):
+    text = _corpus(60)
+    expected = analyze_serial(text)
+    # More tied critical deals than are kept, so the merge must keep input order
+    assert len(expected['critical_deals']) == 10
+    assert len({deal['expires_in_days'] for deal in expected['critical_deals']}) == 1
+    assert analyze_parallel_text(text, workers=workers, emails_per_task=emails_per_task) == expected
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from promotion_rules import DEFAULT_URGENCY_SCORE, PromotionMatcher
+
+
+def _matcher(rules=None, substring_scan=True):
+    matcher = PromotionMatcher(rules)
+    matcher.substring_scan = substring_scan
+    return matcher
+
+
+@pytest.fixture(params=[True, False], ids=['substring', 'regex'])
+def substring_scan(request):
+    return request.param
+
+
+@pytest.mark.parametrize('text, promotion_type', [
+    ('Flash sale on boots', 'flash_sale'),
+    ('Clearance: 40% off everything', 'clearance'),
+    ('BOGO sneakers this week', 'bogo'),
+    ('Save 25 percent off denim', 'percentage_off'),
+    ('Free delivery on all orders', 'free_shipping'),
+    ('New arrivals picked for you', 'general'),
+    ('Up to 30 percent of our range is new', 'general'),
+])
+def test_promotion_type(text, promotion_type, substring_scan):
+    assert _matcher(substring_scan=substring_scan).scan(text).promotion_type == promotion_type
+
+
+def test_earlier_rule_wins_and_scores_follow_it(substring_scan):
+    matches = _matcher(substring_scan=substring_scan).scan('Free shipping and a flash sale, today only')
+    assert matches.promotion_type == 'flash_sale'
+    assert matches.urgency_score == 9
+    assert 'flash_sale' in matches.rule_names
+
+
+def test_regex_scan_reports_every_rule():
+    matches = _matcher(substring_scan=False).scan('Free shipping and a flash sale, today only')
+    assert {'flash_sale', 'free_shipping'} <= matches.rule_names
+
+
+@pytest.mark.parametrize('text, discount', [
+    ('Take 30% OFF, then 50 % off. Offer EXPIRES Sunday', 30),
+    ('20 percent 50% off', 50),
+    ('Flash sale: 40 percent off', 40),
+    ('30 percent', None),
+    ('Up to half price', None),
+])
+def test_discount(text, discount, substring_scan):
+    assert _matcher(substring_scan=substring_scan).scan(text).discount == discount
+
+
+def test_expires_flag(substring_scan):
+    assert 'expires' in _matcher(substring_scan=substring_scan).scan('Flash sale. Offer EXPIRES Sunday').flags
+
+
+def test_pattern_rule_without_first_chars_still_matches(substring_scan):
+    matcher = _matcher([
+        {'name': 'points', 'promotion_type': 'loyalty', 'pattern': r'(?P<value>[0-9]+)x points',
+         'extracts': 'multiplier'},
+        {'name': 'sale', 'promotion_type': 'sale', 'keywords': ['Sale']},
+    ], substring_scan)
+    matches = matcher.scan('Earn 3x points during the SALE')
+    assert matches.promotion_type == 'loyalty'
+    assert matches.extracted == {'multiplier': 3}
+    assert 'points' in matches.rule_names
+    assert matches.urgency_score == DEFAULT_URGENCY_SCORE
+    assert matcher.scan('Summer sale').promotion_type == 'sale'
+
+
+def test_small_rule_sets_use_the_substring_scan():
+    assert PromotionMatcher().substring_scan
+    keywords = [f"promo{i:04d}" for i in range(100)]
+    assert not PromotionMatcher([{'name': 'custom', 'promotion_type': 'custom', 'keywords': keywords}]).substring_scan
+
+
+def test_rules_from_config(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'rules': [{'name': 'vip', 'promotion_type': 'vip',
+                                           'keywords': ['members only', 'vip']}]}))
+    matcher = PromotionMatcher.from_config(str(path))
+    assert matcher.scan('VIP early access').promotion_type == 'vip'
+    assert matcher.scan('40% off').promotion_type == 'general'
@@ -0,0 +1,94 @@
+from realtime_stream import EventBroadcaster, RealtimeMonitor
+
+
+def test_subscribers_are_capped():
+    broadcaster = EventBroadcaster(max_subscribers=2)
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    assert broadcaster.subscribe() is None
+    first.close()
+    third = broadcaster.subscribe()
+    assert third is not None
+    assert broadcaster.subscriber_count == 2
+
+
+def test_subscribers_are_unlimited_without_a_cap():
+    broadcaster = EventBroadcaster(max_subscribers=0)
+    assert all(broadcaster.subscribe() is not None for _ in range(50))
+
+
+def _publish(broadcaster, n):
+    return [broadcaster.publish('urgent_deal', {'email_id': f"email_{i}"}).id for i in range(n)]
+
+
+def _drain(subscription):
+    ids = []
+    event = subscription.get(timeout=0)
+    while event is not None:
+        ids.append(event.id)
+        event = subscription.get(timeout=0)
+    return ids
+
+
+def test_resume_replays_events_after_last_id():
+    broadcaster = EventBroadcaster()
+    ids = _publish(broadcaster, 5)
+    assert _drain(broadcaster.subscribe(ids[1])) == ids[2:]
+    assert _drain(broadcaster.subscribe(str(ids[-1]))) == []
+    # No id (a first connection) gets only new events
+    fresh = broadcaster.subscribe()
+    later = _publish(broadcaster, 2)
+    assert _drain(fresh) == later
+
+
+def test_resume_falls_back_to_kept_history():
+    broadcaster = EventBroadcaster(history=3)
+    ids = _publish(broadcaster, 6)
+    # Ids older than the history, unknown ids and ids from before a restart replay what is kept
+    for last_event_id in (ids[0], 'garbage', ids[-1] + 100):
+        assert _drain(broadcaster.subscribe(last_event_id)) == ids[-3:]
+
+
+def test_overflowed_client_resumes_where_it_stopped():
+    broadcaster = EventBroadcaster(max_queue=2)
+    subscription = broadcaster.subscribe()
+    ids = _publish(broadcaster, 4)
+    assert subscription.overflowed
+    received = _drain(subscription)
+    assert received == ids[:2]
+    assert _drain(broadcaster.subscribe(received[-1])) == ids[2:]
+
+
+def test_stream_renders_replayed_frames():
+    broadcaster = EventBroadcaster()
+    ids = _publish(broadcaster, 2)
+    stream = broadcaster.subscribe(ids[0]).stream(heartbeat=0)
+    assert next(stream).startswith('retry:')
+    assert next(stream).startswith(f"id: {ids[1]}\nevent: urgent_deal\n")
+    assert next(stream) == ': keep-alive\n\n'
+    stream.close()
+    assert broadcaster.subscriber_count == 0
+
+
+def test_each_message_is_classified_once_however_many_clients():
+    broadcaster = EventBroadcaster()
+    subscriptions = [broadcaster.subscribe() for _ in range(5)]
+    window = [{'id': f"m{i}", 'urgency_score': 9 if i % 2 else 3} for i in range(4)]
+    batches = []
+
+    def classify(emails):
+        batches.append([email['id'] for email in emails])
+        return [dict(email) for email in emails]
+
+    monitor = RealtimeMonitor(lambda: list(window), classify, broadcaster, urgency_threshold=7)
+    assert monitor.poll_once()['new_emails'] == 4
+    window.append({'id': 'm4', 'urgency_score': 8})
+    assert monitor.poll_once() == dict(monitor.last_poll, window_emails=5, new_emails=1, urgent_deals=1)
+    assert monitor.poll_once()['new_emails'] == 0
+
+    # One classify call per poll with new mail, each id in exactly one of them
+    assert batches == [['m0', 'm1', 'm2', 'm3'], ['m4']]
+    # Every client gets every urgent deal from that single classification
+    published = broadcaster.recent()[::-1]
+    assert [event.data['id'] for event in published] == ['m1', 'm3', 'm4']
+    for subscription in subscriptions:
+        assert _drain(subscription) == [event.id for event in published]
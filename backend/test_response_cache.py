@@ -0,0 +1,92 @@
+import threading
+import time
+
+from response_cache import CachedResponse, ResponseCache
+
+
+def test_etag_match_returns_304():
+    entry = CachedResponse.from_payload({'deals': [1, 2, 3]})
+    status, headers, body = entry.render('GET', f'W/"{entry.etag}"')
+    assert status == 304
+    assert body == b''
+    assert headers['ETag'] == f'W/"{entry.etag}"'
+
+
+def test_etag_mismatch_returns_body():
+    entry = CachedResponse.from_payload({'deals': [1, 2, 3]})
+    status, headers, body = entry.render('GET', 'W/"stale", "other"')
+    assert status == 200
+    assert body == entry.body
+    assert headers['Content-Length'] == str(len(body))
+
+
+def test_etag_is_stable_for_equal_payloads():
+    first = CachedResponse.from_payload({'b': 1, 'a': 2})
+    second = CachedResponse.from_payload({'a': 2, 'b': 1})
+    assert first.etag == second.etag
+
+
+def test_large_body_is_gzipped_once():
+    entry = CachedResponse.from_payload({'text': 'deal ' * 1000})
+    status, headers, body = entry.render('GET', accept_encoding='gzip, deflate')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert entry.encoded('gzip') is body
+
+
+def test_only_200_responses_are_cached():
+    cache = ResponseCache()
+    cache.get_or_compute('k', lambda: ({'error': 'busy'}, 503))
+    assert cache.get('k') is None
+    cache.get_or_compute('k', lambda: ({'ok': True}, 200))
+    assert cache.get('k') is not None
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResponseCache()
+    calls = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'value': 1}, 200
+
+    def worker():
+        start.wait()
+        cache.get_or_compute('k', compute)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert cache._key_locks == {}
+
+
+def test_late_arrival_shares_the_key_lock():
+    cache = ResponseCache()
+    computing = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        computing.set()
+        release.wait()
+        return {'error': 'retry'}, 500
+
+    first = threading.Thread(target=cache.get_or_compute, args=('k', slow))
+    first.start()
+    computing.wait()
+    second = threading.Thread(target=cache.get_or_compute, args=('k', slow))
+    second.start()
+    # Wait until the second caller is registered on the key's lock
+    while cache._key_locks['k'][1] < 2:
+        time.sleep(0.001)
+    release.set()
+    first.join()
+    second.join()
+    # An uncached 500 is recomputed by the waiter, one caller at a time
+    assert len(calls) == 2
+    assert cache._key_locks == {}
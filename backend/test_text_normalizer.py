@@ -0,0 +1,51 @@
+from text_normalizer import normalize_body, strip_boilerplate, truncate_tokens
+
+
+def test_trailing_footer_lines_are_dropped():
+    text = ("Save 40% on boots this weekend.\nUse code BOOTS40 at checkout.\n\n"
+            "Unsubscribe | Manage preferences\n"
+            "You are receiving this email because you signed up. Privacy Policy. All rights reserved.\n"
+            "123 Market Street, Suite 400, San Francisco, CA 94105")
+    assert strip_boilerplate(text) == "Save 40% on boots this weekend.\nUse code BOOTS40 at checkout."
+
+
+def test_deal_text_next_to_a_footer_phrase_is_kept():
+    text = "New boots are in.\nTerms and conditions apply, 40% off boots ends Friday"
+    assert normalize_body(text) == "New boots are in. apply, 40% off boots ends Friday"
+
+
+def test_only_the_phrase_is_cut_above_the_footer():
+    text = "View this email in your browser\nFlash sale: 30% off denim. See privacy policy for details.\nShop now"
+    assert normalize_body(text) == "Flash sale: 30% off denim. See for details. Shop now"
+
+
+def test_text_without_boilerplate_is_unchanged():
+    text = "Save 20% on tees with code DEAL12345.\nEnds tonight."
+    assert strip_boilerplate(text) == text
+
+
+def test_html_newsletter():
+    html = ('<html><head><style>p{color:red}</style></head><body>'
+            '<div style="display:none">Big sale&nbsp;&#8203;&zwnj;</div>'
+            '<p>Take 25% off everything &amp; free shipping</p><p>Ends tonight.</p>'
+            '<table><tr><td><p>&copy; 2024 Shop Inc. All rights reserved.</p>'
+            '<p><a href="#">Unsubscribe</a></p></td></tr></table></body></html>')
+    assert normalize_body(html) == "Big sale Take 25% off everything & free shipping Ends tonight."
+
+
+def test_truncate_tokens():
+    text = ' '.join(f"word{i}" for i in range(1000))
+    assert truncate_tokens(text, 10) == ' '.join(f"word{i}" for i in range(10))
+    assert truncate_tokens('short text', 10) == 'short text'
+
+
+def test_cut_phrase_keeps_the_case_of_the_line():
+    # "İ" lowercases to two characters, so the line is matched case-insensitively
+    assert normalize_body("İstanbul Flash SALE, Unsubscribe HERE") == "İstanbul Flash SALE, HERE"
+
+
+def test_only_whole_address_lines_are_removed():
+    text = "Visit our Main St store: 40% off boots, order 12345 ships today"
+    assert normalize_body(text) == text
+    text = "Flash sale on boots\n123 Market Street, Suite 400, San Francisco, CA 94105\nShop now"
+    assert normalize_body(text) == "Flash sale on boots Shop now"
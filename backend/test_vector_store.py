@@ -0,0 +1,36 @@
+import json
+import os
+
+import numpy as np
+
+from vector_store import NumpyVectorStore
+
+
+def _upsert(store, ids):
+    rng = np.random.default_rng(len(ids))
+    store.upsert(ids, rng.normal(size=(len(ids), 8)), [f"doc {i}" for i in ids],
+                 [{'sender': 'gap', 'discount': 10} for _ in ids])
+
+
+def test_reopens_after_a_torn_record(tmp_path):
+    path = str(tmp_path)
+    _upsert(NumpyVectorStore(path), ['a', 'b', 'c'])
+    records = os.path.join(path, 'records.jsonl')
+    size = os.path.getsize(records)
+    with open(records, 'a') as f:
+        f.write('{"id": "d", "row": 3, "meta')
+
+    store = NumpyVectorStore(path)
+    assert store.count() == 3
+    assert os.path.getsize(records) == size
+    # Later upserts append on a clean line and survive the next reopen
+    _upsert(store, ['d'])
+    assert NumpyVectorStore(path).count() == 4
+
+
+def test_meta_is_replaced_whole(tmp_path):
+    path = str(tmp_path)
+    _upsert(NumpyVectorStore(path), ['a'])
+    with open(os.path.join(path, 'meta.json')) as f:
+        assert json.load(f)['dim'] == 8
+    assert not os.path.exists(os.path.join(path, 'meta.json.tmp'))
@@ -0,0 +1,130 @@
+import os
+import re
+from html import unescape
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; anything past that is tokenized for nothing
+EMBED_MAX_TOKENS = int(os.getenv('EMBED_MAX_TOKENS', '256'))
+NORMALIZE_BODIES = os.getenv('NORMALIZE_BODIES', '1') == '1'
+
+_HTML_HINT = re.compile(r'<(?:!--|[a-zA-Z/!])')
+# Whole elements whose content is never visible text
+_INVISIBLE_ELEMENTS = re.compile(r'<(head|style|script|title|noscript|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->',
+                                 re.S | re.I)
+# Block-level tags become line breaks so footer lines stay separable
+_BLOCK_TAGS = re.compile(r'<(?:br|/?(?:p|div|tr|table|li|ul|ol|h[1-6]|blockquote|section|footer|header|center))\b[^>]*>',
+                         re.I)
+_TAG = re.compile(r'<[^>]*>')
+# Zero-width and other invisible characters used in preheader padding
+_INVISIBLE_CHARS = re.compile('[\u200b\u200c\u200d\u2060\ufeff\u034f\u00ad]')
+# Matched against lowercased text: a case-insensitive alternation this wide costs ~4x more
+_BOILERPLATE = re.compile(
+    r'unsubscribe|opt[ -]out|manage (?:your )?(?:preferences|subscriptions?|email)|email preferences'
+    r'|view (?:this email )?(?:it )?in (?:your|a) (?:web )?browser|view (?:as a )?web ?page'
+    r'|(?:you are|you\'re) receiving this|sent to [^\s@]+@|this (?:email|message) was sent'
+    r'|privacy (?:policy|notice)|terms (?:of use|and conditions|& conditions)|all rights reserved'
+    r'|©|\(c\) ?\d{4}|copyright \d{4}|add us to your address book|do not reply|no-?reply')
+_BOILERPLATE_I = re.compile(_BOILERPLATE.pattern, re.I)
+# Postal address lines: a street word and a ZIP code, and only address characters on the whole line
+_ADDRESS_LINE = re.compile(r"[\w .,#'/-]{0,80}\b(?:street|st|avenue|ave|road|rd|boulevard|blvd|drive|suite|floor)\b"
+                           r"[\w .,#'/-]{0,80}\b\d{5}(?:-\d{4})?\b[\w .,]{0,40}")
+# Every _BOILERPLATE alternative contains one of these hints, and every address line a
+# ZIP code; substring checks rule out most text far faster than the regex
+_BOILERPLATE_HINTS = ('unsubscribe', 'opt', 'manage', 'preferences', 'browser', 'web', 'receiving', 'sent',
+                      'privacy', 'terms', 'reserved', '©', '(c)', 'copyright', 'address book', 'reply')
+# Word-bounded, so promo codes like DEAL12345 don't count
+_ZIP_CODE = re.compile(r'\b\d{5}\b')
+# Offer wording; a trailing line with a footer phrase and any of these is kept as deal text
+_DEAL_HINTS = ('%', '$', '£', '€', 'off', 'free', 'sale', 'save', 'deal', 'code', 'ends', 'expir', 'today', 'tonight')
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML body, one line per block element"""
+    text = _INVISIBLE_ELEMENTS.sub(' ', html)
+    text = _BLOCK_TAGS.sub('\n', text)
+    return unescape(_TAG.sub(' ', text))
+
+
+def _may_be_boilerplate(lower: str) -> bool:
+    return any(hint in lower for hint in _BOILERPLATE_HINTS) or _ZIP_CODE.search(lower) is not None
+
+
+def _is_address_line(lower: str) -> bool:
+    return (_ZIP_CODE.search(lower) is not None and _ADDRESS_LINE.fullmatch(lower.strip()) is not None
+            and not any(hint in lower for hint in _DEAL_HINTS))
+
+
+def _is_footer_line(lower: str) -> bool:
+    return ((_may_be_boilerplate(lower) and _BOILERPLATE.search(lower) is not None
+             and not any(hint in lower for hint in _DEAL_HINTS)) or _is_address_line(lower))
+
+
+def _cut_phrases(line: str, lower: str) -> str:
+    # Lowercasing can change the length of a few non-ASCII strings; spans from the lowered
+    # text would then be off, so those lines are matched case-insensitively instead
+    matches = _BOILERPLATE.finditer(lower) if len(lower) == len(line) else _BOILERPLATE_I.finditer(line)
+    pieces = []
+    position = 0
+    for match in matches:
+        pieces.append(line[position:match.start()])
+        position = match.end()
+    pieces.append(line[position:])
+    return ''.join(pieces)
+
+
+def strip_boilerplate(text: str) -> str:
+    """Remove unsubscribe/legal/address footer boilerplate.
+
+    Trailing lines that contain a footer phrase and no offer wording are
+    dropped whole, as are postal address lines anywhere. Elsewhere only the
+    matched phrase is cut, so deal text sharing a line with it ("Terms and
+    conditions apply, 40% off boots ends Friday") is kept. Only lines
+    containing a hint are matched against the regex.
+    """
+    lines = text.split('\n')
+    end = len(lines)
+    while end and (not lines[end - 1].strip() or _is_footer_line(lines[end - 1].lower())):
+        end -= 1
+    head = '\n'.join(lines[:end])
+    if not _may_be_boilerplate(head.lower()):
+        return head
+
+    kept = []
+    for line in lines[:end]:
+        if not line.strip():
+            continue
+        lower = line.lower()
+        if not _may_be_boilerplate(lower):
+            kept.append(line)
+        elif not _is_address_line(lower):
+            kept.append(_cut_phrases(line, lower))
+    return '\n'.join(kept)
+
+
+def normalize_body(text: str) -> str:
+    """Plain, single-spaced body text without markup, entities, invisible padding or footers"""
+    if not text:
+        return ''
+    if '<' in text and _HTML_HINT.search(text):
+        text = html_to_text(text)
+    elif '&' in text:
+        text = unescape(text)
+    text = _INVISIBLE_CHARS.sub('', text)
+    if _may_be_boilerplate(text.lower()):
+        text = strip_boilerplate(text)
+    return ' '.join(text.split())
+
+
+def truncate_tokens(text: str, max_tokens: int = EMBED_MAX_TOKENS) -> str:
+    """Cut ``text`` after about ``max_tokens`` model tokens.
+
+    Words and punctuation marks are counted as one token each, a slight
+    undercount of word pieces, so the cut lands at or just past the model's
+    own truncation point and never drops text the model would have seen.
+    """
+    if len(text) <= max_tokens * 2:
+        return text
+    for count, match in enumerate(_TOKEN.finditer(text), 1):
+        if count == max_tokens:
+            return text[:match.end()]
+    return text
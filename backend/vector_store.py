@@ -0,0 +1,565 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from encoders import MODEL_NAME
+
+# Rows scored per block during search; small blocks keep int8 dequantization in cache
+SEARCH_BLOCK_ROWS = 4096
+INITIAL_CAPACITY = 1024
+
+
+def build_where(filters: Optional[Dict]) -> Optional[Dict]:
+    """Translate search filters into a Chroma-style ``where`` clause.
+
+    Supported keys: promotion_type and sender (a value or a list of values),
+    min_discount / max_discount, and start_date / end_date (ISO strings,
+    datetimes or epoch seconds, matched against the ``date`` metadata field).
+    """
+    if not filters:
+        return None
+
+    clauses = []
+    for field in ('promotion_type', 'sender'):
+        value = filters.get(field)
+        if isinstance(value, (list, tuple)):
+            clauses.append({field: {'$in': list(value)}})
+        elif value:
+            clauses.append({field: {'$eq': value}})
+
+    for key, field, op, convert in (('min_discount', 'discount', '$gte', float),
+                                    ('max_discount', 'discount', '$lte', float),
+                                    ('start_date', 'date', '$gte', _to_epoch),
+                                    ('end_date', 'date', '$lte', _to_epoch)):
+        if filters.get(key) not in (None, ''):
+            clauses.append({field: {op: convert(filters[key])}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+def _to_epoch(value) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+
+def _check_encoder(recorded: Optional[str], encoder: Optional[str], count: int, location: str) -> Optional[str]:
+    """Encoder a store holds vectors from; refuses to add another encoder's vectors.
+
+    Stores from before encoders were recorded hold vectors of the original model.
+    """
+    if recorded is None and count:
+        recorded = MODEL_NAME
+    if encoder and recorded and recorded != encoder:
+        raise ValueError(f"Vector store at {location} holds {recorded} embeddings, not {encoder}; "
+                         f"point VECTOR_STORE_DIR / CHROMA_DIR at a separate location for this encoder")
+    return recorded or encoder
+
+
+class VectorStore:
+    """Interface used by AIClassifier for storing and searching email embeddings"""
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict]):
+        raise NotImplementedError
+
+    def query(self, embeddings, n_results: int = 5, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """Top ``n_results`` hits per query row: dicts with id, document, metadata and
+        score (cosine similarity).
+
+        ``where`` is a Chroma-style metadata filter ($eq, $ne, $gt, $gte, $lt, $lte,
+        $in, $nin, $and, $or) applied before top-k selection.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def iter_batches(self, batch_size: int = 1000, include_embeddings: bool = True) -> Iterator[Dict]:
+        """Stored records in insertion order, ``batch_size`` at a time.
+
+        Each batch is a dict of ids, documents, metadatas and embeddings (an
+        (n, dim) float32 array of normalized vectors, or None when not included).
+        """
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """Chroma collection backend (HNSW, cosine space)"""
+
+    def __init__(self, client, name: str = 'promotions', path: Optional[str] = None,
+                 encoder: Optional[str] = None):
+        self.client = client
+        # Data directory of a persistent client, None when in-memory
+        self.path = path
+        metadata = {"hnsw:space": "cosine"}
+        if encoder:
+            metadata['encoder'] = encoder
+        try:
+            self.collection = client.create_collection(
+                name=name,
+                metadata=metadata
+            )
+        except:
+            self.collection = client.get_collection(name)
+        recorded = (self.collection.metadata or {}).get('encoder')
+        self.encoder = _check_encoder(recorded, encoder, self.collection.count(), path or name)
+        if self.encoder and recorded is None:
+            # Collections from before encoders were recorded
+            try:
+                self.collection.modify(metadata={**(self.collection.metadata or {}), 'encoder': self.encoder})
+            except Exception as e:
+                print(f"Could not record encoder on collection {name}: {e}")
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(
+            embeddings=[np.asarray(e).tolist() for e in embeddings],
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def query(self, embeddings, n_results=5, where=None):
+        kwargs = {'where': where} if where else {}
+        results = self.collection.query(
+            query_embeddings=[np.asarray(e).tolist() for e in embeddings],
+            n_results=n_results,
+            **kwargs
+        )
+        hits = []
+        for row in range(len(results['ids'])):
+            hits.append([{
+                'id': results['ids'][row][i],
+                'document': results['documents'][row][i] if results.get('documents') else None,
+                'metadata': results['metadatas'][row][i] if results.get('metadatas') else {},
+                'score': 1 - results['distances'][row][i]
+            } for i in range(len(results['ids'][row]))])
+        return hits
+
+    def count(self):
+        return self.collection.count()
+
+    def iter_batches(self, batch_size=1000, include_embeddings=True):
+        include = ['documents', 'metadatas'] + (['embeddings'] if include_embeddings else [])
+        offset = 0
+        while True:
+            page = self.collection.get(limit=batch_size, offset=offset, include=include)
+            if not page['ids']:
+                return
+            offset += len(page['ids'])
+            yield {
+                'ids': page['ids'],
+                'documents': page['documents'],
+                'metadatas': page['metadatas'],
+                'embeddings': np.asarray(page['embeddings'], dtype=np.float32) if include_embeddings else None
+            }
+
+
+class MetadataColumns:
+    """Typed, growable columns over record metadata for vectorized filtering.
+
+    Numbers go into float64 columns (NaN when missing); strings are interned into
+    int32 code columns (-1 when missing).
+    """
+
+    def __init__(self):
+        self._numeric = {}
+        self._codes = {}
+        self._vocab = {}
+        self._size = 0
+
+    def _grow(self, rows: int):
+        if rows <= self._size:
+            return
+        size = max(INITIAL_CAPACITY, self._size)
+        while size < rows:
+            size *= 2
+        for name, column in self._numeric.items():
+            self._numeric[name] = np.concatenate([column, np.full(size - len(column), np.nan)])
+        for name, column in self._codes.items():
+            self._codes[name] = np.concatenate([column, np.full(size - len(column), -1, dtype=np.int32)])
+        self._size = size
+
+    def set(self, row: int, metadata: Dict):
+        self._grow(row + 1)
+        for name, value in metadata.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                continue
+            if isinstance(value, str):
+                column = self._codes.get(name)
+                if column is None:
+                    column = self._codes[name] = np.full(self._size, -1, dtype=np.int32)
+                vocab = self._vocab.setdefault(name, {})
+                column[row] = vocab.setdefault(value, len(vocab))
+            else:
+                column = self._numeric.get(name)
+                if column is None:
+                    column = self._numeric[name] = np.full(self._size, np.nan)
+                column[row] = value
+
+    def mask(self, where: Dict, count: int) -> np.ndarray:
+        """Boolean mask over the first ``count`` rows for a Chroma-style filter"""
+        result = np.ones(count, dtype=bool)
+        for key, condition in where.items():
+            if key == '$and':
+                for clause in condition:
+                    result &= self.mask(clause, count)
+            elif key == '$or':
+                combined = np.zeros(count, dtype=bool)
+                for clause in condition:
+                    combined |= self.mask(clause, count)
+                result &= combined
+            else:
+                if not isinstance(condition, dict):
+                    condition = {'$eq': condition}
+                for op, value in condition.items():
+                    result &= self._compare(key, op, value, count)
+        return result
+
+    def _compare(self, name: str, op: str, value, count: int) -> np.ndarray:
+        values = value if op in ('$in', '$nin') else [value]
+        if all(isinstance(v, str) for v in values):
+            column = self._codes.get(name)
+            if column is None:
+                return np.full(count, op in ('$ne', '$nin'))
+            column = column[:count]
+            vocab = self._vocab[name]
+            codes = [vocab[v] for v in values if v in vocab]
+            if op in ('$eq', '$in'):
+                return np.isin(column, codes)
+            if op in ('$ne', '$nin'):
+                return ~np.isin(column, codes)
+            raise ValueError(f"Operator {op} is not supported for string field {name}")
+
+        column = self._numeric.get(name)
+        if column is None:
+            return np.full(count, op in ('$ne', '$nin'))
+        column = column[:count]
+        with np.errstate(invalid='ignore'):
+            if op == '$eq':
+                return column == value
+            if op == '$ne':
+                return column != value
+            if op == '$gt':
+                return column > value
+            if op == '$gte':
+                return column >= value
+            if op == '$lt':
+                return column < value
+            if op == '$lte':
+                return column <= value
+            if op == '$in':
+                return np.isin(column, values)
+            if op == '$nin':
+                return ~np.isin(column, values)
+        raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process exact cosine search over a memory-mapped matrix of normalized embeddings.
+
+    Layout under ``path``: ``vectors.bin`` (float32, or int8 with ``scales.bin`` when
+    quantized), ``records.jsonl`` (append-only id/metadata/document log, last entry
+    wins) and ``meta.json``.
+    """
+
+    def __init__(self, path: str, dim: Optional[int] = None, quantize: bool = False,
+                 encoder: Optional[str] = None):
+        self.path = path
+        self.quantize = quantize
+        self.dim = dim
+        # Name of the encoder whose vectors the store holds (recorded in meta.json)
+        self.encoder = encoder
+        self._lock = threading.RLock()
+        self._ids = []
+        self._row_by_id = {}
+        self._metadatas = []
+        self._documents = []
+        self._vectors = None
+        self._scales = None
+        self._capacity = 0
+        self._columns = MetadataColumns()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # Persistence
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_file = self._file('meta.json')
+        if not os.path.exists(meta_file):
+            return
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get('quantize', False) != self.quantize:
+            raise ValueError(f"Vector store at {self.path} was built with quantize={meta.get('quantize')}")
+        # Legacy stores have no recorded encoder but any rows came from the original model
+        self.encoder = _check_encoder(meta.get('encoder'), self.encoder, meta['capacity'], self.path)
+        self.dim = meta['dim']
+        self._capacity = meta['capacity']
+        self._map_files()
+
+        records_file = self._file('records.jsonl')
+        if not os.path.exists(records_file):
+            return
+        with open(records_file, 'rb+') as f:
+            good = 0
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('unterminated line')
+                    record = json.loads(line)
+                    row, email_id, metadata = record['row'], record['id'], record['metadata']
+                    if row > len(self._ids) or row >= self._capacity:
+                        raise ValueError(f"row {row} out of step with the store")
+                except (ValueError, KeyError, TypeError):
+                    # Torn final write from a crash; keep the rows before it and drop
+                    # the tail so the next upsert appends on a line boundary
+                    print(f"Vector store at {self.path}: dropping unreadable records after {len(self._ids)} rows")
+                    f.truncate(good)
+                    break
+                good += len(line)
+                if row == len(self._ids):
+                    self._ids.append(email_id)
+                    self._metadatas.append(metadata)
+                    self._documents.append(record.get('document'))
+                else:
+                    self._metadatas[row] = metadata
+                    self._documents[row] = record.get('document')
+                self._row_by_id[email_id] = row
+                self._columns.set(row, metadata)
+
+    def _write_meta(self):
+        # Replaced atomically so a crash never leaves a half-written meta.json
+        tmp = self._file('meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'dim': self.dim, 'capacity': self._capacity, 'quantize': self.quantize,
+                       'encoder': self.encoder}, f)
+        os.replace(tmp, self._file('meta.json'))
+
+    def _map_files(self):
+        dtype = np.int8 if self.quantize else np.float32
+        self._vectors = np.memmap(self._file('vectors.bin'), dtype=dtype, mode='r+',
+                                  shape=(self._capacity, self.dim))
+        if self.quantize:
+            self._scales = np.memmap(self._file('scales.bin'), dtype=np.float32, mode='r+',
+                                     shape=(self._capacity,))
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        capacity = max(INITIAL_CAPACITY, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+
+        # Grow the backing files, then remap them
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+            if self._scales is not None:
+                self._scales.flush()
+                self._scales = None
+        itemsize = 1 if self.quantize else 4
+        with open(self._file('vectors.bin'), 'ab') as f:
+            f.truncate(capacity * self.dim * itemsize)
+        if self.quantize:
+            with open(self._file('scales.bin'), 'ab') as f:
+                f.truncate(capacity * 4)
+        self._capacity = capacity
+        self._write_meta()
+        self._map_files()
+
+    # Vector encoding
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def _encode_rows(self, matrix: np.ndarray):
+        if not self.quantize:
+            return matrix, None
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    # VectorStore API
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        matrix = self._normalize(embeddings)
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dim embeddings, got {matrix.shape[1]}")
+
+            rows = []
+            new_rows = len(self._ids)
+            pending = {}
+            for email_id in ids:
+                row = self._row_by_id.get(email_id, pending.get(email_id))
+                if row is None:
+                    row = pending[email_id] = new_rows
+                    new_rows += 1
+                rows.append(row)
+            self._ensure_capacity(new_rows)
+
+            values, scales = self._encode_rows(matrix)
+            self._vectors[rows] = values
+            if scales is not None:
+                self._scales[rows] = scales
+
+            with open(self._file('records.jsonl'), 'a') as f:
+                for email_id, row, document, metadata in zip(ids, rows, documents, metadatas):
+                    if row == len(self._ids):
+                        self._ids.append(email_id)
+                        self._metadatas.append(metadata)
+                        self._documents.append(document)
+                        self._row_by_id[email_id] = row
+                    else:
+                        self._metadatas[row] = metadata
+                        self._documents[row] = document
+                    self._columns.set(row, metadata)
+                    f.write(json.dumps({'id': email_id, 'row': row, 'metadata': metadata,
+                                        'document': document}) + '\n')
+            self._vectors.flush()
+            if self._scales is not None:
+                self._scales.flush()
+
+    def query(self, embeddings, n_results=5, where=None):
+        queries = self._normalize(embeddings)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or n_results <= 0:
+                return [[] for _ in range(len(queries))]
+
+            # Filter on typed metadata columns first so only matching rows are scored
+            rows = None
+            if where:
+                rows = np.flatnonzero(self._columns.mask(where, count))
+                if len(rows) == 0:
+                    return [[] for _ in range(len(queries))]
+            scores = self._scores(queries, count, rows)
+            candidates = len(scores)
+
+            k = min(n_results, candidates)
+            hits = []
+            for q in range(len(queries)):
+                column = scores[:, q]
+                # Partial selection first, then order only the k winners
+                top = np.argpartition(-column, k - 1)[:k] if k < candidates else np.arange(candidates)
+                top = top[np.argsort(-column[top], kind='stable')]
+                hits.append([{
+                    'id': self._ids[row],
+                    'document': self._documents[row],
+                    'metadata': self._metadatas[row],
+                    'score': float(column[i])
+                } for i, row in zip(top, top if rows is None else rows[top])])
+            return hits
+
+    def _scores(self, queries: np.ndarray, count: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of stored rows (all, or the selected ``rows``) against every query"""
+        total = count if rows is None else len(rows)
+        scores = np.empty((total, len(queries)), dtype=np.float32)
+        query_t = queries.T
+        for start in range(0, total, SEARCH_BLOCK_ROWS):
+            end = min(total, start + SEARCH_BLOCK_ROWS)
+            index = slice(start, end) if rows is None else rows[start:end]
+            if self.quantize:
+                block = self._vectors[index].astype(np.float32)
+                scores[start:end] = (block @ query_t) * self._scales[index, None]
+            else:
+                scores[start:end] = self._vectors[index] @ query_t
+        return scores
+
+    def count(self):
+        with self._lock:
+            return len(self._ids)
+
+    def iter_batches(self, batch_size=1000, include_embeddings=True):
+        # Rows added after the export starts are not included; one batch is read
+        # from disk at a time
+        with self._lock:
+            total = len(self._ids)
+        batch_size = max(1, batch_size)
+        for start in range(0, total, batch_size):
+            end = min(total, start + batch_size)
+            with self._lock:
+                embeddings = self._read_rows(start, end) if include_embeddings else None
+                batch = {
+                    'ids': self._ids[start:end],
+                    'documents': self._documents[start:end],
+                    'metadatas': self._metadatas[start:end],
+                    'embeddings': embeddings
+                }
+            # Yielded outside the lock: a slow consumer must not block upserts
+            yield batch
+
+    def _read_rows(self, start: int, end: int) -> np.ndarray:
+        """Float32 rows [start, end) read through the files, so a full scan does not
+        fault the whole memory map into this process"""
+        count = end - start
+        if self.quantize:
+            values = np.fromfile(self._file('vectors.bin'), dtype=np.int8, count=count * self.dim,
+                                 offset=start * self.dim)
+            scales = np.fromfile(self._file('scales.bin'), dtype=np.float32, count=count, offset=start * 4)
+            return values.reshape(count, self.dim).astype(np.float32) * scales[:, None]
+        return np.fromfile(self._file('vectors.bin'), dtype=np.float32, count=count * self.dim,
+                           offset=start * self.dim * 4).reshape(count, self.dim)
+
+    def memory_bytes(self) -> int:
+        """Bytes of vector data for the stored rows"""
+        with self._lock:
+            per_row = self.dim * (1 if self.quantize else 4) + (4 if self.quantize else 0)
+            return len(self._ids) * per_row if self.dim else 0
+
+
+# Backend selection: VECTOR_BACKEND=chroma (default) or numpy
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'chroma')
+VECTOR_STORE_DIR = os.getenv('VECTOR_STORE_DIR', './vector_store')
+VECTOR_QUANTIZE = os.getenv('VECTOR_QUANTIZE', '0') == '1'
+# Chroma data directory; CHROMA_PERSIST=0 keeps the collection in memory only
+CHROMA_DIR = os.getenv('CHROMA_DIR', './chroma_db')
+CHROMA_PERSIST = os.getenv('CHROMA_PERSIST', '1') == '1'
+
+
+def create_vector_store(backend: Optional[str] = None, path: Optional[str] = None,
+                        quantize: Optional[bool] = None, encoder: Optional[str] = None) -> VectorStore:
+    """Build the configured vector store backend, for vectors of the named ``encoder``"""
+    backend = backend or VECTOR_BACKEND
+    if backend == 'numpy':
+        return NumpyVectorStore(
+            path or VECTOR_STORE_DIR,
+            quantize=VECTOR_QUANTIZE if quantize is None else quantize,
+            encoder=encoder
+        )
+    if backend == 'chroma':
+        import chromadb
+        from chromadb.config import Settings
+        settings = Settings(anonymized_telemetry=False)
+        if not CHROMA_PERSIST:
+            return ChromaVectorStore(chromadb.Client(settings), encoder=encoder)
+        directory = path or CHROMA_DIR
+        # chromadb.Client(persist_directory=...) is in-memory on Chroma >= 0.4;
+        # PersistentClient writes to disk and loads segments lazily on restart
+        if hasattr(chromadb, 'PersistentClient'):
+            client = chromadb.PersistentClient(path=directory, settings=settings)
+        else:
+            client = chromadb.Client(Settings(
+                chroma_db_impl='duckdb+parquet',
+                persist_directory=directory,
+                anonymized_telemetry=False
+            ))
+        return ChromaVectorStore(client, path=directory, encoder=encoder)
+    raise ValueError(f"Unknown vector store backend: {backend}")